@@ -0,0 +1,206 @@
+"""
+Benchmark řetězce sběr → šifrování → odeslání.
+
+Spuštění z adresáře agent_windows:
+
+    python -m benchmarks.bench_pipeline [--quick] [--output soubor.json]
+                                        [--compare predchozi.json]
+
+Každý benchmark měří latenci jednotlivých operací a propustnost. Výsledky
+se ukládají jako JSON (výchozí benchmarks/results/bench-<čas>.json), aby se
+daly porovnávat mezi běhy.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from lib.http_transport import HttpTransport  # noqa: E402
+from lib.message_encryptor import MessageEncryptor  # noqa: E402
+from lib.message_sender import MessageSender  # noqa: E402
+from lib.metric_sampler import MetricSampler, PsutilProbe  # noqa: E402
+from lib.system_info import get_system_info  # noqa: E402
+from lib.system_info_reporter import SystemInfoReporter  # noqa: E402
+
+from benchmarks.stats import percentile  # noqa: E402
+from benchmarks.stub_server import StubServer  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+PAYLOAD_SIZES = [1024, 16 * 1024, 256 * 1024]
+RSA_KEY_SIZES = [2048, 3072, 4096]
+
+
+def measure(name: str, func, iterations: int, warmup: int = 3, **params) -> dict:
+    """Spustí func iterations-krát a vrátí statistiky latence v ms."""
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter_ns()
+        func()
+        latencies.append((time.perf_counter_ns() - t0) / 1e6)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "name": name,
+        "params": params,
+        "iterations": iterations,
+        "ops_per_sec": iterations / elapsed,
+        "mean_ms": statistics.fmean(latencies),
+        "min_ms": latencies[0],
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": latencies[-1],
+    }
+    print(
+        f"{name:<28} {json.dumps(params):<40} "
+        f"{result['ops_per_sec']:>10.1f} op/s  p50 {result['p50_ms']:.3f} ms  "
+        f"p95 {result['p95_ms']:.3f} ms"
+    )
+    return result
+
+
+def synthetic_payload(size: int) -> dict:
+    """Report přibližně dané velikosti v JSON (inventář balíčků)."""
+    payload = dict(get_system_info())
+    entry = "package-name-%05d==1.2.3"
+    count = max(0, (size - len(json.dumps(payload))) // (len(entry) + 4))
+    payload["inventory"] = [entry % i for i in range(count)]
+    return payload
+
+
+def bench_collection(iterations: int) -> list[dict]:
+    reporter = SystemInfoReporter()
+    return [
+        measure("get_system_info", get_system_info, iterations),
+        measure("report_system_info", reporter.report_system_info, iterations),
+    ]
+
+
+def bench_encryption(iterations: int, key_sizes: list[int]) -> list[dict]:
+    results = []
+    encryptor = MessageEncryptor()
+    for key_size in key_sizes:
+        public_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=key_size
+        ).public_key()
+        for size in PAYLOAD_SIZES:
+            payload = synthetic_payload(size)
+            results.append(
+                measure(
+                    "encrypt_message",
+                    lambda: encryptor.encrypt_message(payload, "token", public_key),
+                    iterations,
+                    payload_bytes=size,
+                    rsa_key_size=key_size,
+                )
+            )
+    return results
+
+
+def bench_send(iterations: int) -> list[dict]:
+    results = []
+    with StubServer() as server:
+        transport = HttpTransport()
+        sender = MessageSender(server.url, "bench-agent", transport)
+        encryptor = MessageEncryptor()
+        public_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048
+        ).public_key()
+        for size in PAYLOAD_SIZES:
+            encrypted = encryptor.encrypt_message(
+                synthetic_payload(size), "token", public_key
+            )
+            results.append(
+                measure(
+                    "send_message",
+                    lambda: sender.send_message(
+                        *encrypted, "127.0.0.1", 0, "bench", "ok", 0
+                    ),
+                    iterations,
+                    payload_bytes=size,
+                )
+            )
+        transport.close()
+    return results
+
+
+def bench_sampler(iterations: int) -> list[dict]:
+    """Cena jednoho vzorku metrik (vyžaduje psutil)."""
+    if not MetricSampler.available():
+        print("metric_sampler: psutil není nainstalován, přeskakuji")
+        return []
+    sampler = MetricSampler(1.0, capacity=iterations + 16, probe=PsutilProbe())
+    return [measure("metric_sample", sampler.sample_once, iterations)]
+
+
+def compare(current: dict, previous_file: Path):
+    previous = json.loads(previous_file.read_text())
+    baseline = {
+        (r["name"], json.dumps(r["params"], sort_keys=True)): r
+        for r in previous["results"]
+    }
+    print(f"\nPorovnání s {previous_file.name} (p50, záporné = rychlejší):")
+    for result in current["results"]:
+        key = (result["name"], json.dumps(result["params"], sort_keys=True))
+        if key in baseline:
+            before = baseline[key]["p50_ms"]
+            change = (result["p50_ms"] - before) / before * 100 if before else 0.0
+            print(f"  {key[0]:<28} {key[1]:<40} {change:+7.1f} %")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Mastiff agenta.")
+    parser.add_argument(
+        "--quick", action="store_true", help="Méně iterací, jen RSA 2048."
+    )
+    parser.add_argument("--output", type=Path, help="Soubor pro výsledky (JSON).")
+    parser.add_argument("--compare", type=Path, help="Předchozí výsledky k porovnání.")
+    args = parser.parse_args()
+
+    # Logování po polích by měřilo zápis logu, ne agenta
+    logging.disable(logging.CRITICAL)
+
+    iterations = 20 if args.quick else 200
+    key_sizes = [2048] if args.quick else RSA_KEY_SIZES
+    results = (
+        bench_collection(iterations)
+        + bench_encryption(iterations, key_sizes)
+        + bench_send(iterations)
+        + bench_sampler(iterations)
+    )
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    output = args.output or RESULTS_DIR / (
+        "bench-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nVýsledky uloženy do {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
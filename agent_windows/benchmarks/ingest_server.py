@@ -0,0 +1,560 @@
+"""
+Referenční ingest server: lokální náhrada serveru pro end-to-end benchmarky
+a integrační testy. Na rozdíl od StubServer zprávy opravdu dešifruje.
+
+Spuštění z adresáře agent_windows:
+
+    python -m benchmarks.ingest_server [--port 8000] [--workers 4]
+                                       [--auth-token TOKEN]
+
+Implementuje /api/public_key (s ETagem), /api/message, /api/message/batch,
+/api/message/stream a /metrics (počítadla propustnosti jako JSON). Obálky
+čte přesně v podobě z MessageEncryptor - JSON s base64 i binární rámec,
+kompresi, session klíče i delty. Zprávy, které potřebují RSA-OAEP, se
+rozbalí i dešifrují (AES-GCM) v poolu procesů o velikosti --workers (0 = ve
+vlákně požadavku); zprávy se známým session klíčem se dešifrují ve vlákně.
+Odmítnutí, ze kterých se agent umí zotavit, vrací 409 s kódem důvodu
+(unknown_session, key_rotated, base_hash_mismatch).
+"""
+
+import argparse
+import base64
+import binascii
+import hashlib
+import io
+import json
+import multiprocessing
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from lib.delta_tracker import DeltaTracker  # noqa: E402
+from lib.message_encryptor import COMPRESSION_ZLIB, stream_nonce  # noqa: E402
+from lib.wire_format import (  # noqa: E402
+    CONTENT_TYPE_BINARY,
+    WireFormatError,
+    decode_frame,
+    iter_frame_fields,
+)
+
+_OAEP = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None,
+)
+
+# Privátní klíč v procesech poolu (nastaví _init_worker)
+_private_key = None
+
+
+class EnvelopeError(Exception):
+    """Obálku nelze otevřít; reason je kód důvodu pro odpověď serveru."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _Rejected(Exception):
+    def __init__(self, status: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+def _init_worker(private_pem: bytes):
+    global _private_key
+    _private_key = serialization.load_pem_private_key(private_pem, password=None)
+
+
+def unwrap_key(encrypted_key: bytes, private_key=None) -> bytes:
+    try:
+        return (private_key or _private_key).decrypt(encrypted_key, _OAEP)
+    except ValueError:
+        raise EnvelopeError("key_unwrap_failed") from None
+
+
+def open_envelope(
+    encrypted_key: bytes,
+    nonce: bytes,
+    ciphertext: bytes,
+    session_id: str | None = None,
+    session_key: bytes | None = None,
+    compression: str | None = None,
+    private_key=None,
+) -> tuple[dict, bytes]:
+    """
+    Dešifruje obálku; vrací (plaintext, AES klíč). Se session_key se RSA
+    přeskočí. Běží v procesu poolu, nebo přímo s předaným private_key.
+    """
+    aes_key = session_key or unwrap_key(encrypted_key, private_key)
+    aad = session_id.encode("ascii") if session_id else None
+    try:
+        plaintext = AESGCM(aes_key).decrypt(nonce, ciphertext, aad)
+    except InvalidTag:
+        raise EnvelopeError("decrypt_failed") from None
+    if compression == COMPRESSION_ZLIB:
+        plaintext = zlib.decompress(plaintext)
+    elif compression:
+        raise EnvelopeError("unsupported_compression")
+    return json.loads(plaintext), aes_key
+
+
+class _ChunkedReader:
+    """Čtení těla s Transfer-Encoding: chunked (tak posílá requests generátor)."""
+
+    def __init__(self, rfile):
+        self._rfile = rfile
+        self._buffer = bytearray()
+        self._done = False
+
+    def read(self, size: int) -> bytes:
+        while len(self._buffer) < size and not self._done:
+            length = int(self._rfile.readline().split(b";")[0], 16)
+            if length == 0:
+                while self._rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass  # trailery
+                self._done = True
+            else:
+                self._buffer += self._rfile.read(length)
+                self._rfile.readline()
+        result = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return result
+
+
+class IngestServer:
+    def __init__(
+        self,
+        key_size: int = 2048,
+        workers: int = 0,
+        auth_token: str | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        keep_reports: int = 1000,
+    ):
+        """
+        auth_token None přijme zprávy s libovolným tokenem. Posledních
+        keep_reports přijatých reportů je k dispozici v reports.
+        """
+        self.workers = workers
+        self.auth_token = auth_token
+        self.reports = deque(maxlen=keep_reports)
+        self.streams = deque(maxlen=keep_reports)
+        self._lock = threading.Lock()
+        self._sessions: dict[str, bytes] = {}  # session_id -> AES klíč
+        self._snapshots: dict[str, tuple[str, dict]] = {}  # agent_id -> (hash, report)
+        self._key_size = key_size
+        self._key_generation = 0
+        self._pool = None
+        self._counters = {
+            "requests": 0,
+            "messages": 0,
+            "reports": 0,
+            "streams": 0,
+            "bytes_received": 0,
+            "rsa_unwraps": 0,
+            "decrypt_seconds": 0.0,
+        }
+        self._rejected: dict[str, int] = {}
+        self._started = time.monotonic()
+        self._new_key()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if self.path == "/api/public_key":
+                    etag = server._etag
+                    if self.headers.get("If-None-Match") == etag:
+                        self._reply(304, b"", {"ETag": etag})
+                    else:
+                        self._reply(200, server._key_body, {"ETag": etag})
+                elif self.path == "/metrics":
+                    self._reply(200, json.dumps(server.metrics()).encode("utf-8"))
+                else:
+                    self._reply(404, b"{}")
+
+            def do_POST(self):
+                try:
+                    if self.path == "/api/message/stream":
+                        server._handle_stream(self._body_reader(), self.headers)
+                    else:
+                        body = self._body_reader().read(
+                            int(self.headers.get("Content-Length", 0))
+                        )
+                        server._handle_message(self.path, body, self.headers)
+                except _Rejected as e:
+                    server._count_rejection(e.reason)
+                    body = json.dumps({"error": e.reason}).encode("utf-8")
+                    self._reply(e.status, body)
+                else:
+                    self._reply(200, b"{}")
+
+            def _body_reader(self):
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    # Po chybě uprostřed streamu nelze spojení dál používat
+                    self.close_connection = True
+                    return _ChunkedReader(self.rfile)
+                return self.rfile
+
+            def _reply(self, status, body, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        if self.workers > 0:
+            self._start_pool()
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def rotate_key(self):
+        """Vygeneruje nový klíčový pár; sessions starého klíče zanikají."""
+        self._new_key()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._start_pool()
+
+    def forget_sessions(self):
+        """Zahodí session klíče, jako by se server restartoval."""
+        with self._lock:
+            self._sessions.clear()
+
+    def forget_snapshots(self):
+        """Zahodí poslední snapshoty agentů (základy delt), např. po ztrátě dat."""
+        with self._lock:
+            self._snapshots.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            uptime = time.monotonic() - self._started
+            return {
+                **self._counters,
+                "rejected": dict(self._rejected),
+                "sessions": len(self._sessions),
+                "uptime_seconds": uptime,
+                "messages_per_second": self._counters["messages"] / uptime,
+                "reports_per_second": self._counters["reports"] / uptime,
+            }
+
+    def _new_key(self):
+        self._private_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=self._key_size
+        )
+        self._private_pem = self._private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        public_pem = self._private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        with self._lock:
+            self._key_body = json.dumps(
+                {"public_key_pem": public_pem.decode("utf-8")}
+            ).encode("utf-8")
+            self._etag = f'"{hashlib.sha256(public_pem).hexdigest()[:32]}"'
+            self._key_generation += 1
+            self._sessions.clear()
+
+    def _start_pool(self):
+        # spawn: fork procesu s běžícími vlákny serveru není bezpečný
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._private_pem,),
+        )
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    def _count_rejection(self, reason: str):
+        with self._lock:
+            self._rejected[reason] = self._rejected.get(reason, 0) + 1
+
+    def _handle_message(self, path: str, body: bytes, headers):
+        if path not in ("/api/message", "/api/message/batch"):
+            raise _Rejected(404, "not_found")
+        self._count(requests=1, bytes_received=len(body))
+        header, encrypted_key, nonce, ciphertext = self._parse(body, headers)
+        plaintext = self._open(header, encrypted_key, nonce, ciphertext)
+        self._check_token(plaintext)
+
+        agent_id = header.get("agent_id", "unknown_agent")
+        if path == "/api/message/batch":
+            entries = plaintext.get("batch")
+            if not isinstance(entries, list):
+                raise _Rejected(400, "malformed")
+        else:
+            entries = [plaintext]
+
+        reports = [
+            {
+                "agent_id": agent_id,
+                "content": self._resolve_delta(agent_id, entry.get("content")),
+                "client_timestamp": entry.get("client_timestamp"),
+            }
+            for entry in entries
+        ]
+        self.reports.extend(reports)
+        self._count(messages=1, reports=len(reports))
+
+    def _parse(self, body: bytes, headers) -> tuple[dict, bytes, bytes, bytes]:
+        """Vrací (hlavička, zašifrovaný klíč, nonce, ciphertext) z JSON i rámce."""
+        try:
+            if headers.get("Content-Type") == CONTENT_TYPE_BINARY:
+                header, fields = decode_frame(body)
+                encrypted_key, nonce, ciphertext = fields
+                return header, encrypted_key, nonce, ciphertext
+
+            header = json.loads(body)
+            return (
+                header,
+                base64.b64decode(header["encrypted_key"]),
+                base64.b64decode(header["nonce"]),
+                base64.b64decode(header["ciphertext"]),
+            )
+        except (WireFormatError, ValueError, KeyError, TypeError, binascii.Error):
+            raise _Rejected(400, "malformed") from None
+
+    def _open(
+        self, header: dict, encrypted_key: bytes, nonce: bytes, ciphertext: bytes
+    ):
+        session_id = header.get("session_id")
+        session_key = None
+        if session_id:
+            # Známá session se dešifruje bez RSA; při neznámé se rozbalí klíč,
+            # který zpráva nese (chybí jen u starších agentů)
+            with self._lock:
+                session_key = self._sessions.get(session_id)
+            if session_key is None and not encrypted_key:
+                raise _Rejected(409, "unknown_session")
+        generation = self._key_generation
+
+        started = time.perf_counter()
+        # Se známým session klíčem zbývá jen levné AES-GCM - posílat ho do
+        # poolu by stálo víc než samotné dešifrování
+        call = self._call if session_key is None else self._call_inline
+        try:
+            plaintext, aes_key = call(
+                open_envelope,
+                encrypted_key,
+                nonce,
+                ciphertext,
+                session_id,
+                session_key,
+                header.get("compression"),
+            )
+        except EnvelopeError as e:
+            if e.reason == "key_unwrap_failed" and self._key_generation > 1:
+                # Nejspíš zašifrováno starším klíčem - agent si stáhne nový
+                raise _Rejected(409, "key_rotated") from None
+            raise _Rejected(400, e.reason) from None
+        except (ValueError, zlib.error):
+            raise _Rejected(400, "malformed") from None
+        finally:
+            self._count(decrypt_seconds=time.perf_counter() - started)
+
+        if session_key is None:
+            self._count(rsa_unwraps=1)
+            if session_id:
+                with self._lock:
+                    if generation == self._key_generation:
+                        self._sessions[session_id] = aes_key
+        return plaintext
+
+    def _call(self, func, *args):
+        if self._pool is None:
+            return self._call_inline(func, *args)
+        return self._pool.submit(func, *args).result()
+
+    def _call_inline(self, func, *args):
+        return func(*args, private_key=self._private_key)
+
+    def _check_token(self, plaintext: dict):
+        if (
+            self.auth_token is not None
+            and plaintext.get("auth_token") != self.auth_token
+        ):
+            raise _Rejected(403, "invalid_token")
+
+    def _resolve_delta(self, agent_id: str, content):
+        """Delta se aplikuje na poslední plný snapshot agenta; vrací plný report."""
+        if not isinstance(content, dict):
+            return content
+        if "base_hash" not in content:
+            snapshot_hash = DeltaTracker.snapshot_hash(content)
+            with self._lock:
+                self._snapshots[agent_id] = (snapshot_hash, content)
+            return content
+
+        with self._lock:
+            base_hash, base = self._snapshots.get(agent_id, (None, None))
+        if base is None or base_hash != content["base_hash"]:
+            raise _Rejected(409, "base_hash_mismatch")
+        snapshot = {
+            key: value
+            for key, value in {**base, **content.get("changed", {})}.items()
+            if key not in content.get("removed", [])
+        }
+        snapshot_hash = DeltaTracker.snapshot_hash(snapshot)
+        if snapshot_hash != content.get("hash"):
+            raise _Rejected(409, "base_hash_mismatch")
+        with self._lock:
+            self._snapshots[agent_id] = (snapshot_hash, snapshot)
+        return snapshot
+
+    def _handle_stream(self, reader, headers):
+        """Stream se dešifruje po chuncích; v paměti je vždy jen jeden."""
+        if headers.get("Transfer-Encoding", "").lower() != "chunked":
+            reader = io.BytesIO(reader.read(int(headers.get("Content-Length", 0))))
+        try:
+            fields = iter_frame_fields(reader)
+            header = json.loads(next(fields))
+            encrypted_key = next(fields)
+            nonce_prefix = next(fields)
+            first = next(fields)
+        except (WireFormatError, ValueError, StopIteration):
+            raise _Rejected(400, "malformed") from None
+
+        started = time.perf_counter()
+        try:
+            aes_key = self._call(unwrap_key, encrypted_key)
+        except EnvelopeError:
+            if self._key_generation > 1:
+                raise _Rejected(409, "key_rotated") from None
+            raise _Rejected(400, "key_unwrap_failed") from None
+        self._count(rsa_unwraps=1)
+        aesgcm = AESGCM(aes_key)
+
+        size = 0
+        received = len(encrypted_key) + len(nonce_prefix) + len(first)
+        digest = hashlib.sha256()
+        try:
+            metadata = json.loads(
+                aesgcm.decrypt(stream_nonce(nonce_prefix, 0, False), first, None)
+            )
+            self._check_token(metadata)
+            index = 1
+            current = next(fields, None)
+            while current is not None:
+                # Poslední chunk se pozná až podle toho, že žádný další nepřijde
+                following = next(fields, None)
+                nonce = stream_nonce(nonce_prefix, index, following is None)
+                chunk = aesgcm.decrypt(nonce, current, None)
+                received += len(current)
+                size += len(chunk)
+                digest.update(chunk)
+                index += 1
+                current = following
+        except InvalidTag:
+            raise _Rejected(400, "decrypt_failed") from None
+        except (WireFormatError, ValueError):
+            raise _Rejected(400, "malformed") from None
+        finally:
+            self._count(
+                requests=1,
+                bytes_received=received,
+                decrypt_seconds=time.perf_counter() - started,
+            )
+
+        if index == 1:
+            raise _Rejected(400, "malformed")  # chybí i prázdný poslední chunk
+        self.streams.append(
+            {
+                "agent_id": header.get("agent_id", "unknown_agent"),
+                "kind": header.get("kind"),
+                "size": size,
+                "sha256": digest.hexdigest(),
+                "client_timestamp": metadata.get("client_timestamp"),
+            }
+        )
+        self._count(streams=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Referenční ingest server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Procesů pro dešifrování (0 = bez poolu).",
+    )
+    parser.add_argument("--auth-token", help="Přijímat jen zprávy s tímto tokenem.")
+    parser.add_argument("--key-size", type=int, default=2048)
+    args = parser.parse_args()
+
+    server = IngestServer(
+        key_size=args.key_size,
+        workers=args.workers,
+        auth_token=args.auth_token,
+        host=args.host,
+        port=args.port,
+    )
+    with server:
+        print(f"Ingest server běží na {server.url} (Ctrl+C ukončí)")
+        try:
+            while True:
+                time.sleep(10)
+                m = server.metrics()
+                print(
+                    f"zpráv {m['messages']} ({m['messages_per_second']:.1f}/s), "
+                    f"reportů {m['reports']}, odmítnuto {m['rejected']}"
+                )
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Generátor zátěže: simuluje flotilu agentů proti ingest serveru.
+
+Spuštění z adresáře agent_windows:
+
+    python -m benchmarks.loadgen --server-url http://localhost:8000 \\
+        --agents 2000 --interval 60 --duration 300 [--workers 4]
+
+Agenti se rozdělí mezi --workers procesů (0 = vše v aktuálním procesu).
+Každý proces běží v asyncio: agent čeká na svůj slot (SendScheduler,
+stejně jako skutečný agent), zprávu zašifruje a odešle přes MessageSender
+ve vlákně z poolu o velikosti --concurrency. Na konci se vypíše dosažená
+propustnost, percentily latence a chybovost (volitelně i do JSON).
+
+Latence se měří od plánovaného slotu, ne od začátku odeslání - zahrnuje
+tedy i čekání ve frontě poolu (bez "coordinated omission"). Sloty, které
+agent nestihl, protože ještě čekal na předchozí odeslání, se počítají jako
+zmeškané a souhrn porovná dosaženou a cílovou frekvenci slotů.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from lib.http_transport import HttpTransport  # noqa: E402
+from lib.message_encryptor import MessageEncryptor  # noqa: E402
+from lib.message_sender import MessageRejectedError, MessageSender  # noqa: E402
+from lib.public_key_fetcher import PublicKeyFetcher  # noqa: E402
+from lib.retry_policy import RetryPolicy  # noqa: E402
+from lib.send_scheduler import SendScheduler  # noqa: E402
+from lib.system_info import get_system_info  # noqa: E402
+
+from benchmarks.stats import percentile  # noqa: E402
+
+
+def synthetic_report(agent_id: str, payload_bytes: int) -> dict:
+    """Report jako od skutečného agenta, doplněný inventářem na danou velikost."""
+    report = dict(get_system_info(), hostname=agent_id)
+    entry = "package-name-%05d==1.2.3"
+    count = max(0, (payload_bytes - len(json.dumps(report))) // (len(entry) + 4))
+    report["inventory"] = [entry % i for i in range(count)]
+    return report
+
+
+class SimulatedAgent:
+    def __init__(self, agent_id: str, options: dict, transport, public_key, stats):
+        self.agent_id = agent_id
+        self.options = options
+        self.public_key = public_key
+        self.stats = stats
+        self.report = synthetic_report(agent_id, options["payload_bytes"])
+        self.encryptor = MessageEncryptor(
+            compression=options["compression"],
+            session_max_messages=options["session_messages"],
+        )
+        self.sender = MessageSender(
+            options["server_url"],
+            agent_id,
+            transport,
+            wire_format=options["wire_format"],
+            retry_policy=RetryPolicy(
+                max_attempts=options["retry_attempts"],
+                base_delay=options["retry_base_delay"],
+            ),
+        )
+        self.scheduler = SendScheduler(
+            agent_id, options["interval"], jitter_seconds=options["jitter"]
+        )
+        self.pending = []
+        self.message_count = 0
+
+    async def run(self, executor, deadline: float):
+        loop = asyncio.get_running_loop()
+        interval = self.options["interval"]
+        while True:
+            slot = self.scheduler.next_send_time()
+            if slot >= deadline:
+                return
+            await asyncio.sleep(max(slot - time.monotonic(), 0))
+
+            self.stats.record_slot()
+            self.pending.append((self.report, int(time.time())))
+            if len(self.pending) < self.options["batch_size"]:
+                continue
+            reports, self.pending = self.pending, []
+            await loop.run_in_executor(executor, self.send, reports, slot)
+
+            # Sloty, které uběhly během odesílání, scheduler přeskočí -
+            # přetížený server by tak potichu snižoval nabízenou zátěž
+            now = min(time.monotonic(), deadline)
+            missed = math.floor((now - slot) / interval)
+            if missed > 0:
+                self.stats.record_missed(missed)
+
+    def send(self, reports, scheduled_at: float):
+        """Odešle zprávu; latence se měří od plánovaného slotu (monotonic)."""
+        self.message_count += 1
+        try:
+            if len(reports) == 1:
+                envelope = self.encryptor.seal_message(
+                    reports[0][0], self.options["auth_token"], self.public_key
+                )
+                delivered = self.sender.send_envelope(
+                    envelope, "127.0.0.1", self.message_count, "LoadGen", "ok", 0
+                )
+            else:
+                envelope = self.encryptor.seal_batch(
+                    reports, self.options["auth_token"], self.public_key
+                )
+                delivered = self.sender.send_batch_envelope(
+                    envelope, len(reports), "127.0.0.1", self.message_count
+                )
+            outcome = "ok" if delivered else "failed"
+        except MessageRejectedError as e:
+            outcome = f"rejected:{e.reason}"
+        except Exception as e:
+            outcome = f"error:{type(e).__name__}"
+        self.stats.record(
+            outcome, (time.monotonic() - scheduled_at) * 1000, len(reports)
+        )
+
+
+class WorkerStats:
+    def __init__(self):
+        self.latencies_ms = []
+        self.outcomes = {}
+        self.reports = 0
+        self.slots = 0
+        self.missed_slots = 0
+        self._lock = threading.Lock()
+
+    def record_slot(self):
+        self.slots += 1
+
+    def record_missed(self, count: int):
+        self.missed_slots += count
+
+    def record(self, outcome: str, latency_ms: float, reports: int):
+        # Volá se souběžně z vláken poolu
+        with self._lock:
+            self.latencies_ms.append(latency_ms)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            if outcome == "ok":
+                self.reports += reports
+
+
+def run_worker(agent_ids: list[str], options: dict) -> dict:
+    """Spustí skupinu simulovaných agentů v jednom procesu; vrací surové výsledky."""
+    logging.disable(logging.CRITICAL)
+    return asyncio.run(_run_worker_async(agent_ids, options))
+
+
+async def _run_worker_async(agent_ids: list[str], options: dict) -> dict:
+    transport = HttpTransport(pool_maxsize=options["concurrency"])
+    public_key = PublicKeyFetcher(options["server_url"], transport).fetch_public_key()
+    stats = WorkerStats()
+    agents = [
+        SimulatedAgent(agent_id, options, transport, public_key, stats)
+        for agent_id in agent_ids
+    ]
+
+    deadline = time.monotonic() + options["duration"]
+    with ThreadPoolExecutor(
+        max_workers=options["concurrency"], thread_name_prefix="loadgen"
+    ) as executor:
+        await asyncio.gather(*(agent.run(executor, deadline) for agent in agents))
+    transport.close()
+
+    return {
+        "latencies_ms": stats.latencies_ms,
+        "outcomes": stats.outcomes,
+        "reports": stats.reports,
+        "slots": stats.slots,
+        "missed_slots": stats.missed_slots,
+    }
+
+
+def summarize(
+    results: list[dict], elapsed: float, target_slots_per_sec: float | None = None
+) -> dict:
+    """
+    Sloučí výsledky workerů. target_slots_per_sec je nabízená zátěž
+    (agenti / interval); achieved_slots_per_sec pod ní znamená, že agenti
+    kvůli pomalému odesílání sloty vynechávali (missed_slots).
+    """
+    latencies = sorted(l for r in results for l in r["latencies_ms"])
+    outcomes = {}
+    for result in results:
+        for outcome, count in result["outcomes"].items():
+            outcomes[outcome] = outcomes.get(outcome, 0) + count
+    messages = len(latencies)
+    errors = messages - outcomes.get("ok", 0)
+    slots = sum(r["slots"] for r in results)
+
+    summary = {
+        "elapsed_s": elapsed,
+        "messages": messages,
+        "reports": sum(r["reports"] for r in results),
+        "messages_per_sec": messages / elapsed if elapsed else 0.0,
+        "error_rate": errors / messages if messages else 0.0,
+        "outcomes": outcomes,
+        "slots": slots,
+        "missed_slots": sum(r["missed_slots"] for r in results),
+        "achieved_slots_per_sec": slots / elapsed if elapsed else 0.0,
+        "target_slots_per_sec": target_slots_per_sec,
+    }
+    if latencies:
+        summary.update(
+            {
+                "mean_ms": statistics.fmean(latencies),
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": latencies[-1],
+            }
+        )
+    return summary
+
+
+def run(options: dict, agents: int, workers: int) -> dict:
+    agent_ids = [f"loadgen-{i:06d}" for i in range(agents)]
+    started = time.monotonic()
+    if workers <= 0:
+        results = [run_worker(agent_ids, options)]
+    else:
+        groups = [agent_ids[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_worker, groups, [options] * workers))
+    return summarize(results, time.monotonic() - started, agents / options["interval"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generátor zátěže pro Mastiff server.")
+    parser.add_argument("--server-url", default="http://localhost:8000")
+    parser.add_argument("--auth-token", default="loadgen")
+    parser.add_argument(
+        "--agents", type=int, default=1000, help="Počet simulovaných agentů."
+    )
+    parser.add_argument(
+        "--interval", type=float, default=60, help="Interval agenta v s."
+    )
+    parser.add_argument("--jitter", type=float, default=0, help="Jitter slotu v s.")
+    parser.add_argument("--duration", type=float, default=120, help="Délka běhu v s.")
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Počet procesů (0 = bez poolu)."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=32, help="Souběžných odeslání na proces."
+    )
+    parser.add_argument("--payload-bytes", type=int, default=2048)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--retry-attempts", type=int, default=1)
+    parser.add_argument("--retry-base-delay", type=float, default=1.0)
+    parser.add_argument("--wire-format", choices=["json", "binary"], default="json")
+    parser.add_argument("--compression", choices=["none", "zlib"], default="none")
+    parser.add_argument("--session-messages", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Soubor pro výsledky (JSON).")
+    args = parser.parse_args()
+
+    options = {
+        "server_url": args.server_url,
+        "auth_token": args.auth_token,
+        "interval": args.interval,
+        "jitter": args.jitter,
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "payload_bytes": args.payload_bytes,
+        "batch_size": args.batch_size,
+        "retry_attempts": args.retry_attempts,
+        "retry_base_delay": args.retry_base_delay,
+        "wire_format": args.wire_format,
+        "compression": None if args.compression == "none" else args.compression,
+        "session_messages": args.session_messages,
+    }
+    print(
+        f"{args.agents} agentů, interval {args.interval} s "
+        f"(cíl {args.agents / args.interval:.1f} zpráv/s), {args.duration} s..."
+    )
+    summary = run(options, args.agents, args.workers)
+
+    print(f"Zpráv: {summary['messages']} ({summary['messages_per_sec']:.1f}/s)")
+    print(
+        f"Sloty: {summary['achieved_slots_per_sec']:.1f}/s "
+        f"(cíl {summary['target_slots_per_sec']:.1f}/s), "
+        f"zmeškaných {summary['missed_slots']}"
+    )
+    print(f"Chybovost: {summary['error_rate'] * 100:.2f} %  {summary['outcomes']}")
+    if summary["messages"]:
+        print(
+            f"Latence: p50 {summary['p50_ms']:.1f} ms  p95 {summary['p95_ms']:.1f} ms  "
+            f"p99 {summary['p99_ms']:.1f} ms  max {summary['max_ms']:.1f} ms"
+        )
+    if args.output:
+        args.output.write_text(
+            json.dumps({"options": options, "summary": summary}, indent=2)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""Společné statistiky pro benchmarky (percentily latence)."""
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Percentil metodou nejbližšího pořadí; sorted_values musí být seřazené."""
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
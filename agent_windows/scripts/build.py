@@ -40,6 +40,12 @@ PyInstaller.__main__.run(
         "--console",
         f"--distpath={dist_dir}",
         f'--add-data={src_dir / "config.py"};.',
+        # agent-cli profile spouští agenta v procesu CLI (importy jsou líné,
+        # PyInstaller je sám nenajde)
+        f'--add-data={src_dir / "main.py"};.',
+        f'--add-data={src_dir / "lib"};lib',
+        "--hidden-import=requests",
+        "--hidden-import=cryptography.hazmat.primitives.ciphers.aead",
         "--clean",
     ]
 )
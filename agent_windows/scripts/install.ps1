@@ -36,6 +36,9 @@ New-Item -ItemType Directory -Path $temp -Force | Out-Null
 Invoke-WebRequest -Uri $agentUrl -OutFile "$temp\agent-service.exe"
 Invoke-WebRequest -Uri $cliUrl -OutFile "$temp\agent-cli.exe"
 
+# Běžící služba drží agent-service.exe otevřený - při aktualizaci ji zastav
+Stop-ScheduledTask -TaskName "MonitoringAgent" -ErrorAction SilentlyContinue
+
 # Instaluj
 New-Item -ItemType Directory -Path $INSTALL_DIR -Force | Out-Null
 New-Item -ItemType Directory -Path $CONFIG_DIR -Force | Out-Null
@@ -53,11 +56,30 @@ if ($path -notlike "*$INSTALL_DIR*") {
     [Environment]::SetEnvironmentVariable("Path", "$path;$INSTALL_DIR", "Machine")
 }
 
-# Scheduled tasks
-schtasks /create /tn "MonitoringAgent" /tr "`"$INSTALL_DIR\agent-service.exe`"" /sc onstart /ru SYSTEM /f | Out-Null
-schtasks /create /tn "MonitoringAgentHourly" /tr "`"$INSTALL_DIR\agent-service.exe`"" /sc hourly /ru SYSTEM /f | Out-Null
+# Scheduled task - agent běží trvale jako služba (--daemon). Hodinový trigger
+# ho znovu spustí, pokud spadl; nad běžící instancí se nic nestane.
+# Starší instalace měly zvláštní hodinovou úlohu s jednorázovým během.
+Unregister-ScheduledTask -TaskName "MonitoringAgentHourly" -Confirm:$false -ErrorAction SilentlyContinue
+
+$action = New-ScheduledTaskAction -Execute "$INSTALL_DIR\agent-service.exe" -Argument "--daemon"
+$principal = New-ScheduledTaskPrincipal -UserId "SYSTEM" -LogonType ServiceAccount -RunLevel Highest
+$triggers = @(
+    New-ScheduledTaskTrigger -AtStartup
+    New-ScheduledTaskTrigger -Once -At (Get-Date) -RepetitionInterval (New-TimeSpan -Hours 1)
+)
+# Bez limitu doby běhu (výchozí je 72 h) a po pádu restart
+$settings = New-ScheduledTaskSettingsSet `
+    -ExecutionTimeLimit ([TimeSpan]::Zero) `
+    -MultipleInstances IgnoreNew `
+    -RestartCount 3 `
+    -RestartInterval (New-TimeSpan -Minutes 1) `
+    -AllowStartIfOnBatteries `
+    -DontStopIfGoingOnBatteries
+Register-ScheduledTask -TaskName "MonitoringAgent" -Action $action -Principal $principal `
+    -Trigger $triggers -Settings $settings -Force | Out-Null
 
 # Cleanup
 Remove-Item -Path $temp -Recurse -Force
 
 Write-Host "Hotovo. Nastav: agent-cli set server_url <url>"
+Write-Host "Po nastavení spusť službu: Start-ScheduledTask -TaskName MonitoringAgent"
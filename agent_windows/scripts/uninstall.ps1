@@ -2,6 +2,9 @@
 $INSTALL_DIR = "$env:ProgramFiles\Mastiff"
 $CONFIG_DIR = "$env:ProgramData\Mastiff"
 
+# Zastav běžící službu, jinak nejde smazat agent-service.exe
+Stop-ScheduledTask -TaskName "MonitoringAgent" -ErrorAction SilentlyContinue
+
 # Odstranění souborů
 if (Test-Path $INSTALL_DIR) {
     Remove-Item -Path $INSTALL_DIR -Recurse -Force
@@ -21,8 +24,9 @@ $newPath = ($path -split ";" | Where-Object { $_ -ne $INSTALL_DIR }) -join ";"
 Write-Host "PATH aktualizováno."
 
 # Odstranění Scheduled Tasks
-schtasks /delete /tn "MonitoringAgent" /f
-schtasks /delete /tn "MonitoringAgentHourly" /f
+Unregister-ScheduledTask -TaskName "MonitoringAgent" -Confirm:$false -ErrorAction SilentlyContinue
+# Úloha ze starších instalací
+Unregister-ScheduledTask -TaskName "MonitoringAgentHourly" -Confirm:$false -ErrorAction SilentlyContinue
 Write-Host "Scheduled Tasks odstraněny."
 
 Write-Host "Uninstall dokončen."
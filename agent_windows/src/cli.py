@@ -1,6 +1,8 @@
 import argparse
 import json
 import logging
+import time
+from pathlib import Path
 
 from src import config
 
@@ -10,6 +12,19 @@ logging.basicConfig(
 )
 
 
+class VersionAction(argparse.Action):
+    """--version: config se načte až při použití, ne při každém spuštění CLI."""
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, help=None):
+        super().__init__(
+            option_strings, dest=dest, default=argparse.SUPPRESS, nargs=0, help=help
+        )
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        version = config.load().get("version", "unknown")
+        parser.exit(message=f"{parser.prog} {version}\n")
+
+
 def status(args):  # args parameter for consistency
     cfg = config.load()
     logging.info("\nAktuální konfigurace:")
@@ -23,15 +38,84 @@ def set_value(args):  # args parameter for consistency
     value = args.value
 
     # Převod na správný typ a validace
-    if key == "interval_seconds":
+    if key in (
+        "interval_seconds",
+        "batch_size",
+        "compression_threshold",
+        "log_max_bytes",
+    ):
         try:
             value_int = int(value)
             if value_int <= 0:
-                logging.error("interval_seconds musí být celé číslo větší než 0")
+                logging.error("%s musí být celé číslo větší než 0", key)
                 return
             value = value_int
         except ValueError:
-            logging.error("interval_seconds musí být celé číslo")
+            logging.error("%s musí být celé číslo", key)
+            return
+    elif key in (
+        "connect_timeout",
+        "read_timeout",
+        "batch_linger_seconds",
+        "session_max_age_seconds",
+    ):
+        try:
+            value_float = float(value)
+            if value_float <= 0:
+                logging.error("%s musí být číslo větší než 0", key)
+                return
+            value = value_float
+        except ValueError:
+            logging.error("%s musí být číslo", key)
+            return
+    elif key in ("session_max_messages", "delta_resync_cycles", "log_backup_count"):
+        try:
+            value_int = int(value)
+            if value_int < 0:
+                logging.error("%s nesmí být záporné (0 = vypnuto)", key)
+                return
+            value = value_int
+        except ValueError:
+            logging.error("%s musí být celé číslo", key)
+            return
+    elif key in (
+        "send_jitter_seconds",
+        "metrics_sample_seconds",
+        "log_rotate_seconds",
+    ):
+        try:
+            value_float = float(value)
+            if value_float < 0:
+                logging.error("%s nesmí být záporné", key)
+                return
+            value = value_float
+        except ValueError:
+            logging.error("%s musí být číslo", key)
+            return
+    elif key == "log_level":
+        value = value.upper()
+        if value not in config.LOG_LEVELS:
+            logging.error(
+                "log_level musí být jedno z: %s", ", ".join(config.LOG_LEVELS)
+            )
+            return
+    elif key == "compression":
+        if value not in ("none", "zlib"):
+            logging.error("compression musí být 'none' nebo 'zlib'")
+            return
+    elif key == "wire_format":
+        if value not in ("json", "binary"):
+            logging.error("wire_format musí být 'json' nebo 'binary'")
+            return
+    elif key == "phase_metrics_export":
+        if value not in ("none", "prometheus", "json"):
+            logging.error(
+                "phase_metrics_export musí být 'none', 'prometheus' nebo 'json'"
+            )
+            return
+    elif key == "phase_metrics_report":
+        if value not in ("none", "summary"):
+            logging.error("phase_metrics_report musí být 'none' nebo 'summary'")
             return
     elif key == "server_url":
         # Basic URL validation
@@ -46,7 +130,53 @@ def set_value(args):  # args parameter for consistency
     cfg[key] = value
     config.save(cfg)
     logging.info("✓ Nastaveno: %s = %s", key, value)
-    logging.info("\nRestartuj službu pro aktivaci změn")
+    if key in config.HOT_RELOAD_KEYS:
+        logging.info("\nBěžící služba změnu převezme během několika sekund")
+    else:
+        logging.info("\nRestartuj službu pro aktivaci změn")
+
+
+def profile(args):
+    """Spustí několik cyklů agenta pod cProfile a tracemalloc a uloží výsledky."""
+    import asyncio
+    import tempfile
+
+    from lib.profiling import profile_run
+
+    from src.main import Agent
+
+    if args.cycles <= 0:
+        logging.error("--cycles musí být celé číslo větší než 0")
+        return
+    output_dir = args.output or (
+        config.CONFIG_DIR / "profiles" / time.strftime("%Y%m%d-%H%M%S")
+    )
+    transport = None
+    if args.dry_run:
+        from lib.dry_run_transport import DryRunTransport
+
+        transport = DryRunTransport()
+
+    # Outbox, cache klíče ani základ delt běžící služby se nesmí použít ani změnit
+    with tempfile.TemporaryDirectory(prefix="mastiff-profile-") as state_dir:
+        agent = Agent(transport=transport, state_dir=state_dir)
+
+        async def run_cycles():
+            for _ in range(args.cycles):
+                await agent.start_agent_async()
+            await agent.flush_reports_async()
+
+        def run():
+            try:
+                asyncio.run(run_cycles())
+            finally:
+                agent.close()
+
+        logging.info("Profiluji %d cyklů agenta...", args.cycles)
+        summary = profile_run(run, output_dir, top=args.top)
+
+    logging.info(summary)
+    logging.info("✓ Profil uložen do %s", output_dir)
 
 
 def main():
@@ -57,8 +187,7 @@ def main():
     )
     parser.add_argument(
         "--version",
-        action="version",
-        version=f"%(prog)s {config.load().get('version', 'unknown')}",
+        action=VersionAction,
         help="Zobrazí verzi agenta.",
     )
 
@@ -80,12 +209,61 @@ def main():
     )
     set_parser.add_argument(
         "key",
-        choices=["server_url", "interval_seconds", "log_level", "auth_token"],
-        help="Název konfiguračního klíče (server_url, interval_seconds, log_level, auth_token).",
+        choices=[
+            "server_url",
+            "interval_seconds",
+            "log_level",
+            "auth_token",
+            "connect_timeout",
+            "read_timeout",
+            "batch_size",
+            "batch_linger_seconds",
+            "compression",
+            "compression_threshold",
+            "wire_format",
+            "send_jitter_seconds",
+            "session_max_messages",
+            "session_max_age_seconds",
+            "delta_resync_cycles",
+            "metrics_sample_seconds",
+            "phase_metrics_export",
+            "phase_metrics_report",
+            "log_max_bytes",
+            "log_backup_count",
+            "log_rotate_seconds",
+        ],
+        help="Název konfiguračního klíče.",
     )
     set_parser.add_argument("value", help="Nová hodnota pro daný konfigurační klíč.")
     set_parser.set_defaults(func=set_value)
 
+    # Profile command
+    profile_parser = subparsers.add_parser(
+        "profile",
+        help="Změří, co agent na tomto stroji zatěžuje (CPU a paměť).",
+        description=(
+            "Spustí N cyklů agenta pod cProfile a tracemalloc. Uloží profil "
+            "(agent.prof) a souhrn nejdražších funkcí a alokací (summary.txt)."
+        ),
+    )
+    profile_parser.add_argument(
+        "--cycles", type=int, default=10, help="Počet cyklů agenta (výchozí 10)."
+    )
+    profile_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Nic neposílat na server - zprávy se jen zašifrují a zahodí.",
+    )
+    profile_parser.add_argument(
+        "--top", type=int, default=20, help="Počet položek v souhrnu (výchozí 20)."
+    )
+    profile_parser.add_argument(
+        "--output",
+        type=Path,
+        help="Adresář pro výsledky (výchozí ProgramData\\Mastiff\\profiles\\<čas>).",
+    )
+    profile_parser.set_defaults(func=profile)
+
     args = parser.parse_args()
 
     if args.command:  # Ensure a command was passed
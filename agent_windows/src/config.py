@@ -1,10 +1,182 @@
 import json
+import logging
 import os
 from pathlib import Path
+from urllib.parse import urlsplit
 
 CONFIG_DIR = Path(os.getenv("PROGRAMDATA", ".")) / "Mastiff"
 CONFIG_FILE = CONFIG_DIR / "config.json"
 
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+def _positive(value):
+    return value > 0
+
+
+def _non_negative(value):
+    return value >= 0
+
+
+def _one_of(*allowed):
+    return lambda value: value in allowed
+
+
+def _http_url(value):
+    try:
+        parts = urlsplit(value)
+    except ValueError:
+        return False
+    return parts.scheme in ("http", "https") and bool(parts.hostname)
+
+
+# Klíč -> (typ, výchozí hodnota, kontrola hodnoty)
+FIELDS = {
+    "server_url": (str, "http://localhost:8000", _http_url),
+    "auth_token": (str, "", None),
+    "log_level": (str, "INFO", _one_of(*LOG_LEVELS)),
+    "interval_seconds": (int, 60, _positive),
+    "send_jitter_seconds": (float, 0.0, _non_negative),
+    "connect_timeout": (float, 5.0, _positive),
+    "read_timeout": (float, 30.0, _positive),
+    "public_key_ttl_seconds": (float, 24 * 3600.0, _positive),
+    "batch_size": (int, 1, _positive),
+    "batch_linger_seconds": (float, 300.0, _positive),
+    "compression": (str, "none", _one_of("none", "zlib")),
+    "compression_threshold": (int, 1024, _positive),
+    "wire_format": (str, "json", _one_of("json", "binary")),
+    "session_max_messages": (int, 0, _non_negative),
+    "session_max_age_seconds": (float, 3600.0, _positive),
+    "outbox_max_bytes": (int, 50 * 1024 * 1024, _non_negative),
+    "retry_max_attempts": (int, 3, _positive),
+    "retry_base_delay": (float, 1.0, _non_negative),
+    "retry_max_delay": (float, 30.0, _non_negative),
+    "circuit_failure_threshold": (int, 5, _positive),
+    "circuit_reset_seconds": (float, 60.0, _positive),
+    "delta_resync_cycles": (int, 0, _non_negative),
+    "metrics_sample_seconds": (float, 5.0, _non_negative),
+    "phase_metrics_export": (str, "prometheus", _one_of("none", "prometheus", "json")),
+    "phase_metrics_report": (str, "none", _one_of("none", "summary")),
+    "log_max_bytes": (int, 10 * 1024 * 1024, _positive),
+    "log_backup_count": (int, 5, _non_negative),
+    "log_rotate_seconds": (float, 24 * 3600.0, _non_negative),
+}
+
+# Klíče, jejichž změnu běžící agent převezme bez restartu
+HOT_RELOAD_KEYS = frozenset(
+    {
+        "server_url",
+        "auth_token",
+        "log_level",
+        "interval_seconds",
+        "send_jitter_seconds",
+        "batch_size",
+        "batch_linger_seconds",
+    }
+)
+
+
+class AgentConfig:
+    """
+    Naparsovaná a zvalidovaná konfigurace. Neplatná hodnota se nahradí
+    výchozí (s varováním), případně hodnotou z fallback configu, neznámé
+    klíče se zachovají v extra.
+    """
+
+    __slots__ = (*FIELDS, "extra")
+
+    def __init__(self, **values):
+        for key, (_, default, _) in FIELDS.items():
+            setattr(self, key, values.get(key, default))
+        self.extra = {}
+
+    @classmethod
+    def from_dict(
+        cls, raw: dict, fallback: "AgentConfig | None" = None
+    ) -> "AgentConfig":
+        values = {}
+        for key, (type_, default, check) in FIELDS.items():
+            if key not in raw:
+                continue
+            if fallback is not None:
+                default = getattr(fallback, key)
+            try:
+                if isinstance(raw[key], bool):
+                    raise TypeError("bool")
+                value = type_(raw[key])
+                if key == "log_level":
+                    value = value.upper()
+                if check is not None and not check(value):
+                    raise ValueError(value)
+            except (TypeError, ValueError):
+                logging.warning(
+                    "Neplatná hodnota %s=%r v konfiguraci, použije se %r",
+                    key,
+                    raw[key],
+                    default,
+                )
+                value = default
+            values[key] = value
+
+        config = cls(**values)
+        config.extra = {key: value for key, value in raw.items() if key not in FIELDS}
+        return config
+
+    def get(self, key, default=None):
+        if key in FIELDS:
+            return getattr(self, key)
+        return self.extra.get(key, default)
+
+    def to_dict(self) -> dict:
+        return {**{key: getattr(self, key) for key in FIELDS}, **self.extra}
+
+    def changed_keys(self, other: "AgentConfig") -> list[str]:
+        return [key for key in FIELDS if getattr(self, key) != getattr(other, key)]
+
+
+class ConfigManager:
+    """
+    Drží naparsovaný config a znovu ho načte jen tehdy, když se soubor
+    změnil (podle mtime a velikosti) - kontrola je jeden stat.
+    """
+
+    def __init__(self):
+        self._stamp = None
+        self._config = None
+
+    @property
+    def config(self) -> AgentConfig:
+        if self._config is None:
+            self._stamp = self._file_stamp()
+            self._config = AgentConfig.from_dict(load())
+        return self._config
+
+    def reload_if_changed(self) -> AgentConfig | None:
+        """Vrací nový config, pokud se soubor změnil, jinak None."""
+        stamp = self._file_stamp()
+        if self._config is not None and stamp == self._stamp:
+            return None
+        if self._config is not None and stamp is None:
+            # Smazaný soubor není změna - load() by založil výchozí config
+            # s nenastaveným serverem
+            return None
+        try:
+            raw = load()
+        except (OSError, ValueError) as e:
+            logging.warning("Config se nepodařilo načíst, ponechávám původní: %s", e)
+            return None
+        self._stamp = stamp
+        # Neplatná hodnota za běhu ponechá tu dosavadní, ne výchozí
+        self._config = AgentConfig.from_dict(raw, fallback=self._config)
+        return self._config
+
+    def _file_stamp(self):
+        try:
+            stat = CONFIG_FILE.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
 
 def load():
     """Načte config, pokud neexistuje vytvoř prázdný"""
@@ -24,7 +196,11 @@ def load():
 
 
 def save(config):
-    """Uloží config"""
+    """Uloží config atomicky - čtenář nikdy neuvidí napůl zapsaný soubor"""
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    with open(CONFIG_FILE, "w") as f:
+    tmp_file = CONFIG_FILE.with_suffix(".tmp")
+    with open(tmp_file, "w") as f:
         json.dump(config, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, CONFIG_FILE)
@@ -0,0 +1,52 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from lib.message_sender import MessageSender
+
+
+class AsyncMessageSender:
+    """
+    Asynchronní varianta MessageSender pro asyncio.
+
+    Blokující HTTP volání běží v jednom vyhrazeném vlákně, takže se odesílání
+    nepřekrývá samo se sebou (zachová pořadí zpráv i konzistenci outboxu), ale
+    nezdržuje sběr dat ani šifrování v event loopu.
+    """
+
+    def __init__(self, sender: MessageSender):
+        self._sender = sender
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="agent-send"
+        )
+
+    async def send_message(self, *args, **kwargs) -> bool:
+        return await self._run(self._sender.send_message, *args, **kwargs)
+
+    async def send_batch(self, *args, **kwargs) -> bool:
+        return await self._run(self._sender.send_batch, *args, **kwargs)
+
+    async def send_envelope(self, *args, **kwargs) -> bool:
+        return await self._run(self._sender.send_envelope, *args, **kwargs)
+
+    async def send_batch_envelope(self, *args, **kwargs) -> bool:
+        return await self._run(self._sender.send_batch_envelope, *args, **kwargs)
+
+    async def send_stream(self, *args, **kwargs) -> bool:
+        return await self._run(self._sender.send_stream, *args, **kwargs)
+
+    async def flush_outbox(self) -> int:
+        return await self._run(self._sender.flush_outbox)
+
+    async def run_exclusive(self, func, *args):
+        """Spustí func ve vlákně odesílání - neběží souběžně s žádným odesíláním."""
+        return await self._run(func, *args)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(func, *args, **kwargs)
+        )
@@ -0,0 +1,194 @@
+import logging
+import multiprocessing
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing.pool import AsyncResult, ThreadPool
+from typing import Callable
+
+# Politiky obnovy výsledku kolektoru
+STATIC = "static"  # jednou za běh procesu
+TTL = "ttl"  # znovu po uplynutí ttl sekund
+EVERY_CYCLE = "every_cycle"  # v každém cyklu
+
+
+@dataclass(frozen=True)
+class Collector:
+    """
+    Zdroj části reportu; func vrací slovník polí, která přidá do reportu.
+    timeout je časový rozpočet kolektoru (None = výchozí rozpočet registru).
+    """
+
+    name: str
+    func: Callable[[], dict]
+    policy: str = EVERY_CYCLE
+    ttl: float = 0.0
+    timeout: float | None = None
+
+
+class CollectorRegistry:
+    """
+    Registr kolektorů systémových informací s cache podle jejich politiky.
+
+    Výsledky STATIC a TTL kolektorů se drží v cache, dokud nezastarají;
+    záznamy odregistrovaných kolektorů registr sám zahazuje. Kolektor, který
+    selže, se v reportu vynechá a zkusí se znovu v dalším cyklu.
+
+    Kolektory běží souběžně v omezeném poolu vláken. Na každý se čeká nejvýše
+    jeho rozpočet a celý sběr nejvýše deadline sekund. Kolektor, který nestihne
+    limit, do reportu přispěje posledními známými hodnotami (jeho jméno je pak
+    v poli stale_collectors), nebo se vynechá. Jeho výsledek se po doběhnutí
+    uloží pro další cykly a dokud běží, znovu se nespouští.
+    """
+
+    def __init__(
+        self,
+        clock=time.monotonic,
+        max_workers: int = 4,
+        default_timeout: float = 5.0,
+        deadline: float = 10.0,
+    ):
+        self._collectors: dict[str, Collector] = {}
+        self._cache: dict[str, tuple[float, dict]] = {}  # jméno -> (čas, pole)
+        self._running: dict[str, AsyncResult] = {}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.deadline = deadline
+        self._pool: ThreadPool | None = None
+
+    def add(self, collector: Collector):
+        if collector.policy not in (STATIC, TTL, EVERY_CYCLE):
+            raise ValueError(f"Neznámá politika kolektoru: {collector.policy}")
+        with self._lock:
+            self._collectors[collector.name] = collector
+            self._cache.pop(collector.name, None)
+
+    def register(self, name: str, policy: str = EVERY_CYCLE, ttl: float = 0.0):
+        """Dekorátor: zaregistruje funkci jako kolektor."""
+
+        def decorator(func):
+            self.add(Collector(name, func, policy, ttl))
+            return func
+
+        return decorator
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._collectors.pop(name, None)
+            self._cache.pop(name, None)
+
+    def invalidate(self, name: str | None = None):
+        """Zahodí cachované výsledky (všech kolektorů, nebo jen jednoho)."""
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(name, None)
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._collectors)
+
+    def collect(self) -> dict:
+        """Sestaví report v pořadí registrace kolektorů."""
+        with self._lock:
+            collectors = list(self._collectors.values())
+
+        started = time.monotonic()
+        results = {}
+        pending = {}
+        for collector in collectors:
+            values = self._cached(collector)
+            if values is not None:
+                results[collector.name] = values
+            else:
+                pending[collector.name] = self._submit(collector)
+
+        stale = []
+        for collector in collectors:
+            if collector.name not in pending:
+                continue
+            budget = min(
+                (
+                    collector.timeout
+                    if collector.timeout is not None
+                    else self.default_timeout
+                ),
+                self.deadline,
+            )
+            # Rozpočty se počítají od startu sběru, čekání se tedy překrývá
+            remaining = max(0.0, started + budget - time.monotonic())
+            try:
+                results[collector.name] = pending[collector.name].get(remaining)
+            except multiprocessing.TimeoutError:
+                logging.warning(
+                    "Kolektor %s nestihl limit %.1f s", collector.name, budget
+                )
+                last = self._last_values(collector.name)
+                if last is not None:
+                    results[collector.name] = last
+                    stale.append(collector.name)
+            except Exception as e:
+                logging.warning("Kolektor %s selhal: %s", collector.name, e)
+
+        info = {}
+        for collector in collectors:
+            if collector.name in results:
+                info.update(results[collector.name])
+        if stale:
+            info["stale_collectors"] = stale
+        return info
+
+    def close(self):
+        """Ukončí pool; běžící (zaseknuté) kolektory se nečekají."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+
+    def _cached(self, collector: Collector) -> dict | None:
+        if collector.policy == EVERY_CYCLE:
+            return None
+        with self._lock:
+            entry = self._cache.get(collector.name)
+        if entry is None:
+            return None
+        collected_at, values = entry
+        if collector.policy == TTL and self._clock() - collected_at >= collector.ttl:
+            return None
+        return values
+
+    def _last_values(self, name: str) -> dict | None:
+        with self._lock:
+            entry = self._cache.get(name)
+        return entry[1] if entry is not None else None
+
+    def _submit(self, collector: Collector) -> AsyncResult:
+        with self._lock:
+            running = self._running.get(collector.name)
+            if running is not None:
+                # Předchozí běh ještě neskončil - čeká se na něj, nespouští se znovu
+                return running
+            if self._pool is None:
+                # ThreadPool má daemon vlákna: zaseknutý kolektor nebrání
+                # ukončení procesu (na rozdíl od ThreadPoolExecutor)
+                self._pool = ThreadPool(self.max_workers)
+            # _run potřebuje zámek, takže se z _running odebere až po vložení
+            result = self._pool.apply_async(self._run, (collector,))
+            self._running[collector.name] = result
+            return result
+
+    def _run(self, collector: Collector) -> dict:
+        try:
+            values = collector.func()
+            with self._lock:
+                # Mezitím odregistrovaný kolektor už do cache nepatří; i výsledky
+                # EVERY_CYCLE se drží jako poslední známé hodnoty
+                if self._collectors.get(collector.name) is collector:
+                    self._cache[collector.name] = (self._clock(), values)
+            return values
+        finally:
+            with self._lock:
+                self._running.pop(collector.name, None)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+
+class DeltaTracker:
+    """
+    Pamatuje si poslední snapshot, který server potvrdil, a místo celého
+    reportu připraví jen změněná pole vůči němu.
+
+    Delta nese hash základu (base_hash) i hash výsledného snapshotu; server ji
+    aplikuje na snapshot se stejným hashem. Plný snapshot se pošle, když základ
+    chybí, po resync_cycles reportech nebo po reset() (nesoulad hashů na serveru).
+    Se state_file přežije základ i restart procesu.
+    """
+
+    def __init__(self, resync_cycles: int, state_file: Path | None = None):
+        self.resync_cycles = resync_cycles
+        self.state_file = state_file
+        self._base: dict | None = None
+        self._base_hash: str | None = None
+        self._deltas_since_full = 0
+        self._lock = threading.Lock()
+        self._load_state()
+
+    @staticmethod
+    def snapshot_hash(snapshot: dict) -> str:
+        canonical = json.dumps(
+            snapshot, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def prepare(self, snapshot: dict) -> tuple[dict, bool]:
+        """Vrací (obsah zprávy, je_plný). Plný obsah je snapshot beze změny."""
+        with self._lock:
+            if self._base is None or self._deltas_since_full + 1 >= self.resync_cycles:
+                return snapshot, True
+
+            changed = {
+                key: value
+                for key, value in snapshot.items()
+                if key not in self._base or self._base[key] != value
+            }
+            removed = [key for key in self._base if key not in snapshot]
+            return {
+                "base_hash": self._base_hash,
+                "hash": self.snapshot_hash(snapshot),
+                "changed": changed,
+                "removed": removed,
+            }, False
+
+    def acknowledge(self, snapshot: dict, full: bool):
+        """Server snapshot přijal - stává se základem pro další delty."""
+        with self._lock:
+            self._base = dict(snapshot)
+            self._base_hash = self.snapshot_hash(snapshot)
+            self._deltas_since_full = 0 if full else self._deltas_since_full + 1
+            state = {
+                "hash": self._base_hash,
+                "snapshot": self._base,
+                "deltas_since_full": self._deltas_since_full,
+            }
+        self._save_state(state)
+
+    def reset(self):
+        """Zahodí základ; další report bude plný."""
+        with self._lock:
+            self._base = None
+            self._base_hash = None
+            self._deltas_since_full = 0
+        self._save_state(None)
+
+    def _load_state(self):
+        if self.state_file is None:
+            return
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+            snapshot = state["snapshot"]
+            if self.snapshot_hash(snapshot) != state["hash"]:
+                raise ValueError("hash mismatch")
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning("Ignoruji neplatný uložený stav delt: %s", e)
+            return
+        self._base = snapshot
+        self._base_hash = state["hash"]
+        self._deltas_since_full = state.get("deltas_since_full", 0)
+
+    def _save_state(self, state: dict | None):
+        if self.state_file is None:
+            return
+        try:
+            if state is None:
+                self.state_file.unlink(missing_ok=True)
+                return
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix(".tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logging.warning("Stav delt nelze uložit: %s", e)
@@ -0,0 +1,58 @@
+import json
+import threading
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+class DryRunResponse:
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = body
+
+    def json(self) -> dict:
+        return self._body
+
+    def raise_for_status(self):
+        pass
+
+
+class DryRunTransport:
+    """
+    Náhrada HttpTransport, která nic neposílá po síti: vrací vlastní veřejný
+    klíč a každý POST přijme. Tělo požadavku ale sestaví stejně jako requests
+    (JSON se serializuje, stream se přečte), aby profil odpovídal skutečnosti.
+    """
+
+    def __init__(self, key_size: int = 2048):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+        public_pem = private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        self._key_body = {"public_key_pem": public_pem.decode("utf-8")}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+
+    def get(self, url: str, **kwargs) -> DryRunResponse:
+        return DryRunResponse(200, self._key_body)
+
+    def post(self, url: str, **kwargs) -> DryRunResponse:
+        if "json" in kwargs:
+            size = len(json.dumps(kwargs["json"]).encode("utf-8"))
+        elif isinstance(kwargs.get("data"), bytes):
+            size = len(kwargs["data"])
+        else:
+            size = sum(len(chunk) for chunk in kwargs.get("data") or ())
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+        return DryRunResponse(200, {})
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
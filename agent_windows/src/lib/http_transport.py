@@ -0,0 +1,47 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpTransport:
+    """
+    Sdílený HTTP transport pro komunikaci se serverem.
+
+    Drží jednu requests.Session s poolem keep-alive spojení, takže TCP/TLS
+    handshake (a DNS dotaz) proběhne jen při otevření nového spojení, ne pro
+    každou zprávu. Každý požadavek má connect/read timeout.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        pool_maxsize: int = 4,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self._pool_maxsize = pool_maxsize
+        self._session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self._pool_maxsize, max_retries=0
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self._session.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self._session.post(url, **kwargs)
+
+    def reset(self):
+        """Zavře všechna spojení v poolu a založí novou session."""
+        self._session.close()
+        self._session = self._create_session()
+
+    def close(self):
+        self._session.close()
@@ -0,0 +1,28 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # volitelná závislost - bez ní se použije standardní json
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(obj) -> bytes:
+    """
+    Serializuje obj do UTF-8 JSON bajtů (bez \\u escapování, jako
+    ensure_ascii=False). Výstup obou backendů je pro server ekvivalentní.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson odmítá např. int nad 64 bitů nebo klíče jiné než str
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes | str):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
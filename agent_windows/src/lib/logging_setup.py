@@ -0,0 +1,86 @@
+import gzip
+import logging
+import os
+import queue
+import shutil
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class RotatingLogHandler(RotatingFileHandler):
+    """
+    Rotace logu podle velikosti (max_bytes) i stáří (rotate_seconds, 0 = jen
+    podle velikosti). Starší soubory se komprimují gzipem jako agent_info.log.1.gz
+    a drží se jich backup_count.
+    """
+
+    def __init__(
+        self,
+        filename: Path,
+        max_bytes: int,
+        backup_count: int,
+        rotate_seconds: float = 0.0,
+        clock=time.time,
+    ):
+        super().__init__(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+        self.rotate_seconds = rotate_seconds
+        self._clock = clock
+        self._rollover_at = clock() + rotate_seconds
+        self.namer = lambda name: name + ".gz"
+        self.rotator = _gzip_rotator
+
+    def shouldRollover(self, record):
+        if self.rotate_seconds and self._clock() >= self._rollover_at:
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+                return True
+            self._rollover_at = self._clock() + self.rotate_seconds
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self._rollover_at = self._clock() + self.rotate_seconds
+
+
+def configure_logging(
+    log_file: Path,
+    level: str = "INFO",
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    rotate_seconds: float = 0.0,
+) -> QueueListener:
+    """
+    Nastaví root logger tak, aby volající vlákno jen vložilo záznam do fronty;
+    zápis na disk (i rotaci a kompresi) dělá vlákno QueueListeneru. Pomalý disk
+    tak nezdrží cyklus agenta. Vrací spuštěný listener - při ukončení zavolej
+    stop(), aby se dopsaly čekající záznamy.
+    """
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = RotatingLogHandler(log_file, max_bytes, backup_count, rotate_seconds)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
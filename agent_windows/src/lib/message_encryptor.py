@@ -1,39 +1,338 @@
 import base64
-import json
 import os
+import threading
 import time
+import zlib
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator
 
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from lib import json_codec
+from lib.phase_metrics import PhaseMetrics, timed
+
+COMPRESSION_ZLIB = "zlib"
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class EncryptedEnvelope:
+    """
+    Encrypted message; `compression` names the codec applied before encryption.
+
+    In session-key mode `session_id` is set and the session ID is
+    authenticated as AES-GCM associated data. Every message of the session
+    carries the same RSA-wrapped key (wrapped once, then cached), so the
+    server can unwrap it on a session-cache miss - e.g. after a restart or
+    when a message is replayed from the outbox.
+    """
+
+    encrypted_key: bytes
+    nonce: bytes
+    ciphertext: bytes
+    compression: str | None = None
+    session_id: str | None = None
+
+    def as_b64(self) -> tuple[str, str, str]:
+        return (
+            base64.b64encode(self.encrypted_key).decode("utf-8"),
+            base64.b64encode(self.nonce).decode("utf-8"),
+            base64.b64encode(self.ciphertext).decode("utf-8"),
+        )
+
+
+@dataclass(frozen=True)
+class EncryptedStream:
+    """
+    Chunked AES-GCM encryption of a large payload.
+
+    `chunks` yields one ciphertext (with its own GCM tag) per chunk. The first
+    chunk holds the JSON metadata (timestamp, auth token); the nonce of chunk i
+    is nonce_prefix (7 B) + i (4 B, big-endian) + a final-chunk flag (1 B), so
+    reordered, dropped or truncated chunks fail authentication.
+    """
+
+    encrypted_key: bytes
+    nonce_prefix: bytes
+    chunks: Iterator[bytes]
+
+
+def stream_nonce(nonce_prefix: bytes, index: int, last: bool) -> bytes:
+    return nonce_prefix + index.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+
+class _KeySession:
+    def __init__(self, public_key: RSAPublicKey, wrapped_key: bytes, aes_key: bytes):
+        self.public_key = public_key
+        self.public_numbers = public_key.public_numbers()
+        self.wrapped_key = wrapped_key
+        self.aesgcm = AESGCM(aes_key)
+        self.session_id = os.urandom(16).hex()
+        self.nonce_prefix = os.urandom(4)
+        self.counter = 0
+        self.created_at = time.monotonic()
+
+    def next_nonce(self) -> bytes:
+        # 4B náhodný prefix + 8B čítač: nonce se v rámci klíče nikdy neopakuje
+        nonce = self.nonce_prefix + self.counter.to_bytes(8, "big")
+        self.counter += 1
+        return nonce
 
 
 class MessageEncryptor:
+    def __init__(
+        self,
+        compression: str | None = None,
+        compression_threshold: int = 1024,
+        session_max_messages: int = 0,
+        session_max_age: float = 3600.0,
+        metrics: PhaseMetrics | None = None,
+    ):
+        """
+        compression: None or "zlib". Plaintexts shorter than compression_threshold
+        bytes are sent uncompressed.
+
+        session_max_messages > 0 enables session-key mode: one AES key is
+        RSA-wrapped once and reused (together with its wrap) until it has
+        encrypted that many messages, is older than session_max_age seconds,
+        or the public key changes.
+
+        With `metrics`, serialization, compression, AES encryption and RSA wrap
+        are timed as separate phases and plaintext/ciphertext sizes are counted.
+        """
+        if compression not in (None, COMPRESSION_ZLIB):
+            raise ValueError(f"Nepodporovaná komprese: {compression}")
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.session_max_messages = session_max_messages
+        self.session_max_age = session_max_age
+        self.metrics = metrics
+        self._session: _KeySession | None = None
+        self._session_lock = threading.Lock()
+
     def encrypt_message(
-        self, content: dict, auth_token: str, public_key: RSAPublicKey
+        self, content: dict | bytes, auth_token: str, public_key: RSAPublicKey
     ) -> tuple[str, str, str]:
         """
         Encrypts a message using AES-GCM and encrypts the AES key with RSA-OAEP.
 
+        `content` is a dict or an already encoded UTF-8 JSON document (bytes),
+        which is embedded into the plaintext as is, without re-serializing.
+
         Returns a tuple: (encrypted_key_b64, nonce_b64, ciphertext_b64)
         """
-        # 2) Vygeneruj náhodný AES klíč a nonce
+        # Tuple nenese příznak komprese ani session, proto vždy starý formát
+        return self._seal(
+            self._message_plaintext(content, auth_token), public_key, legacy=True
+        ).as_b64()
+
+    def seal_message(
+        self, content: dict | bytes, auth_token: str, public_key: RSAPublicKey
+    ) -> EncryptedEnvelope:
+        """Like encrypt_message, but with configured compression and session keys."""
+        return self._seal(
+            self._message_plaintext(content, auth_token), public_key, legacy=False
+        )
+
+    def encrypt_batch(
+        self,
+        reports: list[tuple[dict | bytes, int]],
+        auth_token: str,
+        public_key: RSAPublicKey,
+    ) -> tuple[str, str, str]:
+        """
+        Encrypts several reports as one message - one AES key, one RSA-OAEP wrap.
+
+        `reports` is a list of (content, client_timestamp) pairs in the order
+        they were collected. Returns the same tuple as encrypt_message.
+        """
+        return self._seal(
+            self._batch_plaintext(reports, auth_token), public_key, legacy=True
+        ).as_b64()
+
+    def seal_batch(
+        self,
+        reports: list[tuple[dict | bytes, int]],
+        auth_token: str,
+        public_key: RSAPublicKey,
+    ) -> EncryptedEnvelope:
+        """Like encrypt_batch, but with configured compression and session keys."""
+        return self._seal(
+            self._batch_plaintext(reports, auth_token), public_key, legacy=False
+        )
+
+    def encrypt_stream(
+        self,
+        source: BinaryIO,
+        auth_token: str,
+        public_key: RSAPublicKey,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> EncryptedStream:
+        """
+        Encrypts a binary file-like object chunk by chunk.
+
+        Nothing is read until the returned chunks are consumed, and at most two
+        chunks are held in memory at a time, whatever the payload size.
+        """
+        aes_key = os.urandom(32)
+        nonce_prefix = os.urandom(7)
+        header = json_codec.dumps(
+            {"client_timestamp": int(time.time()), "auth_token": auth_token}
+        )
+        with timed(self.metrics, "rsa_wrap"):
+            encrypted_key = self._wrap_key(aes_key, public_key)
+        return EncryptedStream(
+            encrypted_key,
+            nonce_prefix,
+            self._stream_chunks(
+                AESGCM(aes_key), nonce_prefix, header, source, chunk_size
+            ),
+        )
+
+    @staticmethod
+    def _stream_chunks(
+        aesgcm: AESGCM,
+        nonce_prefix: bytes,
+        header: bytes,
+        source: BinaryIO,
+        chunk_size: int,
+    ) -> Iterator[bytes]:
+        yield aesgcm.encrypt(stream_nonce(nonce_prefix, 0, False), header, None)
+
+        index = 1
+        current = source.read(chunk_size)
+        while True:
+            # Čte se o kus dopředu, aby se poznal poslední chunk
+            following = source.read(chunk_size) if current else b""
+            last = not following
+            yield aesgcm.encrypt(stream_nonce(nonce_prefix, index, last), current, None)
+            if last:
+                return
+            index += 1
+            current = following
+
+    def reset_session(self):
+        """Zahodí session klíč; další zpráva založí novou session (nový RSA wrap)."""
+        with self._session_lock:
+            self._session = None
+
+    def _message_plaintext(self, content: dict | bytes, auth_token: str) -> bytes:
+        # Plaintext {"content", "client_timestamp", "auth_token"} se skládá
+        # z bajtů - už serializovaný obsah se jen vloží, znovu se nekóduje.
+        # Fáze serialize se měří jen u dict; bajty změřil ten, kdo je kódoval
+        if not isinstance(content, (bytes, bytearray, memoryview)):
+            with timed(self.metrics, "serialize"):
+                content = json_codec.dumps(content)
+        return b"".join((b'{"content":', content, self._plaintext_tail(auth_token)))
+
+    def _batch_plaintext(
+        self, reports: list[tuple[dict | bytes, int]], auth_token: str
+    ) -> bytes:
+        with timed(self.metrics, "serialize"):
+            items = b",".join(
+                b'{"content":%b,"client_timestamp":%d}'
+                % (self._encoded(content), client_timestamp)
+                for content, client_timestamp in reports
+            )
+            return b'{"batch":[' + items + b"]" + self._plaintext_tail(auth_token)
+
+    @staticmethod
+    def _encoded(content: dict | bytes) -> bytes:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return content
+        return json_codec.dumps(content)
+
+    @staticmethod
+    def _plaintext_tail(auth_token: str) -> bytes:
+        return b',"client_timestamp":%d,"auth_token":%b}' % (
+            int(time.time()),
+            json_codec.dumps(auth_token),
+        )
+
+    def _seal(
+        self, plaintext_bytes: bytes, public_key: RSAPublicKey, legacy: bool
+    ) -> EncryptedEnvelope:
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.add_bytes("plaintext", len(plaintext_bytes))
+        compression = None
+        if (
+            not legacy
+            and self.compression == COMPRESSION_ZLIB
+            and len(plaintext_bytes) >= self.compression_threshold
+        ):
+            with timed(metrics, "compress"):
+                compressed = zlib.compress(plaintext_bytes)
+            # Nekomprimovatelná data se posílají tak, jak jsou
+            if len(compressed) < len(plaintext_bytes):
+                plaintext_bytes = compressed
+                compression = COMPRESSION_ZLIB
+
+        if not legacy and self.session_max_messages > 0:
+            return self._seal_in_session(plaintext_bytes, public_key, compression)
+
+        # Vygeneruj náhodný AES klíč a nonce
         aes_key = os.urandom(32)  # 256-bit
         nonce = os.urandom(12)  # 96-bit pro GCM
 
-        # 3) Připrav plaintext s časem a obsahem, pak zašifruj přes AES-GCM
-        plaintext_obj = {
-            "content": content,
-            "client_timestamp": int(time.time()),
-            "auth_token": auth_token,
-        }
-        plaintext_bytes = json.dumps(plaintext_obj, ensure_ascii=False).encode("utf-8")
-        aesgcm = AESGCM(aes_key)
-        ciphertext = aesgcm.encrypt(nonce, plaintext_bytes, None)
-
-        # 4) Zašifruj AES klíč veřejným RSA klíčem serveru
-        enc_key = public_key.encrypt(
+        # Zašifruj plaintext přes AES-GCM
+        with timed(metrics, "encrypt"):
+            aesgcm = AESGCM(aes_key)
+            ciphertext = aesgcm.encrypt(nonce, plaintext_bytes, None)
+
+        # Zašifruj AES klíč veřejným RSA klíčem serveru
+        with timed(metrics, "rsa_wrap"):
+            enc_key = self._wrap_key(aes_key, public_key)
+
+        if metrics is not None:
+            metrics.add_bytes("ciphertext", len(ciphertext))
+        return EncryptedEnvelope(enc_key, nonce, ciphertext, compression)
+
+    def _seal_in_session(
+        self, plaintext_bytes: bytes, public_key: RSAPublicKey, compression: str | None
+    ) -> EncryptedEnvelope:
+        with self._session_lock:
+            session = self._session
+            is_new = session is None or self._session_expired(session, public_key)
+            if is_new:
+                aes_key = os.urandom(32)
+                with timed(self.metrics, "rsa_wrap"):
+                    wrapped_key = self._wrap_key(aes_key, public_key)
+                session = _KeySession(public_key, wrapped_key, aes_key)
+                self._session = session
+            nonce = session.next_nonce()
+
+        with timed(self.metrics, "encrypt"):
+            ciphertext = session.aesgcm.encrypt(
+                nonce, plaintext_bytes, session.session_id.encode("ascii")
+            )
+        if self.metrics is not None:
+            self.metrics.add_bytes("ciphertext", len(ciphertext))
+        # Zabalený klíč jde s každou zprávou: server ho rozbalí jen tehdy,
+        # když session nezná (restart, zpráva z outboxu)
+        return EncryptedEnvelope(
+            session.wrapped_key,
+            nonce,
+            ciphertext,
+            compression,
+            session.session_id,
+        )
+
+    def _session_expired(self, session: _KeySession, public_key: RSAPublicKey) -> bool:
+        if session.counter >= self.session_max_messages:
+            return True
+        if time.monotonic() - session.created_at >= self.session_max_age:
+            return True
+        return (
+            public_key is not session.public_key
+            and public_key.public_numbers() != session.public_numbers
+        )
+
+    @staticmethod
+    def _wrap_key(aes_key: bytes, public_key: RSAPublicKey) -> bytes:
+        return public_key.encrypt(
             aes_key,
             padding.OAEP(
                 mgf=padding.MGF1(algorithm=hashes.SHA256()),
@@ -41,9 +340,3 @@ class MessageEncryptor:
                 label=None,
             ),
         )
-
-        encrypted_key_b64 = base64.b64encode(enc_key).decode("utf-8")
-        nonce_b64 = base64.b64encode(nonce).decode("utf-8")
-        ciphertext_b64 = base64.b64encode(ciphertext).decode("utf-8")
-
-        return encrypted_key_b64, nonce_b64, ciphertext_b64
@@ -1,13 +1,59 @@
 import json
 import logging
+import time
+from typing import Iterable
 
 import requests
+from lib.http_transport import HttpTransport
+from lib.message_encryptor import EncryptedEnvelope, EncryptedStream
+from lib.outbox import DISCARDED, Outbox
+from lib.phase_metrics import PhaseMetrics, timed
+from lib.retry_policy import CircuitBreaker, RetryPolicy, parse_retry_after
+from lib.wire_format import (
+    CONTENT_TYPE_BINARY,
+    CONTENT_TYPE_JSON,
+    WIRE_FORMAT_BINARY,
+    WIRE_FORMAT_JSON,
+    encode_frame,
+    encode_stream,
+)
+
+
+class MessageRejectedError(requests.exceptions.RequestException):
+    """
+    Server zprávu odmítl s kódem důvodu (HTTP 409, tělo {"error": "<reason>"}),
+    např. "unknown_session". Agent na něj reaguje obnovou stavu.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(f"Server zprávu odmítl: {reason}")
+        self.reason = reason
 
 
 class MessageSender:
-    def __init__(self, server_url: str, agent_id: str):
+    def __init__(
+        self,
+        server_url: str,
+        agent_id: str,
+        transport: HttpTransport | None = None,
+        outbox: Outbox | None = None,
+        wire_format: str = WIRE_FORMAT_JSON,
+        retry_policy: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        metrics: PhaseMetrics | None = None,
+    ):
+        if wire_format not in (WIRE_FORMAT_JSON, WIRE_FORMAT_BINARY):
+            raise ValueError(f"Nepodporovaný formát zpráv: {wire_format}")
         self.server_url = server_url
         self.agent_id = agent_id
+        self.wire_format = wire_format
+        self._transport = transport or HttpTransport()
+        self._outbox = outbox
+        # Bez politiky se odesílá jediným pokusem
+        self._retry_policy = retry_policy or RetryPolicy(max_attempts=1)
+        self._circuit_breaker = circuit_breaker
+        self._metrics = metrics
+        self._sleep = time.sleep
 
     def send_message(
         self,
@@ -19,8 +65,9 @@ class MessageSender:
         client_os: str,
         client_state: str,
         client_points: int,
+        compression: str | None = None,
+        session_id: str | None = None,
     ):
-        headers = {"Content-Type": "application/json"}
         payload = {
             "agent_id": self.agent_id,
             "client_ip": client_ip,
@@ -31,27 +78,298 @@ class MessageSender:
             "nonce": nonce_b64,
             "ciphertext": ciphertext_b64,
         }
+        if compression:
+            payload["compression"] = compression
+        if session_id:
+            payload["session_id"] = session_id
 
-        try:
-            response = requests.post(
-                f"{self.server_url}/api/message", headers=headers, json=payload
+        return self._deliver_message(payload, message_count)
+
+    def send_envelope(
+        self,
+        envelope: EncryptedEnvelope,
+        client_ip: str,
+        message_count: int,
+        client_os: str,
+        client_state: str,
+        client_points: int,
+    ):
+        """Pošle obálku ve formátu wire_format (JSON s base64, nebo binární rámec)."""
+        if self.wire_format == WIRE_FORMAT_JSON:
+            return self.send_message(
+                *envelope.as_b64(),
+                client_ip,
+                message_count,
+                client_os,
+                client_state,
+                client_points,
+                compression=envelope.compression,
+                session_id=envelope.session_id,
             )
 
-            if response.status_code == 200:
-                logging.info(
-                    "%s: Zpráva doručena - Celkem odesláno: %d",
-                    self.agent_id,
-                    message_count,
-                )
-                return True
+        header = {
+            "agent_id": self.agent_id,
+            "client_ip": client_ip,
+            "client_os": client_os,
+            "client_state": client_state,
+            "client_points": client_points,
+        }
+        return self._deliver_message(self._frame(header, envelope), message_count)
+
+    def send_batch(
+        self,
+        encrypted_key_b64: str,
+        nonce_b64: str,
+        ciphertext_b64: str,
+        report_count: int,
+        client_ip: str,
+        message_count: int,
+        compression: str | None = None,
+        session_id: str | None = None,
+    ):
+        """Pošle několik reportů zašifrovaných jako jedna zpráva jedním POSTem."""
+        payload = {
+            "agent_id": self.agent_id,
+            "client_ip": client_ip,
+            "report_count": report_count,
+            "encrypted_key": encrypted_key_b64,
+            "nonce": nonce_b64,
+            "ciphertext": ciphertext_b64,
+        }
+        if compression:
+            payload["compression"] = compression
+        if session_id:
+            payload["session_id"] = session_id
+
+        return self._deliver_batch(payload, report_count, message_count)
+
+    def send_batch_envelope(
+        self,
+        envelope: EncryptedEnvelope,
+        report_count: int,
+        client_ip: str,
+        message_count: int,
+    ):
+        """Dávková obdoba send_envelope."""
+        if self.wire_format == WIRE_FORMAT_JSON:
+            return self.send_batch(
+                *envelope.as_b64(),
+                report_count,
+                client_ip,
+                message_count,
+                compression=envelope.compression,
+                session_id=envelope.session_id,
+            )
+
+        header = {
+            "agent_id": self.agent_id,
+            "client_ip": client_ip,
+            "report_count": report_count,
+        }
+        return self._deliver_batch(
+            self._frame(header, envelope), report_count, message_count
+        )
+
+    def send_stream(self, stream: EncryptedStream, kind: str) -> bool:
+        """
+        Nahraje zašifrovaný stream (např. balík logů) jako binární rámec.
+
+        Tělo požadavku se generuje po chuncích během odesílání, proto se
+        neopakuje ani neukládá do outboxu - při neúspěchu vrací False a
+        volající může stream zašifrovat a poslat znovu.
+        """
+        header = {"agent_id": self.agent_id, "kind": kind, "stream": True}
+        body = encode_stream(
+            header, stream.encrypted_key, stream.nonce_prefix, chunks=stream.chunks
+        )
+        status, _ = self._attempt("/api/message/stream", body)
+        if status == 200:
+            logging.info("%s: Stream %s doručen", self.agent_id, kind)
+            return True
+        return False
+
+    def flush_outbox(self) -> int:
+        """Pošle zprávy čekající v outboxu; vrací počet doručených."""
+        if self._outbox is None or not self._outbox.has_pending():
+            return 0
+        delivered, discarded = self._outbox.drain(self._replay)
+        if delivered:
+            logging.info("%s: Z outboxu doručeno zpráv: %d", self.agent_id, delivered)
+        if discarded:
+            logging.warning(
+                "%s: Z outboxu zahozeno zpráv odmítnutých serverem: %d",
+                self.agent_id,
+                discarded,
+            )
+        return delivered
+
+    @staticmethod
+    def _frame(header: dict, envelope: EncryptedEnvelope) -> bytes:
+        if envelope.compression:
+            header["compression"] = envelope.compression
+        if envelope.session_id:
+            header["session_id"] = envelope.session_id
+        return encode_frame(
+            header, envelope.encrypted_key, envelope.nonce, envelope.ciphertext
+        )
+
+    def _deliver_message(self, payload: dict | bytes, message_count: int) -> bool:
+        if self._post("/api/message", payload):
+            logging.info(
+                "%s: Zpráva doručena - Celkem odesláno: %d",
+                self.agent_id,
+                message_count,
+            )
+            return True
+        return False
+
+    def _deliver_batch(
+        self, payload: dict | bytes, report_count: int, message_count: int
+    ) -> bool:
+        if self._post("/api/message/batch", payload):
+            logging.info(
+                "%s: Dávka %d zpráv doručena - Celkem odesláno: %d",
+                self.agent_id,
+                report_count,
+                message_count,
+            )
+            return True
+        return False
+
+    def _post(self, path: str, payload: dict | bytes) -> bool:
+        # Starší zprávy z outboxu musí odejít dřív než nová
+        if self._outbox is not None and self._outbox.has_pending():
+            self.flush_outbox()
+            if self._outbox.has_pending():
+                self._spool(path, payload)
+                return False
+
+        status = self._send_with_retry(path, payload)
+        if status == 200:
+            return True
+        if RetryPolicy.is_retryable(status):
+            self._spool(path, payload)
+        return False
+
+    def _send_with_retry(self, path: str, payload: dict | bytes) -> int | None:
+        policy = self._retry_policy
+        for attempt in range(policy.max_attempts):
+            status, retry_after = self._attempt(path, payload)
+            if status == 200 or not policy.is_retryable(status):
+                return status
+            if attempt + 1 >= policy.max_attempts:
+                break
+            if self._circuit_breaker is not None and self._circuit_breaker.is_open():
+                break
+            if retry_after is not None and retry_after > policy.max_delay:
+                # Server žádá delší pauzu, než stojí za to čekat - do outboxu
+                break
+            delay = policy.delay(attempt, retry_after)
+            logging.info("%s: Další pokus o odeslání za %.1f s", self.agent_id, delay)
+            self._sleep(delay)
+        return status
+
+    def _attempt(self, path: str, payload: dict | bytes | Iterable[bytes]):
+        """Jeden pokus přes jistič; vrací (status, retry_after)."""
+        breaker = self._circuit_breaker
+        if breaker is not None and not breaker.allow_request():
+            return None, None
+
+        try:
+            # Každý pokus zvlášť - opakování jsou vidět v počtu i součtu časů
+            with timed(self._metrics, "http"):
+                status, retry_after = self._request(path, payload)
+        except MessageRejectedError:
+            if breaker is not None:
+                breaker.record_success()
+            raise
+        except Exception:
+            # Jistič nesmí zůstat v HALF_OPEN bez výsledku zkušebního pokusu
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        if breaker is not None:
+            if RetryPolicy.is_retryable(status):
+                breaker.record_failure()
             else:
+                # I odmítnutí (4xx) znamená, že server žije
+                breaker.record_success()
+        return status, retry_after
+
+    def _replay(self, record: bytes) -> bool | str:
+        meta, _, body = record.partition(b"\n")
+        entry = json.loads(meta)
+        payload = json.loads(body) if entry["format"] == WIRE_FORMAT_JSON else body
+        try:
+            status, _ = self._attempt(entry["path"], payload)
+        except MessageRejectedError:
+            status = 409
+        if status == 200:
+            return True
+        if not RetryPolicy.is_retryable(status):
+            # Server zprávu odmítl, opakování nepomůže - zahodit a pokračovat
+            logging.warning(
+                "%s: Zpráva z outboxu odmítnuta serverem (%s), zahazuji",
+                self.agent_id,
+                status,
+            )
+            return DISCARDED
+        return False
+
+    def _spool(self, path: str, payload: dict | bytes):
+        if self._outbox is None:
+            return
+        # Záznam: JSON řádek s cestou a formátem, za ním tělo požadavku
+        if isinstance(payload, dict):
+            meta = {"path": path, "format": WIRE_FORMAT_JSON}
+            body = json.dumps(payload).encode("utf-8")
+        else:
+            meta = {"path": path, "format": WIRE_FORMAT_BINARY}
+            body = payload
+        self._outbox.append(json.dumps(meta).encode("utf-8") + b"\n" + body)
+        logging.info("%s: Zpráva uložena do outboxu", self.agent_id)
+
+    @staticmethod
+    def _rejection_reason(response) -> str | None:
+        try:
+            return response.json().get("error")
+        except (ValueError, AttributeError):
+            return None
+
+    def _request(self, path: str, payload: dict | bytes | Iterable[bytes]):
+        """
+        Provede POST; vrací (status, retry_after). Status je None, když server
+        není dostupný.
+        """
+        if isinstance(payload, dict):
+            kwargs = {"headers": {"Content-Type": CONTENT_TYPE_JSON}, "json": payload}
+        else:
+            kwargs = {"headers": {"Content-Type": CONTENT_TYPE_BINARY}, "data": payload}
+
+        try:
+            response = self._transport.post(f"{self.server_url}{path}", **kwargs)
+
+            if response.status_code == 409:
+                reason = self._rejection_reason(response)
+                if reason:
+                    raise MessageRejectedError(reason)
+            if response.status_code != 200:
                 logging.error(
                     "%s: Chyba při odesílání - %s", self.agent_id, response.status_code
                 )
-                return False
+                return response.status_code, parse_retry_after(
+                    response.headers.get("Retry-After")
+                )
+            return response.status_code, None
 
-        except requests.exceptions.ConnectionError:
+        except MessageRejectedError:
+            raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             logging.error(
                 "%s: Nelze se připojit k serveru %s", self.agent_id, self.server_url
             )
-            return False
+            return None, None
+        except requests.exceptions.RequestException as e:
+            # Např. přerušená odpověď - stejně jako výpadek, zkusí se znovu
+            logging.error("%s: Chyba při odesílání - %s", self.agent_id, e)
+            return None, None
@@ -0,0 +1,183 @@
+import logging
+import math
+import os
+import threading
+import time
+from array import array
+from typing import Callable
+
+try:
+    import psutil
+except ImportError:  # volitelná závislost - bez ní se metriky nesbírají
+    psutil = None
+
+
+class RingBuffer:
+    """Kruhový buffer nad array('d'): pevná paměť, žádná alokace na vzorek."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._count = 0
+        self._next = 0
+
+    def append(self, value: float):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def values(self) -> list[float]:
+        """Vzorky od nejstaršího po nejnovější."""
+        start = (self._next - self._count) % self.capacity
+        return [self._data[(start + i) % self.capacity] for i in range(self._count)]
+
+    def clear(self):
+        self._count = 0
+        self._next = 0
+
+    def __len__(self):
+        return self._count
+
+
+def aggregate(values: list[float]) -> dict:
+    ordered = sorted(values)
+    p95 = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+    return {
+        "min": round(ordered[0], 2),
+        "max": round(ordered[-1], 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p95": round(p95, 2),
+        "last": round(values[-1], 2),
+    }
+
+
+class PsutilProbe:
+    """Jeden vzorek CPU, paměti, disku a sítě; síť jako B/s od minulého vzorku."""
+
+    def __init__(self, disk_path: str | None = None):
+        self.disk_path = disk_path or os.getenv("SystemDrive", "/") + os.sep
+        self._last_net = None
+        psutil.cpu_percent(interval=None)  # první volání jen nastaví základ
+
+    def __call__(self) -> dict:
+        now = time.monotonic()
+        net = psutil.net_io_counters()
+        sample = {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": psutil.virtual_memory().percent,
+            "disk_percent": psutil.disk_usage(self.disk_path).percent,
+        }
+        if self._last_net is not None:
+            last_time, last_net = self._last_net
+            elapsed = max(now - last_time, 1e-6)
+            sample["net_sent_bps"] = (net.bytes_sent - last_net.bytes_sent) / elapsed
+            sample["net_recv_bps"] = (net.bytes_recv - last_net.bytes_recv) / elapsed
+        self._last_net = (now, net)
+        return sample
+
+
+class MetricSampler:
+    """
+    Vzorkuje metriky na pozadí každých sample_interval sekund do kruhových
+    bufferů; aggregates() vrátí souhrn (min/max/mean/p95/last) od minula
+    a buffery vyprázdní. Na server tak jdou jen souhrny, ne jednotlivé vzorky,
+    a přesto se zachytí i krátké špičky mezi reporty.
+
+    Vlastní režie (CPU čas vlákna vzorkovače vůči uplynulému času) se měří
+    a posílá jako sampler_overhead_percent.
+    """
+
+    def __init__(
+        self,
+        sample_interval: float,
+        capacity: int,
+        probe: Callable[[], dict] | None = None,
+    ):
+        self.sample_interval = sample_interval
+        self.capacity = capacity
+        self._probe = probe
+        self._buffers: dict[str, RingBuffer] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._cpu_time = 0.0
+        self._window_start = time.monotonic()
+
+    @staticmethod
+    def available() -> bool:
+        return psutil is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self._probe is None:
+            self._probe = PsutilProbe()
+        self._stop.clear()
+        self._window_start = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="metric-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def resize(self, capacity: int):
+        """Změní kapacitu bufferů (po změně intervalu); nejnovější vzorky zůstanou."""
+        with self._lock:
+            self.capacity = capacity
+            for name, buffer in self._buffers.items():
+                resized = RingBuffer(capacity)
+                for value in buffer.values()[-capacity:]:
+                    resized.append(value)
+                self._buffers[name] = resized
+
+    def sample_once(self):
+        started = time.thread_time()
+        try:
+            sample = self._probe()
+        except Exception as e:
+            logging.warning("Vzorkování metrik selhalo: %s", e)
+            return
+        with self._lock:
+            for name, value in sample.items():
+                buffer = self._buffers.get(name)
+                if buffer is None:
+                    buffer = self._buffers[name] = RingBuffer(self.capacity)
+                buffer.append(value)
+            self._cpu_time += time.thread_time() - started
+
+    def aggregates(self) -> dict:
+        """Souhrn vzorků od posledního volání; prázdný, když žádné nejsou."""
+        with self._lock:
+            result = {
+                name: aggregate(buffer.values())
+                for name, buffer in self._buffers.items()
+                if len(buffer)
+            }
+            for buffer in self._buffers.values():
+                buffer.clear()
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if result and elapsed > 0:
+                result["sampler_overhead_percent"] = round(
+                    self._cpu_time / elapsed * 100, 4
+                )
+            self._cpu_time = 0.0
+            self._window_start = now
+        return result
+
+    def _run(self):
+        # Vzorky v pevné mřížce monotónního času, bez kumulace zpoždění
+        next_sample = time.monotonic()
+        while True:
+            self.sample_once()
+            next_sample += self.sample_interval
+            now = time.monotonic()
+            if next_sample < now:
+                next_sample = now
+            if self._stop.wait(next_sample - now):
+                return
@@ -0,0 +1,201 @@
+import logging
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple
+
+# Hlavička záznamu: délka dat + CRC32 (odhalí useknutý zápis na konci segmentu)
+_RECORD_HEADER = struct.Struct(">II")
+_SEGMENT_SUFFIX = ".seg"
+_CURSOR_FILE = "cursor"
+
+# Návratová hodnota deliver pro záznam, který server odmítl a nemá smysl ho
+# opakovat: drain ho přeskočí, ale nezapočítá jako doručený
+DISCARDED = "discarded"
+
+
+class DrainResult(NamedTuple):
+    delivered: int
+    discarded: int
+
+
+class Outbox:
+    """
+    Append-only fronta nedoručených zpráv na disku.
+
+    Záznamy se zapisují sekvenčně do segmentových souborů. Každý záznam se
+    hned předá OS (flush), takže přežije i násilné ukončení procesu; fsync
+    (ochrana proti výpadku celého systému) probíhá po dávkách. drain() předává
+    záznamy od nejstaršího a plně doručené segmenty maže. Při překročení
+    max_bytes se zahazují nejstarší segmenty.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int = 50 * 1024 * 1024,
+        segment_bytes: int = 1024 * 1024,
+        fsync_every: int = 16,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._segments = sorted(self.directory.glob(f"*{_SEGMENT_SUFFIX}"))
+        self._sizes = {path: path.stat().st_size for path in self._segments}
+        self._active = None  # otevřený soubor posledního segmentu
+        self._unsynced = 0
+        self._cursor_segment, self._cursor_offset = self._load_cursor()
+
+    def has_pending(self) -> bool:
+        """Vrací True, pokud ve frontě čeká alespoň jeden záznam (bez I/O)."""
+        return self._total_bytes() > self._consumed_bytes()
+
+    def append(self, record: bytes):
+        header = _RECORD_HEADER.pack(len(record), zlib.crc32(record))
+        path, file = self._writable_segment()
+        file.write(header + record)
+        file.flush()
+        self._sizes[path] += _RECORD_HEADER.size + len(record)
+
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+        self._enforce_size_cap()
+
+    def sync(self):
+        if self._active is not None and self._unsynced:
+            os.fsync(self._active.fileno())
+        self._unsynced = 0
+
+    def drain(self, deliver: Callable[[bytes], bool | str]) -> DrainResult:
+        """
+        Předá záznamy funkci deliver v pořadí, v jakém byly zapsány.
+
+        deliver vrací True (doručeno), DISCARDED (zahozeno, pokračuje se dál)
+        nebo False. U prvního False se drain zastaví; pozice se uloží a příští
+        drain pokračuje od něj. Vrací počty doručených a zahozených záznamů.
+        """
+        # Aktivní segment zůstává otevřený pro zápis (záznamy jsou flushnuté,
+        # čte se přes vlastní handle) - zavírá se, až když se maže
+        delivered = discarded = 0
+
+        while self._segments:
+            path = self._segments[0]
+            offset = self._cursor_offset if self._cursor_segment == path.name else 0
+
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for record, end_offset in _read_records(f, offset):
+                    outcome = deliver(record)
+                    if not outcome:
+                        self._save_cursor(path.name, offset)
+                        return DrainResult(delivered, discarded)
+                    offset = end_offset
+                    if outcome == DISCARDED:
+                        discarded += 1
+                    else:
+                        delivered += 1
+
+            if offset < self._sizes[path]:
+                logging.warning(
+                    "Outbox: segment %s má poškozený konec, zbytek se přeskakuje",
+                    path.name,
+                )
+            self._remove_segment(path)
+
+        self._save_cursor(None, 0)
+        return DrainResult(delivered, discarded)
+
+    def close(self):
+        self._close_active()
+
+    def _writable_segment(self):
+        if self._active is not None:
+            path = self._segments[-1]
+            if self._sizes[path] < self.segment_bytes:
+                return path, self._active
+            self._close_active()
+
+        path = self.directory / f"{self._next_sequence():010d}{_SEGMENT_SUFFIX}"
+        self._active = open(path, "ab")
+        self._segments.append(path)
+        self._sizes[path] = 0
+        return path, self._active
+
+    def _next_sequence(self) -> int:
+        if not self._segments:
+            return 1
+        return int(self._segments[-1].stem) + 1
+
+    def _close_active(self):
+        if self._active is not None:
+            self.sync()
+            self._active.close()
+            self._active = None
+
+    def _enforce_size_cap(self):
+        evicted = 0
+        # Aktivní (poslední) segment se nezahazuje nikdy
+        while self._total_bytes() > self.max_bytes and len(self._segments) > 1:
+            self._remove_segment(self._segments[0])
+            evicted += 1
+        if evicted:
+            logging.warning(
+                "Outbox: překročen limit %d B, zahozeno nejstarších segmentů: %d",
+                self.max_bytes,
+                evicted,
+            )
+
+    def _remove_segment(self, path: Path):
+        if self._active is not None and path == self._segments[-1]:
+            self._close_active()
+        self._segments.remove(path)
+        del self._sizes[path]
+        path.unlink(missing_ok=True)
+        if self._cursor_segment == path.name:
+            self._save_cursor(None, 0)
+
+    def _total_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def _consumed_bytes(self) -> int:
+        if self._segments and self._cursor_segment == self._segments[0].name:
+            return self._cursor_offset
+        return 0
+
+    def _load_cursor(self):
+        try:
+            name, offset = (self.directory / _CURSOR_FILE).read_text().split()
+            return name, int(offset)
+        except (OSError, ValueError):
+            return None, 0
+
+    def _save_cursor(self, segment_name: str | None, offset: int):
+        if (segment_name, offset) == (self._cursor_segment, self._cursor_offset):
+            return
+        self._cursor_segment, self._cursor_offset = segment_name, offset
+        cursor_path = self.directory / _CURSOR_FILE
+        if segment_name is None:
+            cursor_path.unlink(missing_ok=True)
+            return
+        tmp_path = cursor_path.with_suffix(".tmp")
+        tmp_path.write_text(f"{segment_name} {offset}")
+        os.replace(tmp_path, cursor_path)
+
+
+def _read_records(f, offset: int) -> Iterator[tuple[bytes, int]]:
+    """Čte záznamy ze segmentu; končí na konci souboru nebo u poškozeného záznamu."""
+    while True:
+        header = f.read(_RECORD_HEADER.size)
+        if len(header) < _RECORD_HEADER.size:
+            return
+        length, crc = _RECORD_HEADER.unpack(header)
+        record = f.read(length)
+        if len(record) < length or zlib.crc32(record) != crc:
+            return
+        offset += _RECORD_HEADER.size + length
+        yield record, offset
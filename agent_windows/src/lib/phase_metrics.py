@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+EXPORT_PROMETHEUS = "prometheus"
+EXPORT_JSON = "json"
+
+
+class PhaseMetrics:
+    """
+    Časy fází odesílacího řetězce (sběr, serializace, AES, RSA wrap, získání
+    klíče, HTTP), počty bajtů payloadu a počítadla výsledků.
+
+    Fáze se měří monotónními hodinami a mohou běžet v různých vláknech.
+    Souhrnné hodnoty rostou po celý běh procesu (pro export), cycle_summary()
+    vrací jen časy od svého posledního volání (pro report).
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Exporty ze souběžných cyklů sdílí dočasný soubor - zapisují postupně
+        self._write_lock = threading.Lock()
+        self._phases: dict[str, dict] = {}
+        self._cycle: dict[str, float] = {}
+        self._bytes: dict[str, int] = {}
+        self._counters: dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.record(name, self._clock() - started)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            stats = self._phases.get(name)
+            if stats is None:
+                stats = self._phases[name] = {
+                    "count": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "last_seconds": 0.0,
+                }
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["last_seconds"] = seconds
+            self._cycle[name] = self._cycle.get(name, 0.0) + seconds
+
+    def add_bytes(self, kind: str, count: int):
+        with self._lock:
+            self._bytes[kind] = self._bytes.get(kind, 0) + count
+
+    def count(self, name: str, increment: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + increment
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "phases": {name: dict(stats) for name, stats in self._phases.items()},
+                "bytes": dict(self._bytes),
+                "counters": dict(self._counters),
+            }
+
+    def cycle_summary(self) -> dict:
+        """Časy fází v ms od minulého volání (malý souhrn do reportu)."""
+        with self._lock:
+            summary = {
+                f"{name}_ms": round(seconds * 1000, 2)
+                for name, seconds in self._cycle.items()
+            }
+            self._cycle.clear()
+        return summary
+
+    def to_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP mastiff_phase_seconds Doba fází odesílacího řetězce agenta.",
+            "# TYPE mastiff_phase_seconds summary",
+        ]
+        for name, stats in snapshot["phases"].items():
+            total = stats["total_seconds"]
+            lines.append(f'mastiff_phase_seconds_sum{{phase="{name}"}} {total:.6f}')
+            lines.append(
+                f'mastiff_phase_seconds_count{{phase="{name}"}} {stats["count"]}'
+            )
+        lines.append("# HELP mastiff_phase_max_seconds Nejdelší běh fáze.")
+        lines.append("# TYPE mastiff_phase_max_seconds gauge")
+        for name, stats in snapshot["phases"].items():
+            longest = stats["max_seconds"]
+            lines.append(f'mastiff_phase_max_seconds{{phase="{name}"}} {longest:.6f}')
+        lines.append(
+            "# HELP mastiff_payload_bytes_total Bajty payloadu podle stupně zpracování."
+        )
+        lines.append("# TYPE mastiff_payload_bytes_total counter")
+        for kind, count in snapshot["bytes"].items():
+            lines.append(f'mastiff_payload_bytes_total{{kind="{kind}"}} {count}')
+        for name, count in snapshot["counters"].items():
+            lines.append(f"# TYPE mastiff_{name}_total counter")
+            lines.append(f"mastiff_{name}_total {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path, export_format: str = EXPORT_PROMETHEUS):
+        """Zapíše metriky atomicky - čtenář (node exporter) nevidí půlku souboru."""
+        with self._write_lock:
+            if export_format == EXPORT_JSON:
+                text = json.dumps(self.snapshot(), indent=2)
+            else:
+                text = self.to_prometheus()
+            tmp_file = path.with_suffix(path.suffix + ".tmp")
+            tmp_file.write_text(text, encoding="utf-8")
+            os.replace(tmp_file, path)
+
+
+def timed(metrics: PhaseMetrics | None, name: str):
+    """metrics.phase(name), nebo nic, když se metriky nesbírají."""
+    return metrics.phase(name) if metrics is not None else nullcontext()
@@ -0,0 +1,114 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+PROFILE_FILE = "agent.prof"
+SUMMARY_FILE = "summary.txt"
+
+
+class _StatsSnapshot:
+    """Hotové statistiky pro pstats.Stats (to jinak volá create_stats profileru)."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ThreadProfiler:
+    """
+    cProfile pro aktuální vlákno i všechna vlákna založená během měření.
+
+    cProfile měří jen vlákno, ve kterém byl zapnut, ale agent sbírá data,
+    šifruje i odesílá v poolech vláken. Každé nové vlákno proto dostane
+    vlastní profiler (přes threading.setprofile) a výsledky se na konci sečtou.
+    Měří se CPU čas vlákna, takže čekání (fronty, síť, sleep) profil nezahltí.
+    """
+
+    def __init__(self):
+        self._profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.setprofile(self._profile_new_thread)
+        self._profile_new_thread()
+
+    def stop(self) -> pstats.Stats | None:
+        self._profiles[0].disable()
+        threading.setprofile(None)
+        stats = None
+        for profile in self._profiles:
+            # Profiler jiného vlákna nejde vypnout odsud (create_stats by jeho
+            # rozběhnutá volání změřil hodinami tohoto vlákna), proto jen snímek;
+            # čekání vláken poolu, která dál běží, se tak nezapočítá
+            profile.snapshot_stats()
+            if not profile.stats:
+                continue  # vlákno nic nespustilo, pstats prázdný profil odmítne
+            snapshot = _StatsSnapshot(profile.stats)
+            if stats is None:
+                stats = pstats.Stats(snapshot)
+            else:
+                stats.add(snapshot)
+        return stats
+
+    def _profile_new_thread(self, *args):
+        # Volá se při první události nového vlákna; dál ho měří už cProfile
+        profile = cProfile.Profile(time.thread_time)
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+
+def profile_run(run: Callable[[], None], output_dir: Path, top: int = 20) -> str:
+    """
+    Spustí run() pod cProfile a tracemalloc. Do output_dir uloží profil
+    (agent.prof, pro pstats/snakeviz) a textový souhrn nejdražších funkcí
+    a míst alokací, který i vrátí.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    profiler = ThreadProfiler()
+
+    tracemalloc.start(10)
+    profiler.start()
+    try:
+        run()
+    finally:
+        # Snapshot před zpracováním profilu, jinak by v něm byly alokace pstats
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = profiler.stop()
+
+    summary = io.StringIO()
+    if stats is not None:
+        stats.dump_stats(str(output_dir / PROFILE_FILE))
+        stats.stream = summary
+        summary.write(f"=== Top {top} funkcí podle kumulativního času ===\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+        summary.write(f"=== Top {top} funkcí podle vlastního času ===\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+    )
+    summary.write(f"=== Top {top} míst alokací (drženo na konci běhu) ===\n")
+    summary.write(
+        f"Paměť: aktuálně {current / 1024:.1f} KiB, špička {peak / 1024:.1f} KiB\n"
+    )
+    for stat in snapshot.statistics("lineno")[:top]:
+        summary.write(f"{stat}\n")
+
+    text = summary.getvalue()
+    (output_dir / SUMMARY_FILE).write_text(text, encoding="utf-8")
+    return text
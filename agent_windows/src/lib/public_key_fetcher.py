@@ -1,24 +1,193 @@
+import hashlib
+import json
 import logging
-import requests
+import os
+import threading
+import time
+from pathlib import Path
 
+import requests
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
+from lib.http_transport import HttpTransport
+from lib.phase_metrics import PhaseMetrics, timed
+
 
 class PublicKeyFetcher:
-    def __init__(self, server_url: str):
+    """
+    Získává veřejný klíč serveru.
+
+    S cache_file se klíč ukládá na disk (podle server_url, s otiskem a ETagem),
+    takže nový proces nemusí klíč stahovat. Po uplynutí ttl se cachovaný klíč
+    dál používá a na pozadí se ověří podmíněným GETem (If-None-Match).
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        transport: HttpTransport | None = None,
+        cache_file: Path | None = None,
+        ttl: float = 24 * 3600,
+        metrics: PhaseMetrics | None = None,
+    ):
         self.server_url = server_url
+        self._transport = transport or HttpTransport()
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._metrics = metrics
         self._public_key: RSAPublicKey | None = None
+        self._etag: str | None = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._revalidating = False
+        self._load_cache()
 
     def fetch_public_key(self) -> RSAPublicKey:
         if self._public_key is not None:
+            if time.time() - self._fetched_at >= self.ttl:
+                self._start_revalidation()
             return self._public_key
         try:
-            resp = requests.get(f"{self.server_url}/api/public_key")
-            resp.raise_for_status()
-            pem = resp.json()["public_key_pem"].encode("utf-8")
-            public_key: RSAPublicKey = serialization.load_pem_public_key(pem)  # type: ignore
-            self._public_key = public_key
-            return public_key
+            return self._download()
         except requests.exceptions.RequestException as e:
-            logging.error(f"Error fetching public key from {self.server_url}: {e}")
+            logging.error(
+                "Nelze získat veřejný klíč ze serveru %s: %s", self.server_url, e
+            )
             raise
+
+    def invalidate(self):
+        """Zahodí klíč (např. po rotaci na serveru); příště se stáhne znovu."""
+        with self._lock:
+            self._public_key = None
+            self._etag = None
+            self._fetched_at = 0.0
+        self._save_cache(None)
+
+    def revalidate(self):
+        """Ověří cachovaný klíč podmíněným GETem; při chybě ponechá starý."""
+        try:
+            self._download()
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            logging.warning(
+                "Ověření veřejného klíče u serveru %s selhalo: %s", self.server_url, e
+            )
+        finally:
+            self._revalidating = False
+
+    def _start_revalidation(self):
+        with self._lock:
+            if self._revalidating:
+                return
+            self._revalidating = True
+        threading.Thread(
+            target=self.revalidate, name="public-key-revalidate", daemon=True
+        ).start()
+
+    def _download(self) -> RSAPublicKey:
+        # Měří se jen skutečné dotazy na server, ne klíč z cache
+        with timed(self._metrics, "key_fetch"):
+            return self._request_key()
+
+    def _request_key(self) -> RSAPublicKey:
+        # Stav se čte jednou - invalidate() ho může souběžně vynulovat
+        with self._lock:
+            cached_key, etag = self._public_key, self._etag
+        headers = {}
+        if etag and cached_key is not None:
+            headers["If-None-Match"] = etag
+
+        if headers:
+            resp = self._transport.get(
+                f"{self.server_url}/api/public_key", headers=headers
+            )
+        else:
+            resp = self._transport.get(f"{self.server_url}/api/public_key")
+
+        if resp.status_code == 304 and cached_key is not None:
+            fetched_at = time.time()
+            with self._lock:
+                still_current = self._public_key is cached_key
+                if still_current:
+                    self._fetched_at = fetched_at
+            if still_current:
+                # Klíč zahozený během dotazu se do cache nevrací
+                self._save_cache(cached_key, etag, fetched_at)
+            return cached_key
+
+        resp.raise_for_status()
+        pem = resp.json()["public_key_pem"].encode("utf-8")
+        public_key: RSAPublicKey = serialization.load_pem_public_key(pem)  # type: ignore
+        etag = resp.headers.get("ETag")
+        fetched_at = time.time()
+        with self._lock:
+            self._public_key = public_key
+            self._etag = etag
+            self._fetched_at = fetched_at
+        self._save_cache(public_key, etag, fetched_at)
+        return public_key
+
+    @staticmethod
+    def fingerprint(public_key: RSAPublicKey) -> str:
+        der = public_key.public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        return hashlib.sha256(der).hexdigest()
+
+    @staticmethod
+    def _pem_of(public_key: RSAPublicKey) -> str:
+        return public_key.public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        ).decode("utf-8")
+
+    def _read_cache_file(self) -> dict:
+        try:
+            with open(self.cache_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_cache(self):
+        if self.cache_file is None:
+            return
+        entry = self._read_cache_file().get(self.server_url)
+        if not entry:
+            return
+        try:
+            public_key = serialization.load_pem_public_key(entry["pem"].encode("utf-8"))
+            if self.fingerprint(public_key) != entry["fingerprint"]:
+                raise ValueError("fingerprint mismatch")
+        except (KeyError, ValueError, TypeError) as e:
+            logging.warning("Ignoruji neplatný klíč v cache: %s", e)
+            return
+        self._public_key = public_key  # type: ignore
+        self._etag = entry.get("etag")
+        self._fetched_at = entry.get("fetched_at", 0.0)
+
+    def _save_cache(
+        self,
+        public_key: RSAPublicKey | None,
+        etag: str | None = None,
+        fetched_at: float = 0.0,
+    ):
+        if self.cache_file is None:
+            return
+        cache = self._read_cache_file()
+        if public_key is None:
+            cache.pop(self.server_url, None)
+        else:
+            cache[self.server_url] = {
+                "pem": self._pem_of(public_key),
+                "fingerprint": self.fingerprint(public_key),
+                "etag": etag,
+                "fetched_at": fetched_at,
+            }
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix(".tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(cache, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            logging.warning("Cache veřejného klíče nelze uložit: %s", e)
@@ -0,0 +1,107 @@
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+
+class RetryPolicy:
+    """
+    Kdy a jak dlouho čekat před dalším pokusem o odeslání.
+
+    Opakují se jen přechodné chyby (nedostupný server, 429, 5xx). Prodleva je
+    exponenciální s plným jitterem, aby se agenti po výpadku serveru nevraceli
+    všichni ve stejný okamžik; Retry-After od serveru má přednost.
+    """
+
+    def __init__(
+        self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @staticmethod
+    def is_retryable(status: int | None) -> bool:
+        """status None znamená chybu spojení nebo timeout."""
+        return status is None or status == 429 or status >= 500
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Prodleva před pokusem číslo attempt + 1 (attempt počítáno od 0)."""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Převede hlavičku Retry-After (sekundy nebo HTTP datum) na sekundy."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """
+    Jistič, který po sérii selhání na čas přestane server kontaktovat.
+
+    CLOSED: požadavky prochází. Po failure_threshold selháních za sebou přejde
+    do OPEN a požadavky odmítá. Po uplynutí reset_timeout (s jitterem) pustí
+    v HALF_OPEN jeden zkušební požadavek - úspěch jistič zavře, selhání ho
+    znovu otevře.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60.0,
+        clock=time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def is_open(self) -> bool:
+        """True, dokud jistič odmítá požadavky (bez změny stavu)."""
+        return self.state == self.OPEN and self._clock() < self._retry_at
+
+    def allow_request(self) -> bool:
+        if self.state == self.OPEN:
+            if self._clock() < self._retry_at:
+                return False
+            self.state = self.HALF_OPEN
+            return True
+        # V HALF_OPEN už zkušební požadavek běží, další čekají na jeho výsledek
+        return self.state == self.CLOSED
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logging.info("Jistič: server opět odpovídá, obnovuji odesílání")
+        self.state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logging.warning(
+                    "Jistič: server nedostupný, pauza odesílání na %.0f s",
+                    self.reset_timeout,
+                )
+            self.state = self.OPEN
+            self._retry_at = self._clock() + self.reset_timeout * random.uniform(
+                1.0, 1.5
+            )
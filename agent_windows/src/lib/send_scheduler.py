@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+
+
+class SendScheduler:
+    """
+    Rozloží odesílání agentů rovnoměrně do okna interval_seconds.
+
+    Každý agent dostane v intervalu pevný posun odvozený z hashe agent_id, takže
+    flotila neposílá ve stejný okamžik po startu ani po spuštění naplánované
+    úlohy. Fáze slotu se počítá vůči epoše (shodná i po restartu procesu),
+    další sloty se ale odměřují monotónními hodinami jako přesné násobky
+    intervalu - bez kumulace zpoždění a bez vlivu změn systémového času.
+    Volitelný jitter se přičítá ke každému slotu zvlášť a neposouvá další.
+    """
+
+    def __init__(
+        self,
+        agent_id: str,
+        interval_seconds: float,
+        jitter_seconds: float = 0.0,
+        clock=time.monotonic,
+        wall_clock=time.time,
+    ):
+        self.agent_id = agent_id
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = min(jitter_seconds, interval_seconds)
+        self.offset = self.slot_offset(agent_id, interval_seconds)
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._next_slot = None
+
+    def reconfigure(self, interval_seconds: float, jitter_seconds: float = 0.0):
+        """Změní interval; další slot se spočítá znovu od fáze agenta."""
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = min(jitter_seconds, interval_seconds)
+        self.offset = self.slot_offset(self.agent_id, interval_seconds)
+        self._next_slot = None
+
+    @staticmethod
+    def slot_offset(agent_id: str, interval_seconds: float) -> float:
+        """Stabilní posun agenta v rámci intervalu, rovnoměrně rozložený."""
+        digest = hashlib.sha256(agent_id.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2**64 * interval_seconds
+
+    def next_send_time(self) -> float:
+        """Vrací monotónní čas dalšího odeslání a posune plán na další slot."""
+        now = self._clock()
+        if self._next_slot is None:
+            phase = (self._wall_clock() - self.offset) % self.interval_seconds
+            self._next_slot = now + (self.interval_seconds - phase)
+        else:
+            self._next_slot += self.interval_seconds
+            if self._next_slot < now:
+                # Zmeškané sloty (dlouhý cyklus, uspání) se přeskočí, nedohánějí
+                missed = math.ceil((now - self._next_slot) / self.interval_seconds)
+                self._next_slot += missed * self.interval_seconds
+
+        return self._next_slot + random.uniform(0, self.jitter_seconds)
+
+    def wait_for_slot(self, stop_event: threading.Event | None = None) -> bool:
+        """
+        Počká na další slot. Vrací False, pokud čekání přerušil stop_event.
+        """
+        remaining = max(0.0, self.next_send_time() - self._clock())
+        if stop_event is not None:
+            return not stop_event.wait(remaining)
+        time.sleep(remaining)
+        return True
+
+    async def wait_for_slot_async(
+        self, stop_event: asyncio.Event | None = None
+    ) -> bool:
+        remaining = max(0.0, self.next_send_time() - self._clock())
+        if stop_event is None:
+            await asyncio.sleep(remaining)
+            return True
+        try:
+            await asyncio.wait_for(stop_event.wait(), remaining)
+        except asyncio.TimeoutError:
+            return True
+        return False
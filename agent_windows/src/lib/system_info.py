@@ -2,16 +2,34 @@ import getpass
 import platform
 import socket
 
+from lib.collectors import EVERY_CYCLE, STATIC, TTL, CollectorRegistry
+
+# Výchozí registr; další kolektory (inventář, disky...) se registrují sem
+registry = CollectorRegistry()
+
+
+# Základní informace
+@registry.register("hostname", policy=TTL, ttl=300)
+def _collect_hostname():
+    return {"hostname": socket.gethostname()}
 
-def get_system_info():
-    info = {}
 
-    # Základní informace
-    info["hostname"] = socket.gethostname()
-    info["user"] = getpass.getuser()
-    info["os"] = platform.system()
-    info["os_version"] = platform.version()
-    info["architecture"] = platform.machine()
-    info["processor"] = platform.processor()
+@registry.register("user", policy=EVERY_CYCLE)
+def _collect_user():
+    return {"user": getpass.getuser()}
 
-    return info
+
+# platform.version() a platform.processor() jsou na Windows pomalé,
+# za běhu procesu se ale nemění
+@registry.register("platform", policy=STATIC)
+def _collect_platform():
+    return {
+        "os": platform.system(),
+        "os_version": platform.version(),
+        "architecture": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def get_system_info():
+    return registry.collect()
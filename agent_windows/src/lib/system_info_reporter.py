@@ -1,19 +1,30 @@
 import json
 import logging
 
+from lib.metric_sampler import MetricSampler
 from lib.system_info import get_system_info
 
 
 class SystemInfoReporter:
+    def __init__(self, metric_sampler: MetricSampler | None = None):
+        self._metric_sampler = metric_sampler
+
     def report_system_info(self):
         system_info = get_system_info()
 
-        content = json.dumps(system_info, ensure_ascii=False)
-        logging.debug(content)
+        # Souhrny metrik za uplynulý interval (ne jednotlivé vzorky)
+        if self._metric_sampler is not None:
+            metrics = self._metric_sampler.aggregates()
+            if metrics:
+                system_info = dict(system_info, metrics=metrics)
 
-        logging.info("--- Informace o systému ---")
-        for key, value in system_info.items():
-            logging.info(f"{key}: {value}")
-        logging.info("---------------------------")
+        # Výpis po polích jen při DEBUG - v běžném provozu nestojí nic
+        logger = logging.getLogger()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(system_info, ensure_ascii=False))
+            logger.debug("--- Informace o systému ---")
+            for key, value in system_info.items():
+                logger.debug("%s: %s", key, value)
+            logger.debug("---------------------------")
 
         return system_info  # Return for potential use in message sending
@@ -0,0 +1,80 @@
+import json
+import struct
+from typing import BinaryIO, Iterable, Iterator
+
+WIRE_FORMAT_JSON = "json"
+WIRE_FORMAT_BINARY = "binary"
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_BINARY = "application/vnd.mastiff.envelope"
+
+# Rámec: MAGIC, pak pole s 4B délkou (big-endian): JSON hlavička s metadaty,
+# zašifrovaný AES klíč, nonce, ciphertext
+MAGIC = b"MSF1"
+_LENGTH = struct.Struct(">I")
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def encode_frame(header: dict, *fields: bytes) -> bytes:
+    """Zabalí metadata a binární pole obálky do jednoho rámce bez base64."""
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    parts = [MAGIC]
+    for field in (header_bytes, *fields):
+        parts.append(_LENGTH.pack(len(field)))
+        parts.append(field)
+    return b"".join(parts)
+
+
+def decode_frame(frame: bytes) -> tuple[dict, list[bytes]]:
+    """Rozbalí rámec z encode_frame; vrací (hlavička, [pole...])."""
+    if not frame.startswith(MAGIC):
+        raise WireFormatError("Neznámý formát rámce")
+
+    view = memoryview(frame)
+    offset = len(MAGIC)
+    fields = []
+    while offset < len(frame):
+        if offset + _LENGTH.size > len(frame):
+            raise WireFormatError("Useknutá délka pole")
+        (length,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        if offset + length > len(frame):
+            raise WireFormatError("Useknuté pole")
+        fields.append(bytes(view[offset : offset + length]))
+        offset += length
+
+    if not fields:
+        raise WireFormatError("Rámec bez hlavičky")
+    return json.loads(fields[0]), fields[1:]
+
+
+def encode_stream(
+    header: dict, *fields: bytes, chunks: Iterable[bytes]
+) -> Iterator[bytes]:
+    """
+    Streamová varianta encode_frame: po hlavičce a polích následují chunky,
+    každý s vlastní délkou. Nic se neskládá do paměti celé.
+    """
+    yield encode_frame(header, *fields)
+    for chunk in chunks:
+        yield _LENGTH.pack(len(chunk)) + chunk
+
+
+def iter_frame_fields(source: BinaryIO) -> Iterator[bytes]:
+    """Čte pole rámce postupně ze souboru/streamu (pro rámce i streamy)."""
+    if source.read(len(MAGIC)) != MAGIC:
+        raise WireFormatError("Neznámý formát rámce")
+    while True:
+        length_bytes = source.read(_LENGTH.size)
+        if not length_bytes:
+            return
+        if len(length_bytes) < _LENGTH.size:
+            raise WireFormatError("Useknutá délka pole")
+        (length,) = _LENGTH.unpack(length_bytes)
+        field = source.read(length)
+        if len(field) < length:
+            raise WireFormatError("Useknuté pole")
+        yield field
@@ -1,73 +1,242 @@
-import getpass
-import json
+import argparse
+import asyncio
 import logging
+import math
 import os
+import signal
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import requests
-from lib.message_encryptor import MessageEncryptor
-from lib.message_sender import MessageSender
-from lib.public_key_fetcher import PublicKeyFetcher
-from lib.system_info_reporter import SystemInfoReporter  # Import SystemInfoReporter
+from lib.instance_lock import InstanceLock, InstanceLockError
 
 from src import config, updater
 
+# requests, cryptography a moduly z lib, které je používají, se importují až
+# v Agentovi - --help ani spuštění nad běžící instancí je nenačítá
+
 __version__ = "1.0.0"
 
-# Nastavení základního logování do C:\ProgramData\Mastiff\agent.log
-log_dir = Path(os.getenv("PROGRAMDATA", "C:\\ProgramData")) / "Mastiff"
-log_dir.mkdir(parents=True, exist_ok=True)
-log_file = log_dir / "agent_info.log"
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    filename=str(log_file),
-    filemode="a",
+# Log do C:\ProgramData\Mastiff\agent_info.log (nastaví main, viz configure_logging)
+LOG_FILE = (
+    Path(os.getenv("PROGRAMDATA", "C:\\ProgramData")) / "Mastiff" / "agent_info.log"
 )
 
 
 # PROMĚNNÁ PRO BEZPEČNOST
 class Agent:
-    def __init__(self):
-        cfg = config.load()
+    def __init__(self, transport=None, state_dir=None):
+        """
+        transport nahradí HTTP vrstvu (např. DryRunTransport při profilování),
+        state_dir adresář se stavem agenta (outbox, cache klíče, základ delt,
+        metriky); výchozí je config.CONFIG_DIR.
+        """
+        from lib.async_message_sender import AsyncMessageSender
+        from lib.delta_tracker import DeltaTracker
+        from lib.http_transport import HttpTransport
+        from lib.message_encryptor import MessageEncryptor
+        from lib.message_sender import MessageSender
+        from lib.outbox import Outbox
+        from lib.phase_metrics import EXPORT_JSON, PhaseMetrics
+        from lib.public_key_fetcher import PublicKeyFetcher
+        from lib.retry_policy import CircuitBreaker, RetryPolicy
+        from lib.send_scheduler import SendScheduler
+        from lib.system_info import registry
+        from lib.system_info_reporter import SystemInfoReporter
+
+        self._state_dir = Path(state_dir) if state_dir else config.CONFIG_DIR
+        self._config_manager = config.ConfigManager()
+        cfg = self.config = self._config_manager.config
+        logging.getLogger().setLevel(cfg.log_level)
         self.agent_id = os.getenv("AGENT_ID", "unknown_agent")
-        self.server_url = cfg.get("server_url", "http://localhost:8000")
-        self.auth_token = cfg.get("auth_token", "")
+        self.server_url = cfg.server_url
+        self.auth_token = cfg.auth_token
         if not self.auth_token or self.auth_token == "NOT_CONFIGURED":
             logging.error(
                 "Chyba: 'auth_token' není nastaven. Spusť 'agent-cli set auth_token <token>'"
             )
             sys.exit(1)
-        self._public_key_fetcher = PublicKeyFetcher(self.server_url)
-        self._message_encryptor = MessageEncryptor()
-        self._message_sender = MessageSender(self.server_url, self.agent_id)
-        self._system_info_reporter = (
-            SystemInfoReporter()
-        )  # Instantiate SystemInfoReporter
+        # Časy fází cyklu (sběr, šifrování, RSA, HTTP...) a počty výsledků;
+        # po každém cyklu se zapíšou do souboru pro diagnostiku na hostu
+        self._phase_metrics = PhaseMetrics()
+        self._metrics_format = cfg.phase_metrics_export
+        self._metrics_file = None
+        if self._metrics_format != "none":
+            suffix = "json" if self._metrics_format == EXPORT_JSON else "prom"
+            self._metrics_file = self._state_dir / f"agent_metrics.{suffix}"
+        self._phase_metrics_in_report = cfg.phase_metrics_report == "summary"
+        # Jeden pool spojení sdílený fetcherem klíče i odesílačem zpráv
+        self._transport = transport or HttpTransport(
+            connect_timeout=cfg.connect_timeout,
+            read_timeout=cfg.read_timeout,
+        )
+        self._public_key_fetcher = PublicKeyFetcher(
+            self.server_url,
+            self._transport,
+            cache_file=self._state_dir / "public_key_cache.json",
+            ttl=cfg.public_key_ttl_seconds,
+            metrics=self._phase_metrics,
+        )
+        compression = cfg.compression
+        self._message_encryptor = MessageEncryptor(
+            compression=None if compression == "none" else compression,
+            compression_threshold=cfg.compression_threshold,
+            session_max_messages=cfg.session_max_messages,
+            session_max_age=cfg.session_max_age_seconds,
+            metrics=self._phase_metrics,
+        )
+        # Nedoručené zprávy se ukládají na disk a odešlou se po obnovení spojení
+        outbox_max_bytes = cfg.outbox_max_bytes
+        self._outbox = (
+            Outbox(self._state_dir / "outbox", max_bytes=outbox_max_bytes)
+            if outbox_max_bytes > 0
+            else None
+        )
+        self._message_sender = MessageSender(
+            self.server_url,
+            self.agent_id,
+            self._transport,
+            self._outbox,
+            wire_format=cfg.wire_format,
+            retry_policy=RetryPolicy(
+                max_attempts=cfg.retry_max_attempts,
+                base_delay=cfg.retry_base_delay,
+                max_delay=cfg.retry_max_delay,
+            ),
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=cfg.circuit_failure_threshold,
+                reset_timeout=cfg.circuit_reset_seconds,
+            ),
+            metrics=self._phase_metrics,
+        )
+        self._async_sender = AsyncMessageSender(self._message_sender)
+        # Sběr dat a šifrování (včetně RSA) běží mimo event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="agent-work"
+        )
         self.message_count = 0  # Initialize message_count as an instance variable
+        self.interval_seconds = cfg.interval_seconds
+        # Metriky se vzorkují častěji, než se reportuje; odchází jen souhrn
+        self._metric_sampler = self._create_metric_sampler(cfg.metrics_sample_seconds)
+        self._system_info_reporter = SystemInfoReporter(
+            self._metric_sampler
+        )  # Instantiate SystemInfoReporter
+        # Registr kolektorů (sdílený modulem system_info) má vlastní pool vláken;
+        # po close() ho případný další sběr založí znovu
+        self._collectors = registry
+        self.max_cycles_in_flight = 2
+        # Odesílání se rozkládá do intervalu podle hashe agent_id
+        self._scheduler = SendScheduler(
+            self.agent_id,
+            self.interval_seconds,
+            jitter_seconds=cfg.send_jitter_seconds,
+        )
+
+        # Dávkové odesílání - při batch_size > 1 se reporty hromadí a posílají
+        # jedním POSTem, jakmile je dávka plná nebo nejstarší report čeká déle
+        # než batch_linger_seconds
+        self.batch_size = cfg.batch_size
+        self.batch_linger_seconds = cfg.batch_linger_seconds
+        self._pending_reports = []  # (content, client_timestamp)
+        self._pending_since = None
+        self._pending_client_ip = "N/A"
+        # Naplánovaná úloha proces ukončí bez signálu, takže dávka se průběžně
+        # ukládá na disk (i s právě odesílanými reporty) a po startu se obnoví
+        self._sending_batches = []
+        self._pending_file = self._state_dir / "pending_reports.json"
+        self._restore_pending_reports()
+        self._linger_task = None
+        self._linger_wake = None
+
+        # Delta reporty - posílají se jen pole změněná od posledního snapshotu
+        # potvrzeného serverem, plný snapshot každých delta_resync_cycles cyklů
+        delta_resync_cycles = cfg.delta_resync_cycles
+        self._delta_tracker = (
+            DeltaTracker(delta_resync_cycles, self._state_dir / "delta_state.json")
+            if delta_resync_cycles > 0
+            else None
+        )
+
+        # Řízení smyčky run_async (viz stop a reload_config)
+        self._loop = None
+        self._wake_event = None
+        self._stop_requested = False
+        self.config_poll_seconds = 5
+
+    def _create_metric_sampler(self, sample_seconds):
+        if sample_seconds <= 0:
+            return None
+        from lib.metric_sampler import MetricSampler
+
+        if not MetricSampler.available():
+            logging.warning("Balíček psutil není dostupný, metriky se nesbírají")
+            return None
+        return MetricSampler(
+            sample_seconds, self._metric_sampler_capacity(sample_seconds)
+        )
+
+    def _metric_sampler_capacity(self, sample_seconds):
+        # Rezerva pro reporty, které se zpozdí (pomalý server, zmeškaný slot)
+        return 2 * math.ceil(self.interval_seconds / sample_seconds)
 
     def _fetch_public_key(self):
         return self._public_key_fetcher.fetch_public_key()
 
+    def _collect_system_info(self):
+        with self._phase_metrics.phase("collect"):
+            return self._system_info_reporter.report_system_info()
+
+    def _export_metrics(self):
+        try:
+            self._phase_metrics.write(self._metrics_file, self._metrics_format)
+        except OSError as e:
+            logging.warning("%s: Metriky nelze zapsat: %s", self.agent_id, e)
+
+    async def _in_executor(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _prefetch_public_key(self):
+        import requests
+
+        # Chyba se neztratí - zopakuje a zaloguje ji až samotné odeslání
+        try:
+            await self._in_executor(self._fetch_public_key)
+        except requests.exceptions.RequestException:
+            pass
+
     def send_message(
         self, content, hostname, client_ip, client_os, client_state, client_points
     ):
         """Pošle šifrovanou zprávu na server (AES-GCM + RSA-OAEP)."""
-        try:
-            public_key = self._fetch_public_key()
+        return asyncio.run(
+            self.send_message_async(
+                content, hostname, client_ip, client_os, client_state, client_points
+            )
+        )
 
-            encrypted_key_b64, nonce_b64, ciphertext_b64 = (
-                self._message_encryptor.encrypt_message(
-                    json.loads(content), self.auth_token, public_key
-                )
+    async def send_message_async(
+        self, content, hostname, client_ip, client_os, client_state, client_points
+    ):
+        """
+        Asynchronní varianta send_message - šifrování i HTTP běží mimo event loop.
+
+        content je už serializovaný JSON (bytes, případně str) a do obálky se
+        vloží beze změny, bez dalšího parsování a serializace.
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+
+        def seal(public_key):
+            return self._message_encryptor.seal_message(
+                content, self.auth_token, public_key
             )
 
+        async def send(envelope):
             # Use the MessageSender to send the message
-            return self._message_sender.send_message(
-                encrypted_key_b64,
-                nonce_b64,
-                ciphertext_b64,
+            return await self._async_sender.send_envelope(
+                envelope,
                 client_ip,
                 self.message_count,
                 client_os,
@@ -75,19 +244,283 @@ class Agent:
                 client_points,
             )
 
-        except requests.exceptions.RequestException as e:
-            logging.error(
-                "%s: Chyba při odesílání nebo získávání klíče - %s", self.agent_id, e
+        return await self._seal_and_send(seal, send)
+
+    async def send_report_async(
+        self, system_info, client_ip, client_os, client_state, client_points
+    ):
+        """Pošle report jako deltu vůči poslednímu potvrzenému snapshotu."""
+        tracker = self._delta_tracker
+        full = True
+
+        def seal(public_key):
+            nonlocal full
+            # Obsah se připravuje až tady, aby opakování po resetu šlo plné
+            content, full = tracker.prepare(system_info)
+            return self._message_encryptor.seal_message(
+                content, self.auth_token, public_key
+            )
+
+        async def send(envelope):
+            return await self._async_sender.send_envelope(
+                envelope,
+                client_ip,
+                self.message_count,
+                client_os,
+                client_state,
+                client_points,
+            )
+
+        delivered = await self._seal_and_send(seal, send)
+        if delivered:
+            tracker.acknowledge(system_info, full)
+        return delivered
+
+    async def _seal_and_send(self, seal, send):
+        """
+        Získá klíč, zašifruje (seal) a odešle (send). Když server zprávu odmítne
+        kvůli stavu, který lze obnovit (např. neznámá session), stav obnoví
+        a zprávu jednou zopakuje.
+        """
+        import requests
+        from lib.message_sender import MessageRejectedError
+
+        for attempt in range(2):
+            try:
+                public_key = await self._in_executor(self._fetch_public_key)
+                envelope = await self._in_executor(seal, public_key)
+                delivered = await send(envelope)
+                self._phase_metrics.count(
+                    "messages_delivered" if delivered else "messages_failed"
+                )
+                return delivered
+
+            except MessageRejectedError as e:
+                self._phase_metrics.count("rejections")
+                if attempt == 0 and self._recover_from_rejection(e.reason):
+                    continue
+                logging.error("%s: Server zprávu odmítl - %s", self.agent_id, e.reason)
+                self._phase_metrics.count("messages_failed")
+                return False
+
+            except requests.exceptions.RequestException as e:
+                logging.error(
+                    "%s: Chyba při odesílání nebo získávání klíče - %s",
+                    self.agent_id,
+                    e,
+                )
+                self._phase_metrics.count("messages_failed")
+                return False
+
+    def _recover_from_rejection(self, reason):
+        """Vrací True, pokud má smysl zprávu po obnově stavu poslat znovu."""
+        if reason == "unknown_session":
+            logging.info("%s: Server nezná session klíč, zakládám novou", self.agent_id)
+            self._message_encryptor.reset_session()
+            return True
+        if reason == "key_rotated":
+            logging.info("%s: Server změnil veřejný klíč, stahuji nový", self.agent_id)
+            self._public_key_fetcher.invalidate()
+            self._message_encryptor.reset_session()
+            return True
+        if reason == "base_hash_mismatch" and self._delta_tracker is not None:
+            logging.info(
+                "%s: Server nemá základ delty, posílám plný snapshot", self.agent_id
+            )
+            self._delta_tracker.reset()
+            return True
+        return False
+
+    def queue_report(self, system_info, client_ip):
+        """Zařadí report do čekající dávky."""
+        if not self._pending_reports:
+            self._pending_since = time.monotonic()
+        self._pending_reports.append((system_info, int(time.time())))
+        self._pending_client_ip = client_ip
+        self._save_pending_reports()
+
+    def _save_pending_reports(self):
+        from lib import json_codec
+
+        reports = [r for batch in self._sending_batches for r in batch]
+        reports += self._pending_reports
+        try:
+            if not reports:
+                self._pending_file.unlink(missing_ok=True)
+                return
+            tmp_file = self._pending_file.with_suffix(".tmp")
+            tmp_file.write_bytes(
+                json_codec.dumps(
+                    {"client_ip": self._pending_client_ip, "reports": reports}
+                )
+            )
+            os.replace(tmp_file, self._pending_file)
+        except OSError as e:
+            logging.warning("%s: Čekající dávku nelze uložit: %s", self.agent_id, e)
+
+    def _restore_pending_reports(self):
+        from lib import json_codec
+
+        try:
+            state = json_codec.loads(self._pending_file.read_bytes())
+            reports = [(content, int(ts)) for content, ts in state["reports"]]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(
+                "%s: Ignoruji neplatnou uloženou dávku: %s", self.agent_id, e
+            )
+            return
+        if reports:
+            logging.info(
+                "%s: Obnoveno reportů z nedokončené dávky: %d",
+                self.agent_id,
+                len(reports),
             )
+            self._pending_reports = reports
+            self._pending_since = time.monotonic()
+            self._pending_client_ip = state.get("client_ip", "N/A")
+
+    def _schedule_linger_flush(self):
+        """
+        Neúplnou dávku odešle časovač po batch_linger_seconds, ne až další
+        cyklus (ten může přijít o celý interval později).
+        """
+        if self._linger_task is None or self._linger_task.done():
+            self._linger_wake = asyncio.Event()
+            self._linger_task = asyncio.ensure_future(
+                self._flush_after_linger(self._linger_wake)
+            )
+
+    async def _flush_after_linger(self, wake):
+        # Neruší se (mohlo by přerušit rozběhnuté odeslání); při ukončení ho
+        # run_async probudí přes wake a počká, až čekající dávku odešle
+        try:
+            while self._pending_reports:
+                remaining = (
+                    self._pending_since + self.batch_linger_seconds - time.monotonic()
+                )
+                if remaining > 0 and not wake.is_set():
+                    try:
+                        await asyncio.wait_for(wake.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if not await self.flush_reports_async():
+                    # Dávka zůstala čekat - další pokus až s dalším cyklem
+                    return
+        except Exception:
+            logging.exception("%s: Odeslání dávky selhalo", self.agent_id)
+
+    def _batch_ready(self):
+        if not self._pending_reports:
             return False
+        if len(self._pending_reports) >= self.batch_size:
+            return True
+        return time.monotonic() - self._pending_since >= self.batch_linger_seconds
+
+    def flush_reports(self):
+        """Pošle všechny čekající reporty jako jednu šifrovanou dávku."""
+        return asyncio.run(self.flush_reports_async())
+
+    async def flush_reports_async(self):
+        if not self._pending_reports:
+            return True
+
+        reports = self._pending_reports
+        pending_since = self._pending_since
+        self._pending_reports = []
+        self._pending_since = None
+        self._sending_batches.append(reports)
+        handed_off = delivered = False
+
+        def seal(public_key):
+            return self._message_encryptor.seal_batch(
+                reports, self.auth_token, public_key
+            )
+
+        async def send(envelope):
+            nonlocal handed_off
+            sent = await self._async_sender.send_batch_envelope(
+                envelope,
+                len(reports),
+                self._pending_client_ip,
+                self.message_count,
+            )
+            # Nedoručenou dávku si převzal outbox (nebo ji server odmítl)
+            handed_off = self._outbox is not None
+            return sent
+
+        try:
+            delivered = await self._seal_and_send(seal, send)
+            return delivered
+        finally:
+            self._sending_batches = [
+                batch for batch in self._sending_batches if batch is not reports
+            ]
+            if not delivered and not handed_off:
+                # Klíč ani obálku se nepodařilo získat - dávka čeká dál
+                self._pending_reports = reports + self._pending_reports
+                if self._pending_since is None or pending_since < self._pending_since:
+                    self._pending_since = pending_since
+            # Doručená nebo do outboxu uložená dávka už na disku být nemusí
+            self._save_pending_reports()
+
+    def send_file(self, path, kind="diagnostics"):
+        """Pošle velký soubor (balík logů, inventář) šifrovaným streamem po chuncích."""
+        return asyncio.run(self.send_file_async(path, kind))
+
+    async def send_file_async(self, path, kind="diagnostics"):
+        with open(path, "rb") as source:
+
+            def seal(public_key):
+                # Při opakování po odmítnutí se soubor čte znovu od začátku
+                source.seek(0)
+                return self._message_encryptor.encrypt_stream(
+                    source, self.auth_token, public_key
+                )
+
+            async def send(stream):
+                return await self._async_sender.send_stream(stream, kind)
+
+            return await self._seal_and_send(seal, send)
+
+    def close(self):
+        """Uvolní spojení, vlákna a zapíše rozpracovaný outbox na disk."""
+        if self._metric_sampler is not None:
+            self._metric_sampler.stop()
+        self._async_sender.close()
+        self._executor.shutdown(wait=True)
+        self._collectors.close()
+        if self._outbox is not None:
+            self._outbox.close()
+        self._transport.close()
 
     def start_agent(self):
         """Spustí agenta - periodicky posílá zprávy"""
+        asyncio.run(self.start_agent_async())
+
+    async def start_agent_async(self):
+        """Jeden cyklus agenta: sběr dat souběžně se získáním klíče, pak odeslání."""
+        try:
+            await self._run_cycle_async()
+        finally:
+            if self._metrics_file is not None:
+                await self._in_executor(self._export_metrics)
+
+    async def _run_cycle_async(self):
         logging.info("Agent %s startuje...", self.agent_id)
         logging.info("Cílová URL: %s", self.server_url)
 
         self.message_count += 1  # Increment instance message_count
-        system_info = self._system_info_reporter.report_system_info()
+        key_prefetch = asyncio.ensure_future(self._prefetch_public_key())
+        system_info = await self._in_executor(self._collect_system_info)
+        await key_prefetch
+        if self._phase_metrics_in_report:
+            # Časy od minulého reportu - odeslání tohoto ještě neproběhlo
+            system_info = dict(
+                system_info, agent_timings=self._phase_metrics.cycle_summary()
+            )
 
         # Extract values for message sending
         hostname = system_info.get("hostname", "unknown-host")
@@ -96,9 +529,27 @@ class Agent:
         client_state = system_info.get("state", "unknown-state")
         client_points = system_info.get("points", 0)
 
-        content = json.dumps(system_info, ensure_ascii=False)
+        if self.batch_size > 1:
+            self.queue_report(system_info, client_ip)
+            if self._batch_ready():
+                await self.flush_reports_async()
+            else:
+                self._schedule_linger_flush()
+            return
+
+        if self._delta_tracker is not None:
+            await self.send_report_async(
+                system_info, client_ip, client_os, client_state, client_points
+            )
+            return
+
+        from lib import json_codec
 
-        self.send_message(
+        # Jediná serializace reportu; dál se předávají hotové bajty
+        with self._phase_metrics.phase("serialize"):
+            content = json_codec.dumps(system_info)
+
+        await self.send_message_async(
             content,
             hostname,
             client_ip,
@@ -107,8 +558,231 @@ class Agent:
             client_points,
         )
 
+    async def run_async(self, cycles=None):
+        """
+        Opakuje cykly v odesílacích slotech agenta (viz SendScheduler).
+
+        Další sběr startuje podle plánu i tehdy, když předchozí odesílání ještě
+        čeká na pomalý server; souběžně běží nejvýše max_cycles_in_flight cyklů.
+        Po stop() se nové cykly nespouští, rozběhnuté doběhnou a čekající
+        dávka se odešle.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wake_event = asyncio.Event()
+        if self._stop_requested:
+            self._wake_event.set()
+        if self._metric_sampler is not None:
+            self._metric_sampler.start()
+        if self._pending_reports:
+            # Dávka obnovená z disku po předchozím běhu
+            self._schedule_linger_flush()
+        in_flight = asyncio.Semaphore(self.max_cycles_in_flight)
+        tasks = set()
+
+        async def cycle():
+            async with in_flight:
+                try:
+                    await self.start_agent_async()
+                except Exception:
+                    # Chyba jednoho cyklu nesmí ukončit službu
+                    logging.exception("%s: Cyklus agenta selhal", self.agent_id)
+
+        async def watch_config():
+            while True:
+                await asyncio.sleep(self.config_poll_seconds)
+                try:
+                    await self.reload_config_async()
+                except Exception:
+                    logging.exception("%s: Převzetí configu selhalo", self.agent_id)
+
+        watcher = asyncio.ensure_future(watch_config())
+        started = 0
+        while cycles is None or started < cycles:
+            if not await self._scheduler.wait_for_slot_async(self._wake_event):
+                if self._stop_requested:
+                    break
+                # Změnil se interval - čeká se na slot podle nového plánu
+                self._wake_event.clear()
+                continue
+            task = asyncio.ensure_future(cycle())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            started += 1
+
+        watcher.cancel()
+        if tasks:
+            await asyncio.gather(*tasks)
+        if self._linger_task is not None and not self._linger_task.done():
+            self._linger_wake.set()
+            await self._linger_task
+        await self.flush_reports_async()
+
+    def run_forever(self):
+        """
+        Služba: běží, dokud nepřijde signál k ukončení (SIGINT, SIGTERM).
+
+        Stop-ScheduledTask proces ukončí bez signálu, proto se na řádné ukončení
+        nespoléhá nic, co se nesmí ztratit - outbox i čekající dávka jsou na
+        disku průběžně.
+        """
+        signals = [signal.SIGINT, signal.SIGTERM]
+        if hasattr(signal, "SIGBREAK"):  # Ctrl+Break / ukončení konzole na Windows
+            signals.append(signal.SIGBREAK)
+        for signum in signals:
+            signal.signal(signum, lambda signum, frame: self.stop())
+
+        logging.info(
+            "%s: Běží jako služba, interval %s s", self.agent_id, self.interval_seconds
+        )
+        asyncio.run(self.run_async())
+        logging.info("%s: Služba ukončena", self.agent_id)
+
+    def stop(self):
+        """Požádá smyčku run_async o ukončení; lze volat ze signal handleru."""
+        self._stop_requested = True
+        self._wake()
+
+    def _wake(self):
+        if self._loop is not None and self._wake_event is not None:
+            self._loop.call_soon_threadsafe(self._wake_event.set)
+
+    def reload_config(self):
+        """
+        Převezme změny config.json bez restartu (viz config.HOT_RELOAD_KEYS).
+        Vrací True, pokud se konfigurace změnila.
+        """
+        return asyncio.run(self.reload_config_async())
+
+    async def reload_config_async(self):
+        new = self._config_manager.reload_if_changed()
+        if new is None:
+            return False
+        old, self.config = self.config, new
+        changed = new.changed_keys(old)
+        if not changed:
+            return False
+        logging.info("%s: Config změněn: %s", self.agent_id, ", ".join(changed))
+
+        if "log_level" in changed:
+            logging.getLogger().setLevel(new.log_level)
+        if "auth_token" in changed and new.auth_token not in ("", "NOT_CONFIGURED"):
+            self.auth_token = new.auth_token
+        if "server_url" in changed:
+            # Ve vlákně odesílání, aby se server nezměnil uprostřed požadavku
+            await self._async_sender.run_exclusive(self._switch_server, new.server_url)
+        if "interval_seconds" in changed or "send_jitter_seconds" in changed:
+            self.interval_seconds = new.interval_seconds
+            self._scheduler.reconfigure(new.interval_seconds, new.send_jitter_seconds)
+            if self._metric_sampler is not None:
+                self._metric_sampler.resize(
+                    self._metric_sampler_capacity(self._metric_sampler.sample_interval)
+                )
+            self._wake()
+        self.batch_size = new.batch_size
+        self.batch_linger_seconds = new.batch_linger_seconds
+        if self._batch_ready():
+            # Menší (nebo vypnutá) dávka - čekající reporty nesmí zůstat viset
+            await self.flush_reports_async()
+
+        needs_restart = [key for key in changed if key not in config.HOT_RELOAD_KEYS]
+        if needs_restart:
+            logging.warning(
+                "%s: Změna %s se projeví až po restartu služby",
+                self.agent_id,
+                ", ".join(needs_restart),
+            )
+        return True
+
+    def _switch_server(self, server_url):
+        """Přepne na nový server; volá se ve vlákně odesílání (viz reload_config)."""
+        from lib.outbox import DISCARDED
+        from lib.public_key_fetcher import PublicKeyFetcher
+
+        logging.info("%s: Přepínám na server %s", self.agent_id, server_url)
+        if self._outbox is not None and self._outbox.has_pending():
+            # Zprávy v outboxu jsou zašifrované klíčem starého serveru - ještě
+            # jeden pokus je doručit tam, nový server by je nerozšifroval
+            self._message_sender.flush_outbox()
+            if self._outbox.has_pending():
+                discarded = self._outbox.drain(lambda record: DISCARDED).discarded
+                logging.warning(
+                    "%s: Starý server %s nedostupný, zahozeno zpráv z outboxu: %d",
+                    self.agent_id,
+                    self.server_url,
+                    discarded,
+                )
+        self.server_url = server_url
+        # Klíč, session i základ delt patří starému serveru
+        self._public_key_fetcher = PublicKeyFetcher(
+            server_url,
+            self._transport,
+            cache_file=self._state_dir / "public_key_cache.json",
+            ttl=self.config.public_key_ttl_seconds,
+            metrics=self._phase_metrics,
+        )
+        self._message_encryptor.reset_session()
+        if self._delta_tracker is not None:
+            self._delta_tracker.reset()
+        self._message_sender.server_url = server_url
+        # Spojení z poolu vedou na starý server
+        self._transport.reset()
+
+    def wait_for_send_slot(self):
+        """Počká na odesílací slot agenta v rámci interval_seconds."""
+        self._scheduler.wait_for_slot()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="agent-service", description="Mastiff agent.")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Běží trvale a odesílá každých interval_seconds (jinak jeden běh).",
+    )
+    args = parser.parse_args(argv)
+
+    from lib.logging_setup import configure_logging
+
+    # Zápis logu běží ve vlákně na pozadí; stop() na konci dopíše frontu
+    cfg = config.ConfigManager().config
+    log_listener = configure_logging(
+        LOG_FILE,
+        cfg.log_level,
+        max_bytes=cfg.log_max_bytes,
+        backup_count=cfg.log_backup_count,
+        rotate_seconds=cfg.log_rotate_seconds,
+    )
+    try:
+        _run(args)
+    finally:
+        log_listener.stop()
+
+
+def _run(args):
+    # Jediná instance - naplánovaná úloha spuštěná nad běžící službou hned skončí
+    lock = InstanceLock(config.CONFIG_DIR / "agent.lock")
+    try:
+        lock.acquire()
+    except InstanceLockError as e:
+        logging.info("%s, končím", e)
+        return
+
+    try:
+        updater.check_for_update(__version__)
+        agent = Agent()
+        try:
+            if args.daemon:
+                agent.run_forever()
+            else:
+                agent.wait_for_send_slot()
+                agent.start_agent()
+                # Proces po jednom běhu končí, neodeslaná dávka se nesmí ztratit
+                agent.flush_reports()
+        finally:
+            agent.close()
+    finally:
+        lock.release()
+
 
 if __name__ == "__main__":
-    updater.check_for_update(__version__)
-    agent = Agent()
-    agent.start_agent()
+    main()
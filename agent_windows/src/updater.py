@@ -1,11 +1,11 @@
 import logging
 
-import requests
-
 GITHUB_REPO = "ondravaculik03/bakalarka_public"
 
 
 def get_latest_github_version():
+    import requests  # až tady - import requests je drahý a verze se ověřuje jednou
+
     url = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
     try:
         resp = requests.get(url, timeout=5)
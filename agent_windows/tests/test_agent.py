@@ -0,0 +1,312 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+import requests
+from src import config
+from src.lib.dry_run_transport import DryRunTransport
+from src.lib.metric_sampler import MetricSampler
+from src.lib.send_scheduler import SendScheduler
+
+OLD_URL = "http://old-server"
+NEW_URL = "http://new-server"
+
+
+class RecordingTransport(DryRunTransport):
+    """DryRunTransport, který si pamatuje URL a vlákno každého POSTu."""
+
+    def __init__(self):
+        super().__init__(key_size=1024)
+        self.posts = []
+        self.down = set()  # servery, které neodpovídají
+        self.resets = 0
+
+    def post(self, url, **kwargs):
+        self.posts.append((url, threading.current_thread().name))
+        if any(url.startswith(server) for server in self.down):
+            raise requests.exceptions.ConnectionError("offline")
+        return super().post(url, **kwargs)
+
+    def get(self, url, **kwargs):
+        if any(url.startswith(server) for server in self.down):
+            raise requests.exceptions.ConnectionError("offline")
+        return super().get(url, **kwargs)
+
+    def reset(self):
+        self.resets += 1
+
+
+@pytest.fixture
+def transport():
+    return RecordingTransport()
+
+
+@pytest.fixture
+def make_agent(tmp_path, monkeypatch, transport):
+    from src.main import Agent
+
+    monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE", tmp_path / "config.json")
+    monkeypatch.setenv("AGENT_ID", "test-agent")
+    agents = []
+
+    def make(**values):
+        config.save(
+            {
+                "server_url": OLD_URL,
+                "auth_token": "secret",
+                "metrics_sample_seconds": 0,
+                "phase_metrics_export": "none",
+                **values,
+            }
+        )
+        agent = Agent(transport=transport)
+        agents.append(agent)
+        return agent
+
+    yield make
+    for agent in agents:
+        agent.close()
+
+
+def update_config(**changes):
+    values = json.loads(config.CONFIG_FILE.read_text())
+    values.update(changes)
+    config.save(values)
+    # mtime se nesmí shodovat s předchozím zápisem (hrubé rozlišení na Windows)
+    stat = config.CONFIG_FILE.stat()
+    os.utime(config.CONFIG_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_reload_without_change_returns_false(make_agent):
+    agent = make_agent()
+
+    assert agent.reload_config() is False
+
+
+def test_switch_server_drains_old_outbox_on_sender_thread(make_agent, transport):
+    agent = make_agent()
+    agent._message_sender._spool("/api/message", {"encrypted_key": "old"})
+
+    update_config(server_url=NEW_URL)
+    assert agent.reload_config()
+
+    # Outbox odešel ještě na starý server, a to z vlákna odesílání
+    assert len(transport.posts) == 1
+    url, thread_name = transport.posts[0]
+    assert url == f"{OLD_URL}/api/message"
+    assert thread_name.startswith("agent-send")
+    assert not agent._outbox.has_pending()
+    assert transport.resets == 1
+
+    agent.start_agent()
+    assert transport.posts[-1][0] == f"{NEW_URL}/api/message"
+
+
+def test_switch_server_discards_outbox_when_old_server_is_down(
+    make_agent, transport, caplog
+):
+    agent = make_agent()
+    agent._message_sender._spool("/api/message", {"encrypted_key": "old"})
+    transport.down.add(OLD_URL)
+
+    update_config(server_url=NEW_URL)
+    agent.reload_config()
+
+    assert not agent._outbox.has_pending()
+    assert "zahozeno zpráv z outboxu: 1" in caplog.text
+    assert agent._message_sender.server_url == NEW_URL
+    assert agent._public_key_fetcher.server_url == NEW_URL
+
+
+def test_deleted_config_file_does_not_switch_server(make_agent, transport):
+    agent = make_agent()
+    config.CONFIG_FILE.unlink()
+
+    assert agent.reload_config() is False
+    assert agent.server_url == OLD_URL
+    assert transport.resets == 0
+
+
+def test_lowering_batch_size_flushes_pending_reports(make_agent, transport):
+    agent = make_agent(batch_size=5, batch_linger_seconds=3600)
+    agent.start_agent()
+    agent.start_agent()
+    assert len(agent._pending_reports) == 2
+    assert transport.posts == []
+
+    update_config(batch_size=1)
+    agent.reload_config()
+
+    assert agent._pending_reports == []
+    assert [url for url, _ in transport.posts] == [f"{OLD_URL}/api/message/batch"]
+
+
+def test_interval_change_resizes_metric_sampler(make_agent):
+    agent = make_agent(interval_seconds=60)
+    agent._metric_sampler = MetricSampler(10, agent._metric_sampler_capacity(10))
+    assert agent._metric_sampler.capacity == 12
+
+    update_config(interval_seconds=300)
+    agent.reload_config()
+
+    assert agent._metric_sampler.capacity == 60
+
+
+def test_each_report_is_serialized_once(make_agent):
+    agent = make_agent()
+
+    agent.start_agent()
+    agent.start_agent()
+
+    assert agent._phase_metrics.snapshot()["phases"]["serialize"]["count"] == 2
+
+
+def test_run_async_starts_cycles_in_scheduled_slots(make_agent):
+    agent = make_agent()
+    agent._scheduler = SendScheduler("test-agent", 0.05)
+    started = []
+
+    async def cycle():
+        started.append(time.monotonic())
+
+    agent.start_agent_async = cycle
+    asyncio.run(agent.run_async(cycles=3))
+
+    assert len(started) == 3
+    assert all(b - a >= 0.04 for a, b in zip(started, started[1:]))
+
+
+def test_run_async_limits_cycles_in_flight(make_agent):
+    agent = make_agent()
+    agent._scheduler = SendScheduler("test-agent", 0.01)
+    running = peak = 0
+
+    async def slow_cycle():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+
+    agent.start_agent_async = slow_cycle
+    asyncio.run(agent.run_async(cycles=6))
+
+    assert peak == agent.max_cycles_in_flight == 2
+
+
+def test_stop_waits_for_running_cycles_and_flushes_batch(make_agent, transport):
+    agent = make_agent(batch_size=10, batch_linger_seconds=3600)
+    agent._scheduler = SendScheduler("test-agent", 0.01)
+    queue_report = agent.start_agent_async
+    finished = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def cycle():
+            await queue_report()
+            await release.wait()
+            finished.append(True)
+
+        agent.start_agent_async = cycle
+        run = asyncio.ensure_future(agent.run_async())
+        while len(agent._pending_reports) < 2:
+            await asyncio.sleep(0.01)
+
+        agent.stop()
+        await asyncio.sleep(0.05)
+        # Nové cykly se nespouští, rozběhnuté se ale nepřeruší
+        assert not run.done()
+        release.set()
+        await run
+
+    asyncio.run(scenario())
+
+    assert len(finished) >= 2
+    assert agent._pending_reports == []
+    assert [url for url, _ in transport.posts] == [f"{OLD_URL}/api/message/batch"]
+
+
+def test_pending_batch_survives_process_kill(make_agent, transport):
+    agent = make_agent(batch_size=5, batch_linger_seconds=3600)
+    agent.start_agent()
+    agent.start_agent()
+
+    # Bez stop() a závěrečného flush - jako ukončení naplánované úlohy
+    restarted = make_agent(batch_size=5, batch_linger_seconds=3600)
+
+    assert len(restarted._pending_reports) == 2
+    assert restarted.flush_reports()
+    assert [url for url, _ in transport.posts] == [f"{OLD_URL}/api/message/batch"]
+    assert not (config.CONFIG_DIR / "pending_reports.json").exists()
+
+
+def test_batch_stays_pending_when_key_fetch_fails(make_agent, transport):
+    transport.down.add(OLD_URL)
+    agent = make_agent(batch_size=2, batch_linger_seconds=3600)
+
+    agent.start_agent()
+    agent.start_agent()
+
+    # Bez klíče nešlo dávku zašifrovat ani uložit do outboxu - nesmí se ztratit
+    assert transport.posts == []
+    assert len(agent._pending_reports) == 2
+    saved = json.loads((config.CONFIG_DIR / "pending_reports.json").read_text())
+    assert len(saved["reports"]) == 2
+
+    transport.down.clear()
+    agent.start_agent()
+
+    assert [url for url, _ in transport.posts] == [f"{OLD_URL}/api/message/batch"]
+    assert agent._pending_reports == []
+    assert not (config.CONFIG_DIR / "pending_reports.json").exists()
+
+
+def test_full_batch_is_sent_by_the_cycle_that_fills_it(make_agent, transport):
+    agent = make_agent(batch_size=2, batch_linger_seconds=3600)
+
+    agent.start_agent()
+    assert transport.posts == []
+    agent.start_agent()
+
+    assert [url for url, _ in transport.posts] == [f"{OLD_URL}/api/message/batch"]
+    assert agent._pending_reports == []
+
+
+def test_partial_batch_is_sent_after_linger_without_next_cycle(make_agent, transport):
+    agent = make_agent(batch_size=10, batch_linger_seconds=0.05)
+
+    async def scenario():
+        await agent.start_agent_async()
+        assert transport.posts == []
+        # Další cyklus nepřijde - dávku odešle časovač
+        await asyncio.sleep(0.3)
+
+    asyncio.run(scenario())
+
+    assert [url for url, _ in transport.posts] == [f"{OLD_URL}/api/message/batch"]
+    assert agent._pending_reports == []
+
+
+def test_run_async_flushes_partial_batch_at_the_end(make_agent, transport):
+    agent = make_agent(batch_size=10, batch_linger_seconds=3600)
+    agent._scheduler = SendScheduler("test-agent", 0.01)
+
+    asyncio.run(agent.run_async(cycles=3))
+
+    assert [url for url, _ in transport.posts] == [f"{OLD_URL}/api/message/batch"]
+    assert agent._pending_reports == []
+
+
+def test_close_stops_collector_pool(make_agent):
+    agent = make_agent()
+    agent.start_agent()
+    assert agent._collectors._pool is not None
+
+    agent.close()
+
+    assert agent._collectors._pool is None
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from src.lib.async_message_sender import AsyncMessageSender
+
+
+@pytest.fixture
+def sync_sender():
+    sender = MagicMock()
+    sender.send_message.return_value = True
+    sender.send_batch.return_value = True
+    return sender
+
+
+def test_send_message_runs_outside_event_loop_thread(sync_sender):
+    calling_threads = []
+    sync_sender.send_message.side_effect = lambda *args: (
+        calling_threads.append(threading.current_thread()) or True
+    )
+    async_sender = AsyncMessageSender(sync_sender)
+
+    result = asyncio.run(async_sender.send_message("key", "nonce", "cipher"))
+    async_sender.close()
+
+    assert result is True
+    sync_sender.send_message.assert_called_once_with("key", "nonce", "cipher")
+    assert calling_threads[0] is not threading.main_thread()
+
+
+def test_concurrent_sends_keep_order(sync_sender):
+    order = []
+    sync_sender.send_message.side_effect = lambda n: order.append(n) or True
+    async_sender = AsyncMessageSender(sync_sender)
+
+    async def send_all():
+        await asyncio.gather(*(async_sender.send_message(n) for n in range(10)))
+
+    asyncio.run(send_all())
+    async_sender.close()
+
+    assert order == list(range(10))
+
+
+def test_send_batch_and_flush_outbox_delegate(sync_sender):
+    sync_sender.flush_outbox.return_value = 3
+    async_sender = AsyncMessageSender(sync_sender)
+
+    async def run():
+        return (
+            await async_sender.send_batch("key", "nonce", "cipher", 2),
+            await async_sender.flush_outbox(),
+        )
+
+    assert asyncio.run(run()) == (True, 3)
+    async_sender.close()
+    sync_sender.send_batch.assert_called_once_with("key", "nonce", "cipher", 2)
@@ -0,0 +1,191 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from src.lib.collectors import EVERY_CYCLE, STATIC, TTL, Collector, CollectorRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def registry(clock):
+    registry = CollectorRegistry(clock=clock)
+    yield registry
+    registry.close()
+
+
+def test_collect_merges_fields_in_registration_order(registry):
+    registry.add(Collector("a", lambda: {"first": 1, "second": 2}))
+    registry.add(Collector("b", lambda: {"third": 3}))
+
+    assert list(registry.collect().items()) == [
+        ("first", 1),
+        ("second", 2),
+        ("third", 3),
+    ]
+
+
+def test_static_collector_runs_once(registry):
+    func = MagicMock(return_value={"processor": "cpu"})
+    registry.add(Collector("platform", func, STATIC))
+
+    for _ in range(3):
+        assert registry.collect() == {"processor": "cpu"}
+    func.assert_called_once()
+
+
+def test_ttl_collector_refreshes_after_expiry(registry, clock):
+    func = MagicMock(side_effect=[{"hostname": "old"}, {"hostname": "new"}])
+    registry.add(Collector("hostname", func, TTL, ttl=60))
+
+    assert registry.collect() == {"hostname": "old"}
+    clock.now = 59
+    assert registry.collect() == {"hostname": "old"}
+    clock.now = 60
+    assert registry.collect() == {"hostname": "new"}
+    assert func.call_count == 2
+
+
+def test_every_cycle_collector_is_not_cached(registry):
+    func = MagicMock(return_value={"user": "alice"})
+    registry.add(Collector("user", func, EVERY_CYCLE))
+
+    registry.collect()
+    registry.collect()
+
+    assert func.call_count == 2
+
+
+def test_failing_collector_is_omitted_and_retried(registry):
+    func = MagicMock(side_effect=[OSError("boom"), {"disk": "ok"}])
+    registry.add(Collector("disk", func, STATIC))
+    registry.add(Collector("user", lambda: {"user": "alice"}))
+
+    assert registry.collect() == {"user": "alice"}
+    assert registry.collect() == {"disk": "ok", "user": "alice"}
+
+
+def test_unregister_evicts_cache(registry):
+    func = MagicMock(return_value={"processor": "cpu"})
+    registry.add(Collector("platform", func, STATIC))
+    registry.collect()
+
+    registry.unregister("platform")
+    assert registry.collect() == {}
+
+    registry.add(Collector("platform", func, STATIC))
+    registry.collect()
+    assert func.call_count == 2
+
+
+def test_invalidate_forces_refresh(registry):
+    func = MagicMock(return_value={"processor": "cpu"})
+    registry.register("platform", policy=STATIC)(func)
+    registry.collect()
+
+    registry.invalidate("platform")
+    registry.collect()
+
+    assert func.call_count == 2
+
+
+def test_unknown_policy_is_rejected(registry):
+    with pytest.raises(ValueError):
+        registry.add(Collector("x", dict, "sometimes"))
+
+
+def test_get_system_info_keeps_report_fields():
+    from src.lib.system_info import get_system_info
+
+    assert list(get_system_info()) == [
+        "hostname",
+        "user",
+        "os",
+        "os_version",
+        "architecture",
+        "processor",
+    ]
+
+
+def _slow(seconds, values, started=None):
+    def func():
+        if started is not None:
+            started.set()
+        time.sleep(seconds)
+        return values
+
+    return func
+
+
+def test_collectors_run_concurrently(registry):
+    for i in range(4):
+        registry.add(Collector(f"c{i}", _slow(0.2, {f"field{i}": i})))
+
+    t0 = time.monotonic()
+    info = registry.collect()
+    elapsed = time.monotonic() - t0
+
+    assert info == {"field0": 0, "field1": 1, "field2": 2, "field3": 3}
+    assert elapsed < 0.6  # sériově by to bylo 0.8 s
+
+
+def test_collector_over_budget_is_omitted(registry):
+    release = threading.Event()
+    registry.add(Collector("hung", lambda: release.wait() and {"hung": 1}, timeout=0.1))
+    registry.add(Collector("fast", lambda: {"fast": 1}))
+
+    t0 = time.monotonic()
+    info = registry.collect()
+    elapsed = time.monotonic() - t0
+    release.set()
+
+    assert info == {"fast": 1}
+    assert elapsed < 1.0
+
+
+def test_late_collector_reports_last_known_values_as_stale(registry):
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait()
+        return {"disk": len(calls)}
+
+    registry.add(Collector("disk", func, EVERY_CYCLE, timeout=0.1))
+    assert registry.collect() == {"disk": 1}
+
+    info = registry.collect()
+    assert info == {"disk": 1, "stale_collectors": ["disk"]}
+
+    # Zaseknutý běh se nespouští znovu, jen se na něj čeká
+    registry.collect()
+    assert len(calls) == 2
+    release.set()
+
+
+def test_cycle_deadline_caps_collector_budgets(clock):
+    registry = CollectorRegistry(clock=clock, default_timeout=5.0, deadline=0.2)
+    release = threading.Event()
+    registry.add(Collector("slow", lambda: release.wait() and {}))
+
+    t0 = time.monotonic()
+    registry.collect()
+    elapsed = time.monotonic() - t0
+    release.set()
+    registry.close()
+
+    assert elapsed < 1.0
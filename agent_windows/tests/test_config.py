@@ -0,0 +1,127 @@
+import json
+import os
+
+import pytest
+from src import config
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE", tmp_path / "config.json")
+    return tmp_path / "config.json"
+
+
+def test_from_dict_parses_types_and_defaults():
+    cfg = config.AgentConfig.from_dict(
+        {"interval_seconds": "30", "read_timeout": 10, "log_level": "debug"}
+    )
+
+    assert cfg.interval_seconds == 30
+    assert cfg.read_timeout == 10.0
+    assert cfg.log_level == "DEBUG"
+    assert cfg.batch_size == 1
+    assert cfg.wire_format == "json"
+
+
+def test_invalid_values_fall_back_to_defaults(caplog):
+    cfg = config.AgentConfig.from_dict(
+        {"interval_seconds": -5, "compression": "zstd", "batch_size": True}
+    )
+
+    assert cfg.interval_seconds == 60
+    assert cfg.compression == "none"
+    assert cfg.batch_size == 1
+    assert "interval_seconds" in caplog.text
+
+
+def test_unknown_keys_are_kept():
+    cfg = config.AgentConfig.from_dict({"version": "1.0.0"})
+
+    assert cfg.get("version") == "1.0.0"
+    assert cfg.to_dict()["version"] == "1.0.0"
+
+
+def test_config_is_slotted():
+    cfg = config.AgentConfig()
+
+    with pytest.raises(AttributeError):
+        cfg.typo_seconds = 1
+
+
+def test_changed_keys():
+    old = config.AgentConfig.from_dict({"interval_seconds": 60})
+    new = config.AgentConfig.from_dict({"interval_seconds": 30, "log_level": "DEBUG"})
+
+    assert new.changed_keys(old) == ["log_level", "interval_seconds"]
+
+
+def test_manager_reloads_only_after_file_change(config_file):
+    config.save({"auth_token": "a", "interval_seconds": 60})
+    manager = config.ConfigManager()
+    assert manager.config.interval_seconds == 60
+
+    assert manager.reload_if_changed() is None
+
+    config.save({"auth_token": "a", "interval_seconds": 90})
+    # Stejná velikost souboru - změnu pozná podle mtime
+    stat = config_file.stat()
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    reloaded = manager.reload_if_changed()
+
+    assert reloaded.interval_seconds == 90
+    assert manager.config is reloaded
+
+
+def test_manager_keeps_config_when_file_is_broken(config_file):
+    config.save({"interval_seconds": 30})
+    manager = config.ConfigManager()
+    manager.config
+
+    config_file.write_text("{broken")
+
+    assert manager.reload_if_changed() is None
+    assert manager.config.interval_seconds == 30
+
+
+def test_save_is_atomic(config_file):
+    config.save({"interval_seconds": 30})
+
+    assert json.loads(config_file.read_text()) == {"interval_seconds": 30}
+    assert not config_file.with_suffix(".tmp").exists()
+
+
+@pytest.mark.parametrize(
+    "url", ["NOT_CONFIGURED", "ftp://server", "http://", "localhost:8000", ""]
+)
+def test_invalid_server_url_falls_back_to_default(url):
+    cfg = config.AgentConfig.from_dict({"server_url": url})
+
+    assert cfg.server_url == "http://localhost:8000"
+
+
+def test_manager_keeps_previous_value_when_reloaded_value_is_invalid(config_file):
+    config.save({"server_url": "https://server.example", "interval_seconds": 60})
+    manager = config.ConfigManager()
+    manager.config
+
+    config.save({"server_url": "NOT_CONFIGURED", "interval_seconds": 90})
+    stat = config_file.stat()
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    reloaded = manager.reload_if_changed()
+
+    assert reloaded.server_url == "https://server.example"
+    assert reloaded.interval_seconds == 90
+
+
+def test_manager_ignores_deleted_config_file(config_file):
+    config.save({"server_url": "https://server.example"})
+    manager = config.ConfigManager()
+    manager.config
+
+    config_file.unlink()
+
+    assert manager.reload_if_changed() is None
+    assert manager.config.server_url == "https://server.example"
+    # Výchozí config se za běhu nezakládá
+    assert not config_file.exists()
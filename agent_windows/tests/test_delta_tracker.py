@@ -0,0 +1,93 @@
+import pytest
+from src.lib.delta_tracker import DeltaTracker
+
+
+@pytest.fixture
+def snapshot():
+    return {
+        "hostname": "host",
+        "architecture": "AMD64",
+        "processor": "Intel64",
+        "user": "alice",
+    }
+
+
+def test_first_report_is_full(snapshot):
+    tracker = DeltaTracker(resync_cycles=10)
+
+    content, full = tracker.prepare(snapshot)
+
+    assert full
+    assert content == snapshot
+
+
+def test_delta_contains_only_changed_fields(snapshot):
+    tracker = DeltaTracker(resync_cycles=10)
+    tracker.acknowledge(snapshot, full=True)
+    current = dict(snapshot, user="bob")
+    del current["processor"]
+
+    content, full = tracker.prepare(current)
+
+    assert not full
+    assert content == {
+        "base_hash": DeltaTracker.snapshot_hash(snapshot),
+        "hash": DeltaTracker.snapshot_hash(current),
+        "changed": {"user": "bob"},
+        "removed": ["processor"],
+    }
+
+
+def test_unacknowledged_report_keeps_old_base(snapshot):
+    tracker = DeltaTracker(resync_cycles=10)
+    tracker.acknowledge(snapshot, full=True)
+
+    tracker.prepare(dict(snapshot, user="bob"))  # neodesláno
+    content, _ = tracker.prepare(dict(snapshot, user="carol"))
+
+    assert content["base_hash"] == DeltaTracker.snapshot_hash(snapshot)
+    assert content["changed"] == {"user": "carol"}
+
+
+def test_full_resync_every_n_cycles(snapshot):
+    tracker = DeltaTracker(resync_cycles=3)
+
+    kinds = []
+    for _ in range(7):
+        _, full = tracker.prepare(snapshot)
+        tracker.acknowledge(snapshot, full)
+        kinds.append(full)
+
+    assert kinds == [True, False, False, True, False, False, True]
+
+
+def test_reset_forces_full_report(snapshot):
+    tracker = DeltaTracker(resync_cycles=10)
+    tracker.acknowledge(snapshot, full=True)
+
+    tracker.reset()
+
+    assert tracker.prepare(snapshot) == (snapshot, True)
+
+
+def test_hash_is_independent_of_key_order(snapshot):
+    reordered = dict(reversed(list(snapshot.items())))
+
+    assert DeltaTracker.snapshot_hash(reordered) == DeltaTracker.snapshot_hash(snapshot)
+
+
+def test_base_survives_restart(tmp_path, snapshot):
+    state_file = tmp_path / "delta_state.json"
+    DeltaTracker(10, state_file).acknowledge(snapshot, full=True)
+
+    content, full = DeltaTracker(10, state_file).prepare(snapshot)
+
+    assert not full
+    assert content["changed"] == {}
+
+
+def test_corrupted_state_is_ignored(tmp_path, snapshot):
+    state_file = tmp_path / "delta_state.json"
+    state_file.write_text("{not json")
+
+    assert DeltaTracker(10, state_file).prepare(snapshot) == (snapshot, True)
@@ -0,0 +1,54 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from src.lib.http_transport import HttpTransport
+
+
+@pytest.fixture
+def transport_instance():
+    return HttpTransport(connect_timeout=2, read_timeout=10)
+
+
+def test_get_applies_default_timeout(transport_instance):
+    with patch("requests.Session.get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=200)
+
+        transport_instance.get("http://test-server.com/api/public_key")
+
+        mock_get.assert_called_once_with(
+            "http://test-server.com/api/public_key", timeout=(2, 10)
+        )
+
+
+def test_post_keeps_explicit_timeout(transport_instance):
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
+
+        transport_instance.post("http://test-server.com/api/message", timeout=1)
+
+        mock_post.assert_called_once_with(
+            "http://test-server.com/api/message", timeout=1
+        )
+
+
+def test_requests_share_one_session(transport_instance):
+    session = transport_instance._session
+
+    with patch.object(session, "get") as mock_get, patch.object(
+        session, "post"
+    ) as mock_post:
+        transport_instance.get("http://test-server.com/a")
+        transport_instance.post("http://test-server.com/b")
+
+        mock_get.assert_called_once()
+        mock_post.assert_called_once()
+
+
+def test_reset_replaces_session(transport_instance):
+    old_session = transport_instance._session
+
+    with patch.object(old_session, "close") as mock_close:
+        transport_instance.reset()
+
+        mock_close.assert_called_once()
+    assert transport_instance._session is not old_session
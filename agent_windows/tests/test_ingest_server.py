@@ -0,0 +1,319 @@
+import dataclasses
+import io
+
+import pytest
+import requests
+from src import config
+from src.lib.delta_tracker import DeltaTracker
+from src.lib.http_transport import HttpTransport
+from src.lib.message_encryptor import MessageEncryptor
+from src.lib.message_sender import MessageRejectedError, MessageSender
+from src.lib.outbox import Outbox
+from src.lib.public_key_fetcher import PublicKeyFetcher
+from src.lib.retry_policy import RetryPolicy
+
+from benchmarks.ingest_server import IngestServer
+
+
+@pytest.fixture(scope="module")
+def server():
+    with IngestServer(auth_token="secret") as server:
+        yield server
+
+
+@pytest.fixture
+def transport():
+    transport = HttpTransport()
+    yield transport
+    transport.close()
+
+
+def make_sender(server, transport, wire_format="json", agent_id="agent-1"):
+    return MessageSender(server.url, agent_id, transport, wire_format=wire_format)
+
+
+def fetch_key(server, transport):
+    return PublicKeyFetcher(server.url, transport).fetch_public_key()
+
+
+@pytest.mark.parametrize("wire_format", ["json", "binary"])
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_message_is_decrypted(server, transport, wire_format, compression):
+    encryptor = MessageEncryptor(compression=compression, compression_threshold=1)
+    sender = make_sender(server, transport, wire_format)
+    content = {"hostname": "pc-01", "wire_format": wire_format, "c": compression}
+
+    envelope = encryptor.seal_message(content, "secret", fetch_key(server, transport))
+    assert sender.send_envelope(envelope, "10.0.0.1", 1, "Windows", "ok", 0)
+
+    assert server.reports[-1]["agent_id"] == "agent-1"
+    assert server.reports[-1]["content"] == content
+
+
+def test_batch_is_split_into_reports(server, transport):
+    encryptor = MessageEncryptor()
+    sender = make_sender(server, transport, "binary")
+    reports = [({"n": i}, 1000 + i) for i in range(3)]
+
+    envelope = encryptor.seal_batch(reports, "secret", fetch_key(server, transport))
+    assert sender.send_batch_envelope(envelope, 3, "10.0.0.1", 1)
+
+    received = list(server.reports)[-3:]
+    assert [r["content"] for r in received] == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert [r["client_timestamp"] for r in received] == [1000, 1001, 1002]
+
+
+def test_wrong_auth_token_is_refused(server, transport):
+    encryptor = MessageEncryptor()
+    sender = make_sender(server, transport)
+
+    envelope = encryptor.seal_message({}, "wrong", fetch_key(server, transport))
+
+    assert sender.send_envelope(envelope, "10.0.0.1", 1, "Windows", "ok", 0) is False
+    assert server.metrics()["rejected"]["invalid_token"] >= 1
+
+
+def test_session_key_is_unwrapped_once(server, transport):
+    encryptor = MessageEncryptor(session_max_messages=10)
+    sender = make_sender(server, transport)
+    public_key = fetch_key(server, transport)
+    unwraps = server.metrics()["rsa_unwraps"]
+
+    for i in range(3):
+        envelope = encryptor.seal_message({"n": i}, "secret", public_key)
+        assert sender.send_envelope(envelope, "10.0.0.1", i, "Windows", "ok", 0)
+
+    assert server.metrics()["rsa_unwraps"] == unwraps + 1
+    assert server.reports[-1]["content"] == {"n": 2}
+
+
+def test_forgotten_session_is_recovered_from_wrapped_key(server, transport):
+    encryptor = MessageEncryptor(session_max_messages=10)
+    sender = make_sender(server, transport)
+    public_key = fetch_key(server, transport)
+    envelope = encryptor.seal_message({}, "secret", public_key)
+    assert sender.send_envelope(envelope, "10.0.0.1", 1, "Windows", "ok", 0)
+
+    server.forget_sessions()
+    unwraps = server.metrics()["rsa_unwraps"]
+    envelope = encryptor.seal_message({"n": 2}, "secret", public_key)
+
+    assert sender.send_envelope(envelope, "10.0.0.1", 2, "Windows", "ok", 0)
+    assert server.metrics()["rsa_unwraps"] == unwraps + 1
+    assert server.reports[-1]["content"] == {"n": 2}
+
+
+def test_session_message_without_key_is_rejected_as_unknown(server, transport):
+    encryptor = MessageEncryptor(session_max_messages=10)
+    sender = make_sender(server, transport)
+    envelope = encryptor.seal_message({}, "secret", fetch_key(server, transport))
+    server.forget_sessions()
+
+    # Starší agenti posílali zabalený klíč jen v první zprávě session
+    with pytest.raises(MessageRejectedError) as e:
+        sender.send_envelope(
+            dataclasses.replace(envelope, encrypted_key=b""),
+            "10.0.0.1",
+            2,
+            "Windows",
+            "ok",
+            0,
+        )
+    assert e.value.reason == "unknown_session"
+
+
+def test_spooled_session_messages_survive_server_restart(server, transport, tmp_path):
+    outbox = Outbox(tmp_path / "outbox")
+    encryptor = MessageEncryptor(session_max_messages=10)
+    public_key = fetch_key(server, transport)
+    sender = MessageSender(server.url, "spool-agent", transport, outbox=outbox)
+    first = encryptor.seal_message({"n": 0}, "secret", public_key)
+    assert sender.send_envelope(first, "10.0.0.1", 0, "Windows", "ok", 0)
+
+    # Server je nedostupný, další zprávy téže session skončí v outboxu
+    offline = MessageSender(
+        "http://127.0.0.1:9",
+        "spool-agent",
+        transport,
+        outbox=outbox,
+        retry_policy=RetryPolicy(max_attempts=1),
+    )
+    for i in (1, 2):
+        envelope = encryptor.seal_message({"n": i}, "secret", public_key)
+        assert not offline.send_envelope(envelope, "10.0.0.1", i, "Windows", "ok", 0)
+
+    server.forget_sessions()
+
+    assert sender.flush_outbox() == 2
+    assert [r["content"] for r in list(server.reports)[-2:]] == [{"n": 1}, {"n": 2}]
+
+
+def test_delta_is_applied_to_last_snapshot(server, transport):
+    tracker = DeltaTracker(resync_cycles=10)
+    encryptor = MessageEncryptor()
+    sender = make_sender(server, transport, agent_id="delta-agent")
+    public_key = fetch_key(server, transport)
+
+    for snapshot in ({"a": 1, "b": 2}, {"a": 1, "b": 3}, {"a": 1}):
+        content, full = tracker.prepare(snapshot)
+        envelope = encryptor.seal_message(content, "secret", public_key)
+        assert sender.send_envelope(envelope, "10.0.0.1", 1, "Windows", "ok", 0)
+        tracker.acknowledge(snapshot, full)
+        assert server.reports[-1]["content"] == snapshot
+
+
+def test_delta_without_base_is_rejected(server, transport):
+    tracker = DeltaTracker(resync_cycles=10)
+    tracker.acknowledge({"a": 1}, True)  # server tento základ nikdy neviděl
+    encryptor = MessageEncryptor()
+    sender = make_sender(server, transport, agent_id="fresh-agent")
+
+    content, full = tracker.prepare({"a": 2})
+    envelope = encryptor.seal_message(content, "secret", fetch_key(server, transport))
+
+    assert full is False
+    with pytest.raises(MessageRejectedError) as e:
+        sender.send_envelope(envelope, "10.0.0.1", 1, "Windows", "ok", 0)
+    assert e.value.reason == "base_hash_mismatch"
+
+
+def test_stream_is_decrypted_chunk_by_chunk(server, transport):
+    data = bytes(range(256)) * 1000
+    encryptor = MessageEncryptor()
+    sender = make_sender(server, transport)
+
+    stream = encryptor.encrypt_stream(
+        io.BytesIO(data), "secret", fetch_key(server, transport), chunk_size=4096
+    )
+    assert sender.send_stream(stream, "logs")
+
+    received = server.streams[-1]
+    assert received["kind"] == "logs"
+    assert received["size"] == len(data)
+
+
+def test_public_key_etag_allows_conditional_get(server):
+    response = requests.get(f"{server.url}/api/public_key")
+    etag = response.headers["ETag"]
+
+    conditional = requests.get(
+        f"{server.url}/api/public_key", headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 200
+    assert conditional.status_code == 304
+
+
+def test_metrics_endpoint_reports_counters(server):
+    metrics = requests.get(f"{server.url}/metrics").json()
+
+    assert metrics["messages"] >= 0
+    assert "messages_per_second" in metrics
+    assert "rejected" in metrics
+
+
+def test_rotated_key_is_reported_to_agent(transport):
+    with IngestServer(key_size=1024) as server:
+        encryptor = MessageEncryptor()
+        sender = make_sender(server, transport)
+        old_key = fetch_key(server, transport)
+        server.rotate_key()
+
+        envelope = encryptor.seal_message({}, "any", old_key)
+
+        with pytest.raises(MessageRejectedError) as e:
+            sender.send_envelope(envelope, "10.0.0.1", 1, "Windows", "ok", 0)
+        assert e.value.reason == "key_rotated"
+
+
+def test_process_pool_decrypts_messages(transport):
+    with IngestServer(key_size=1024, workers=2) as server:
+        encryptor = MessageEncryptor(session_max_messages=5)
+        sender = make_sender(server, transport, "binary")
+        public_key = fetch_key(server, transport)
+
+        for i in range(4):
+            envelope = encryptor.seal_message({"n": i}, "any", public_key)
+            assert sender.send_envelope(envelope, "10.0.0.1", i, "Windows", "ok", 0)
+
+        assert [r["content"]["n"] for r in server.reports] == [0, 1, 2, 3]
+        assert server.metrics()["rsa_unwraps"] == 1
+
+
+def test_agent_cycle_end_to_end(tmp_path, monkeypatch):
+    from src.main import Agent
+
+    monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE", tmp_path / "config.json")
+    monkeypatch.setenv("AGENT_ID", "e2e-agent")
+
+    with IngestServer(key_size=1024, auth_token="secret") as server:
+        config.save(
+            {
+                "server_url": server.url,
+                "auth_token": "secret",
+                "wire_format": "binary",
+                "session_max_messages": 10,
+                "delta_resync_cycles": 5,
+                "metrics_sample_seconds": 0,
+                "phase_metrics_report": "summary",
+            }
+        )
+        agent = Agent()
+        try:
+            agent.start_agent()
+            agent.start_agent()
+        finally:
+            agent.close()
+
+        reports = list(server.reports)
+        assert [r["agent_id"] for r in reports] == ["e2e-agent", "e2e-agent"]
+        assert reports[1]["content"]["hostname"] == reports[0]["content"]["hostname"]
+        assert server.metrics()["rsa_unwraps"] == 1
+        # Druhý report nese časy fází prvního cyklu
+        assert reports[1]["content"]["agent_timings"]["http_ms"] > 0
+
+    exported = (tmp_path / "agent_metrics.prom").read_text()
+    assert "mastiff_messages_delivered_total 2" in exported
+    assert 'mastiff_phase_seconds_count{phase="rsa_wrap"} 1' in exported
+
+
+def test_agent_resends_full_report_after_base_hash_mismatch(tmp_path, monkeypatch):
+    from src.main import Agent
+
+    monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE", tmp_path / "config.json")
+    monkeypatch.setenv("AGENT_ID", "delta-e2e-agent")
+
+    with IngestServer(key_size=1024, auth_token="secret") as server:
+        config.save(
+            {
+                "server_url": server.url,
+                "auth_token": "secret",
+                "delta_resync_cycles": 10,
+                "metrics_sample_seconds": 0,
+                "phase_metrics_export": "none",
+            }
+        )
+        agent = Agent()
+        try:
+            agent.start_agent()  # plný snapshot
+            agent.start_agent()  # delta
+            assert agent._delta_tracker._deltas_since_full == 1
+
+            # Server přišel o základ - delta se odmítne a agent pošle plný report
+            server.forget_snapshots()
+            agent.start_agent()
+            assert agent._delta_tracker._deltas_since_full == 0
+
+            agent.start_agent()  # další delta už k novému základu pasuje
+        finally:
+            agent.close()
+
+        reports = list(server.reports)
+        assert len(reports) == 4
+        assert reports[2]["content"]["hostname"] == reports[0]["content"]["hostname"]
+        assert server.metrics()["rejected"] == {"base_hash_mismatch": 1}
+        counters = agent._phase_metrics.snapshot()["counters"]
+        assert counters["rejections"] == 1
+        assert counters["messages_delivered"] == 4
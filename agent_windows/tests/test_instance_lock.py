@@ -0,0 +1,30 @@
+import pytest
+from src.lib.instance_lock import InstanceLock, InstanceLockError
+
+
+def test_second_instance_is_refused(tmp_path):
+    lock_file = tmp_path / "agent.lock"
+
+    with InstanceLock(lock_file):
+        with pytest.raises(InstanceLockError):
+            InstanceLock(lock_file).acquire()
+
+
+def test_lock_is_reusable_after_release(tmp_path):
+    lock_file = tmp_path / "agent.lock"
+    first = InstanceLock(lock_file)
+    first.acquire()
+    first.release()
+
+    second = InstanceLock(lock_file)
+    second.acquire()
+    second.release()
+
+
+def test_lock_file_records_pid(tmp_path):
+    import os
+
+    lock_file = tmp_path / "agent.lock"
+
+    with InstanceLock(lock_file):
+        assert lock_file.read_text() == str(os.getpid())
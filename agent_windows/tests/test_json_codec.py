@@ -0,0 +1,30 @@
+import json
+from unittest.mock import patch
+
+from src.lib import json_codec
+
+DOCUMENT = {"hostname": "pc-01", "user": "Příliš žluťoučký", "points": 12, "ok": True}
+
+
+def test_dumps_returns_utf8_without_escapes():
+    encoded = json_codec.dumps(DOCUMENT)
+
+    assert isinstance(encoded, bytes)
+    assert "žluťoučký".encode("utf-8") in encoded
+    assert json.loads(encoded) == DOCUMENT
+
+
+def test_stdlib_fallback_matches_fast_backend():
+    fast = json_codec.dumps(DOCUMENT)
+
+    with patch.object(json_codec, "orjson", None):
+        fallback = json_codec.dumps(DOCUMENT)
+        assert json_codec.loads(fallback) == DOCUMENT
+
+    assert json.loads(fallback) == json.loads(fast)
+
+
+def test_values_unsupported_by_orjson_fall_back_to_stdlib():
+    document = {"big": 2**70, 1: "int key"}
+
+    assert json.loads(json_codec.dumps(document)) == {"big": 2**70, "1": "int key"}
@@ -0,0 +1,61 @@
+import pytest
+
+from benchmarks.loadgen import summarize
+from benchmarks.stats import percentile
+
+
+def worker_result(latencies, outcomes, slots, missed_slots=0):
+    return {
+        "latencies_ms": latencies,
+        "outcomes": outcomes,
+        "reports": outcomes.get("ok", 0),
+        "slots": slots,
+        "missed_slots": missed_slots,
+    }
+
+
+@pytest.mark.parametrize(
+    "pct, expected", [(0, 1.0), (50, 51.0), (95, 96.0), (99, 100.0), (100, 101.0)]
+)
+def test_percentile_nearest_rank(pct, expected):
+    values = [float(v) for v in range(1, 102)]
+
+    assert percentile(values, pct) == expected
+
+
+def test_percentile_single_value():
+    assert percentile([7.5], 99) == 7.5
+
+
+def test_summarize_merges_workers():
+    results = [
+        worker_result([30.0, 10.0], {"ok": 2}, slots=2),
+        worker_result([20.0, 40.0], {"ok": 1, "rejected:invalid_token": 1}, slots=3),
+    ]
+
+    summary = summarize(results, elapsed=2.0, target_slots_per_sec=2.5)
+
+    assert summary["messages"] == 4
+    assert summary["reports"] == 3
+    assert summary["messages_per_sec"] == 2.0
+    assert summary["error_rate"] == 0.25
+    assert summary["outcomes"] == {"ok": 3, "rejected:invalid_token": 1}
+    assert (summary["p50_ms"], summary["max_ms"]) == (30.0, 40.0)
+    assert summary["achieved_slots_per_sec"] == summary["target_slots_per_sec"] == 2.5
+
+
+def test_summarize_reports_missed_slots():
+    results = [worker_result([5.0], {"ok": 1}, slots=1, missed_slots=3)]
+
+    summary = summarize(results, elapsed=1.0, target_slots_per_sec=4.0)
+
+    assert summary["missed_slots"] == 3
+    assert summary["achieved_slots_per_sec"] == 1.0
+
+
+def test_summarize_without_messages():
+    summary = summarize([worker_result([], {}, slots=0)], elapsed=1.0)
+
+    assert summary["messages"] == 0
+    assert summary["error_rate"] == 0.0
+    assert "p50_ms" not in summary
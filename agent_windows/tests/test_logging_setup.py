@@ -0,0 +1,93 @@
+import gzip
+import logging
+
+import pytest
+from src.lib.logging_setup import RotatingLogHandler, configure_logging
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_record(message):
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, None, None)
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_rotates_by_size_and_compresses(tmp_path):
+    log_file = tmp_path / "agent_info.log"
+    handler = RotatingLogHandler(log_file, max_bytes=100, backup_count=2)
+
+    for i in range(10):
+        handler.emit(make_record(f"zpráva {i} " + "x" * 40))
+    handler.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "agent_info.log",
+        "agent_info.log.1.gz",
+        "agent_info.log.2.gz",
+    ]
+    with gzip.open(tmp_path / "agent_info.log.1.gz", "rt", encoding="utf-8") as f:
+        assert "zpráva" in f.read()
+
+
+def test_rotates_by_age(tmp_path):
+    clock = FakeClock()
+    log_file = tmp_path / "agent_info.log"
+    handler = RotatingLogHandler(
+        log_file, max_bytes=10**6, backup_count=3, rotate_seconds=3600, clock=clock
+    )
+
+    handler.emit(make_record("první"))
+    clock.now += 3599
+    handler.emit(make_record("druhá"))
+    assert not (tmp_path / "agent_info.log.1.gz").exists()
+
+    clock.now += 1
+    handler.emit(make_record("třetí"))
+    handler.close()
+
+    assert log_file.read_text(encoding="utf-8").strip() == "třetí"
+    with gzip.open(tmp_path / "agent_info.log.1.gz", "rt", encoding="utf-8") as f:
+        assert f.read().split() == ["první", "druhá"]
+
+
+def test_empty_log_is_not_rotated_by_age(tmp_path):
+    clock = FakeClock()
+    handler = RotatingLogHandler(
+        tmp_path / "agent_info.log", 10**6, 3, rotate_seconds=60, clock=clock
+    )
+
+    clock.now += 120
+    handler.emit(make_record("první"))
+    handler.close()
+
+    assert [p.name for p in tmp_path.iterdir()] == ["agent_info.log"]
+
+
+def test_configure_logging_writes_in_background(tmp_path, restore_root_logger):
+    log_file = tmp_path / "logs" / "agent_info.log"
+
+    listener = configure_logging(log_file, "INFO")
+    logging.info("z fronty")
+    logging.debug("pod úrovní")
+    listener.stop()
+
+    text = log_file.read_text(encoding="utf-8")
+    assert "[INFO] z fronty" in text
+    assert "pod úrovní" not in text
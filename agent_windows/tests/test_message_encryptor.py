@@ -7,7 +7,8 @@ import pytest
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.serialization import load_pem_public_key
-from src.lib.message_encryptor import MessageEncryptor
+from src.lib import json_codec
+from src.lib.message_encryptor import EncryptedEnvelope, MessageEncryptor
 
 
 # Fixture to generate a dummy public key for testing
@@ -117,3 +118,318 @@ def test_encrypt_message_plaintext_structure(
             # This test mainly relies on the assumption that if the inputs to AESGCM.encrypt are correct,
             # it will function as expected.
             pass
+
+
+def test_encrypt_batch_wraps_key_once(message_encryptor_instance):
+    import base64
+
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_key = MagicMock(wraps=private_key.public_key())
+    reports = [({"hostname": "a"}, 1678886400), ({"hostname": "b"}, 1678886460)]
+
+    encrypted_key, nonce, ciphertext = message_encryptor_instance.encrypt_batch(
+        reports, "batch_token", public_key
+    )
+
+    public_key.encrypt.assert_called_once()
+    aes_key = private_key.decrypt(
+        base64.b64decode(encrypted_key),
+        padding.OAEP(
+            mgf=padding.MGF1(algorithm=hashes.SHA256()),
+            algorithm=hashes.SHA256(),
+            label=None,
+        ),
+    )
+    plaintext = AESGCM(aes_key).decrypt(
+        base64.b64decode(nonce), base64.b64decode(ciphertext), None
+    )
+    plaintext_obj = json.loads(plaintext)
+
+    assert plaintext_obj["auth_token"] == "batch_token"
+    assert plaintext_obj["batch"] == [
+        {"content": {"hostname": "a"}, "client_timestamp": 1678886400},
+        {"content": {"hostname": "b"}, "client_timestamp": 1678886460},
+    ]
+
+
+def _decrypt_envelope(private_key, envelope):
+    import zlib
+
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    aes_key = private_key.decrypt(
+        envelope.encrypted_key,
+        padding.OAEP(
+            mgf=padding.MGF1(algorithm=hashes.SHA256()),
+            algorithm=hashes.SHA256(),
+            label=None,
+        ),
+    )
+    plaintext = AESGCM(aes_key).decrypt(envelope.nonce, envelope.ciphertext, None)
+    if envelope.compression == "zlib":
+        plaintext = zlib.decompress(plaintext)
+    return json.loads(plaintext)
+
+
+@pytest.fixture
+def private_key():
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def test_seal_message_compresses_large_payload(private_key):
+    encryptor = MessageEncryptor(compression="zlib", compression_threshold=256)
+    content = {"inventory": ["package-%d" % i for i in range(200)]}
+
+    envelope = encryptor.seal_message(content, "token", private_key.public_key())
+
+    assert envelope.compression == "zlib"
+    assert len(envelope.ciphertext) < len(json.dumps(content))
+    assert _decrypt_envelope(private_key, envelope)["content"] == content
+
+
+def test_seal_message_skips_compression_below_threshold(private_key):
+    encryptor = MessageEncryptor(compression="zlib", compression_threshold=4096)
+    content = {"hostname": "small"}
+
+    envelope = encryptor.seal_message(content, "token", private_key.public_key())
+
+    assert envelope.compression is None
+    assert _decrypt_envelope(private_key, envelope)["content"] == content
+
+
+def test_encrypt_message_never_compresses(private_key):
+    import base64
+
+    encryptor = MessageEncryptor(compression="zlib", compression_threshold=0)
+    content = {"inventory": ["package"] * 500}
+
+    encrypted_key, nonce, ciphertext = encryptor.encrypt_message(
+        content, "token", private_key.public_key()
+    )
+
+    envelope = EncryptedEnvelope(
+        base64.b64decode(encrypted_key),
+        base64.b64decode(nonce),
+        base64.b64decode(ciphertext),
+    )
+    assert _decrypt_envelope(private_key, envelope)["content"] == content
+
+
+def test_unknown_compression_is_rejected():
+    with pytest.raises(ValueError):
+        MessageEncryptor(compression="brotli")
+
+
+def test_session_mode_wraps_key_once(private_key):
+    encryptor = MessageEncryptor(session_max_messages=10)
+    public_key = MagicMock(wraps=private_key.public_key())
+    public_key.public_numbers.return_value = private_key.public_key().public_numbers()
+
+    envelopes = [
+        encryptor.seal_message({"n": i}, "token", public_key) for i in range(3)
+    ]
+
+    public_key.encrypt.assert_called_once()
+    # Zabalený klíč nese každá zpráva, aby šla dešifrovat i samostatně
+    assert envelopes[0].encrypted_key != b""
+    assert {e.encrypted_key for e in envelopes} == {envelopes[0].encrypted_key}
+    assert len({e.session_id for e in envelopes}) == 1
+    assert len({e.nonce for e in envelopes}) == 3
+
+    # Server rozbalí klíč z kterékoli zprávy a dešifruje i ty ostatní
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    aes_key = private_key.decrypt(
+        envelopes[0].encrypted_key,
+        padding.OAEP(
+            mgf=padding.MGF1(algorithm=hashes.SHA256()),
+            algorithm=hashes.SHA256(),
+            label=None,
+        ),
+    )
+    plaintext = AESGCM(aes_key).decrypt(
+        envelopes[2].nonce,
+        envelopes[2].ciphertext,
+        envelopes[2].session_id.encode("ascii"),
+    )
+    assert json.loads(plaintext)["content"] == {"n": 2}
+
+
+def test_session_rotates_after_max_messages(private_key):
+    encryptor = MessageEncryptor(session_max_messages=2)
+    public_key = private_key.public_key()
+
+    envelopes = [
+        encryptor.seal_message({"n": i}, "token", public_key) for i in range(3)
+    ]
+
+    assert envelopes[0].session_id == envelopes[1].session_id
+    assert envelopes[2].session_id != envelopes[0].session_id
+    assert envelopes[2].encrypted_key != b""
+
+
+def test_session_rotates_after_max_age(private_key):
+    encryptor = MessageEncryptor(session_max_messages=100, session_max_age=60)
+    public_key = private_key.public_key()
+
+    with patch("time.monotonic", return_value=1000.0):
+        first = encryptor.seal_message({}, "token", public_key)
+    with patch("time.monotonic", return_value=1061.0):
+        second = encryptor.seal_message({}, "token", public_key)
+
+    assert first.session_id != second.session_id
+
+
+def test_session_rotates_on_public_key_change(private_key):
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    encryptor = MessageEncryptor(session_max_messages=100)
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    first = encryptor.seal_message({}, "token", private_key.public_key())
+    second = encryptor.seal_message({}, "token", other_key.public_key())
+
+    assert first.session_id != second.session_id
+    assert second.encrypted_key != b""
+
+
+def test_reset_session_forces_new_wrap(private_key):
+    encryptor = MessageEncryptor(session_max_messages=100)
+    public_key = private_key.public_key()
+
+    first = encryptor.seal_message({}, "token", public_key)
+    encryptor.reset_session()
+    second = encryptor.seal_message({}, "token", public_key)
+
+    assert first.session_id != second.session_id
+    assert second.encrypted_key != b""
+
+
+def _decrypt_stream(private_key, stream):
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from src.lib.message_encryptor import stream_nonce
+
+    aes_key = private_key.decrypt(
+        stream.encrypted_key,
+        padding.OAEP(
+            mgf=padding.MGF1(algorithm=hashes.SHA256()),
+            algorithm=hashes.SHA256(),
+            label=None,
+        ),
+    )
+    aesgcm = AESGCM(aes_key)
+    chunks = list(stream.chunks)
+    plaintexts = [
+        aesgcm.decrypt(
+            stream_nonce(stream.nonce_prefix, i, i == len(chunks) - 1), chunk, None
+        )
+        for i, chunk in enumerate(chunks)
+    ]
+    return json.loads(plaintexts[0]), plaintexts[1:]
+
+
+def test_encrypt_stream_roundtrip_in_chunks(private_key):
+    import io
+
+    data = os.urandom(10 * 1024 + 17)
+    stream = MessageEncryptor().encrypt_stream(
+        io.BytesIO(data), "token", private_key.public_key(), chunk_size=1024
+    )
+
+    header, chunks = _decrypt_stream(private_key, stream)
+
+    assert header["auth_token"] == "token"
+    assert len(chunks) == 11
+    assert all(len(chunk) <= 1024 for chunk in chunks)
+    assert b"".join(chunks) == data
+
+
+def test_encrypt_stream_reads_source_lazily(private_key):
+    source = MagicMock()
+    source.read.side_effect = [b"a" * 16, b"b" * 16, b""]
+
+    stream = MessageEncryptor().encrypt_stream(
+        source, "token", private_key.public_key(), chunk_size=16
+    )
+    source.read.assert_not_called()
+
+    next(stream.chunks)  # metadata
+    next(stream.chunks)
+    assert source.read.call_count == 2
+
+
+def test_encrypt_stream_empty_source_has_final_chunk(private_key):
+    import io
+
+    stream = MessageEncryptor().encrypt_stream(
+        io.BytesIO(b""), "token", private_key.public_key()
+    )
+
+    _, chunks = _decrypt_stream(private_key, stream)
+
+    assert chunks == [b""]
+
+
+def test_truncated_stream_fails_authentication(private_key):
+    import io
+
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from src.lib.message_encryptor import stream_nonce
+
+    stream = MessageEncryptor().encrypt_stream(
+        io.BytesIO(os.urandom(4096)), "token", private_key.public_key(), chunk_size=1024
+    )
+    chunks = list(stream.chunks)
+    aes_key = private_key.decrypt(
+        stream.encrypted_key,
+        padding.OAEP(
+            mgf=padding.MGF1(algorithm=hashes.SHA256()),
+            algorithm=hashes.SHA256(),
+            label=None,
+        ),
+    )
+
+    # Příjemce, kterému chybí konec, považuje za poslední chunk předposlední
+    with pytest.raises(InvalidTag):
+        AESGCM(aes_key).decrypt(
+            stream_nonce(stream.nonce_prefix, len(chunks) - 2, True), chunks[-2], None
+        )
+
+
+def test_seal_message_embeds_encoded_content_as_is(private_key):
+    encryptor = MessageEncryptor()
+    content = {"hostname": "pc-01", "inventory": ["Příliš žluťoučký kůň"] * 3}
+    encoded = json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+    with patch(
+        "src.lib.message_encryptor.json_codec.dumps", wraps=json_codec.dumps
+    ) as dumps:
+        envelope = encryptor.seal_message(encoded, 'to"ken', private_key.public_key())
+
+    # Serializuje se jen token, obsah ne
+    dumps.assert_called_once_with('to"ken')
+    plaintext = _decrypt_envelope(private_key, envelope)
+    assert plaintext["content"] == content
+    assert plaintext["auth_token"] == 'to"ken'
+
+
+def test_seal_batch_accepts_encoded_and_dict_reports(private_key):
+    encryptor = MessageEncryptor()
+    reports = [(b'{"hostname":"a"}', 1678886400), ({"hostname": "b"}, 1678886460)]
+
+    envelope = encryptor.seal_batch(reports, "token", private_key.public_key())
+
+    assert _decrypt_envelope(private_key, envelope)["batch"] == [
+        {"content": {"hostname": "a"}, "client_timestamp": 1678886400},
+        {"content": {"hostname": "b"}, "client_timestamp": 1678886460},
+    ]
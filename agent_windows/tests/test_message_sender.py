@@ -21,7 +21,7 @@ def test_send_message_success(message_sender_instance, mock_encrypted_data, capl
     client_ip = "127.0.0.1"
     message_count = 5
 
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_post.return_value = mock_response
@@ -61,7 +61,7 @@ def test_send_message_server_error(
     client_ip = "127.0.0.1"
     message_count = 5
 
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_response = MagicMock()
         mock_response.status_code = 500
         mock_post.return_value = mock_response
@@ -84,7 +84,7 @@ def test_send_message_connection_error(
     message_count = 5
 
     with patch(
-        "requests.post",
+        "requests.Session.post",
         side_effect=requests.exceptions.ConnectionError("Mocked Connection Error"),
     ) as mock_post:
         with caplog.at_level(logging.ERROR):
@@ -107,7 +107,7 @@ def test_send_message_payload_contents_randomness(
     client_ip = "127.0.0.1"
     message_count = 1
 
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_post.return_value = mock_response
@@ -156,3 +156,295 @@ def test_send_message_payload_contents_randomness(
 
             assert mock_choice.call_count == 2  # 2 for each call
             assert mock_randint.call_count == 1  # 1 for each call
+
+
+def test_send_batch_posts_to_batch_endpoint(
+    message_sender_instance, mock_encrypted_data, caplog
+):
+    encrypted_key, nonce, ciphertext = mock_encrypted_data
+
+    with patch("requests.Session.post") as mock_post:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_post.return_value = mock_response
+
+        with caplog.at_level(logging.INFO):
+            result = message_sender_instance.send_batch(
+                encrypted_key, nonce, ciphertext, 3, "127.0.0.1", 7
+            )
+
+        assert result is True
+        args, kwargs = mock_post.call_args
+        assert args[0] == "http://test-server.com/api/message/batch"
+        payload = kwargs["json"]
+        assert payload["agent_id"] == "test-agent-id"
+        assert payload["report_count"] == 3
+        assert payload["encrypted_key"] == encrypted_key
+        assert payload["nonce"] == nonce
+        assert payload["ciphertext"] == ciphertext
+        assert (
+            "test-agent-id: Dávka 3 zpráv doručena - Celkem odesláno: 7" in caplog.text
+        )
+
+
+def test_send_message_spools_and_replays_when_offline(tmp_path, mock_encrypted_data):
+    from src.lib.outbox import Outbox
+
+    outbox = Outbox(tmp_path / "outbox")
+    sender = MessageSender("http://test-server.com", "test-agent-id", outbox=outbox)
+    encrypted_key, nonce, ciphertext = mock_encrypted_data
+
+    with patch(
+        "requests.Session.post",
+        side_effect=requests.exceptions.ConnectionError("offline"),
+    ):
+        assert not sender.send_message(
+            encrypted_key, nonce, ciphertext, "127.0.0.1", 1, "os", "state", 0
+        )
+    assert outbox.has_pending()
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
+
+        assert sender.send_message(
+            "second_key", nonce, ciphertext, "127.0.0.1", 2, "os", "state", 0
+        )
+
+        # Nejdřív odejde zpráva z outboxu, až potom nová
+        sent_keys = [
+            c.kwargs["json"]["encrypted_key"] for c in mock_post.call_args_list
+        ]
+        assert sent_keys == [encrypted_key, "second_key"]
+    assert not outbox.has_pending()
+
+
+def test_send_envelope_binary_frame():
+    from src.lib.message_encryptor import EncryptedEnvelope
+    from src.lib.wire_format import decode_frame
+
+    sender = MessageSender(
+        "http://test-server.com", "test-agent-id", wire_format="binary"
+    )
+    envelope = EncryptedEnvelope(b"key", b"nonce", b"cipher", "zlib")
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
+
+        assert sender.send_envelope(envelope, "127.0.0.1", 1, "Windows", "ok", 0)
+
+        args, kwargs = mock_post.call_args
+        assert args[0] == "http://test-server.com/api/message"
+        assert kwargs["headers"] == {"Content-Type": "application/vnd.mastiff.envelope"}
+        header, fields = decode_frame(kwargs["data"])
+        assert header["agent_id"] == "test-agent-id"
+        assert header["compression"] == "zlib"
+        assert fields == [b"key", b"nonce", b"cipher"]
+
+
+def test_send_envelope_json_keeps_base64_payload():
+    from src.lib.message_encryptor import EncryptedEnvelope
+
+    sender = MessageSender("http://test-server.com", "test-agent-id")
+    envelope = EncryptedEnvelope(b"key", b"nonce", b"cipher")
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
+
+        assert sender.send_envelope(envelope, "127.0.0.1", 1, "Windows", "ok", 0)
+
+        payload = mock_post.call_args.kwargs["json"]
+        assert (payload["encrypted_key"], payload["nonce"], payload["ciphertext"]) == (
+            envelope.as_b64()
+        )
+        assert "compression" not in payload
+
+
+def _response(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+def test_send_retries_transient_errors_with_backoff(mock_encrypted_data):
+    from src.lib.retry_policy import RetryPolicy
+
+    sender = MessageSender(
+        "http://test-server.com",
+        "test-agent-id",
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=1, max_delay=10),
+    )
+    sender._sleep = MagicMock()
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.side_effect = [
+            _response(503),
+            _response(429, {"Retry-After": "5"}),
+            _response(200),
+        ]
+
+        assert sender.send_message(
+            *mock_encrypted_data, "127.0.0.1", 1, "os", "state", 0
+        )
+
+    assert mock_post.call_count == 3
+    # Druhá prodleva respektuje Retry-After
+    assert sender._sleep.call_args_list[1].args[0] == 5.0
+
+
+def test_send_does_not_retry_fatal_errors(mock_encrypted_data):
+    from src.lib.retry_policy import RetryPolicy
+
+    sender = MessageSender(
+        "http://test-server.com",
+        "test-agent-id",
+        retry_policy=RetryPolicy(max_attempts=3),
+    )
+    sender._sleep = MagicMock()
+
+    with patch("requests.Session.post", return_value=_response(400)) as mock_post:
+        assert not sender.send_message(
+            *mock_encrypted_data, "127.0.0.1", 1, "os", "state", 0
+        )
+
+    mock_post.assert_called_once()
+    sender._sleep.assert_not_called()
+
+
+def test_open_circuit_skips_network_and_spools(tmp_path, mock_encrypted_data):
+    from src.lib.outbox import Outbox
+    from src.lib.retry_policy import CircuitBreaker
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    outbox = Outbox(tmp_path / "outbox")
+    sender = MessageSender(
+        "http://test-server.com",
+        "test-agent-id",
+        outbox=outbox,
+        circuit_breaker=breaker,
+    )
+
+    with patch(
+        "requests.Session.post",
+        side_effect=requests.exceptions.ConnectionError("offline"),
+    ) as mock_post:
+        sender.send_message(*mock_encrypted_data, "127.0.0.1", 1, "os", "state", 0)
+        sender.send_message(*mock_encrypted_data, "127.0.0.1", 2, "os", "state", 0)
+
+    mock_post.assert_called_once()
+    assert breaker.is_open()
+    assert outbox.drain(lambda record: True).delivered == 2
+
+
+def test_failed_half_open_probe_with_other_request_error_reopens_circuit(
+    tmp_path, mock_encrypted_data
+):
+    from src.lib.outbox import Outbox
+    from src.lib.retry_policy import CircuitBreaker
+
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_timeout=10, clock=lambda: now[0]
+    )
+    sender = MessageSender(
+        "http://test-server.com",
+        "test-agent-id",
+        outbox=Outbox(tmp_path / "outbox"),
+        circuit_breaker=breaker,
+    )
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.side_effect = requests.exceptions.ConnectionError("offline")
+        sender.send_message(*mock_encrypted_data, "127.0.0.1", 1, "os", "state", 0)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        # Zkušební požadavek v HALF_OPEN selže jinou chybou než spojením
+        now[0] = 100.0
+        mock_post.side_effect = requests.exceptions.ChunkedEncodingError("cut")
+        sender.send_message(*mock_encrypted_data, "127.0.0.1", 2, "os", "state", 0)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        now[0] = 200.0
+        mock_post.side_effect = None
+        mock_post.return_value = _response(200)
+        assert sender.send_message(
+            *mock_encrypted_data, "127.0.0.1", 3, "os", "state", 0
+        )
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert mock_post.call_count >= 3
+
+
+def test_rejected_replay_is_discarded_not_delivered(
+    tmp_path, mock_encrypted_data, caplog
+):
+    from src.lib.outbox import Outbox
+
+    outbox = Outbox(tmp_path / "outbox")
+    sender = MessageSender("http://test-server.com", "test-agent-id", outbox=outbox)
+    sender._spool("/api/message", {"encrypted_key": "a"})
+    sender._spool("/api/message", {"encrypted_key": "b"})
+    caplog.set_level(logging.INFO)
+
+    with patch("requests.Session.post", side_effect=[_response(400), _response(200)]):
+        assert sender.flush_outbox() == 1
+
+    assert not outbox.has_pending()
+    assert "Z outboxu doručeno zpráv: 1" in caplog.text
+    assert "Z outboxu zahozeno zpráv odmítnutých serverem: 1" in caplog.text
+
+
+def test_conflict_with_reason_raises_rejection(mock_encrypted_data):
+    from src.lib.message_sender import MessageRejectedError
+
+    sender = MessageSender("http://test-server.com", "test-agent-id")
+    response = _response(409)
+    response.json.return_value = {"error": "unknown_session"}
+
+    with patch("requests.Session.post", return_value=response):
+        with pytest.raises(MessageRejectedError) as excinfo:
+            sender.send_message(
+                *mock_encrypted_data,
+                "127.0.0.1",
+                1,
+                "os",
+                "state",
+                0,
+                session_id="abc",
+            )
+
+    assert excinfo.value.reason == "unknown_session"
+
+
+def test_send_stream_posts_generator_body(tmp_path):
+    import types
+
+    from src.lib.message_encryptor import EncryptedStream
+    from src.lib.outbox import Outbox
+    from src.lib.wire_format import decode_frame
+
+    outbox = Outbox(tmp_path / "outbox")
+    sender = MessageSender("http://test-server.com", "test-agent-id", outbox=outbox)
+    stream = EncryptedStream(b"key", b"prefix", iter([b"meta", b"chunk"]))
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
+
+        assert sender.send_stream(stream, "diagnostics")
+
+        args, kwargs = mock_post.call_args
+        assert args[0] == "http://test-server.com/api/message/stream"
+        assert isinstance(kwargs["data"], types.GeneratorType)
+        header, fields = decode_frame(b"".join(kwargs["data"]))
+        assert header == {
+            "agent_id": "test-agent-id",
+            "kind": "diagnostics",
+            "stream": True,
+        }
+        assert fields == [b"key", b"prefix", b"meta", b"chunk"]
+
+        # Stream se do outboxu neukládá
+        mock_post.return_value = MagicMock(status_code=503)
+        stream = EncryptedStream(b"key", b"prefix", iter([b"meta"]))
+        assert not sender.send_stream(stream, "diagnostics")
+    assert not outbox.has_pending()
@@ -0,0 +1,109 @@
+import time
+from unittest.mock import MagicMock
+
+from src.lib.metric_sampler import MetricSampler, RingBuffer, aggregate
+
+
+def test_ring_buffer_keeps_newest_values_in_order():
+    buffer = RingBuffer(3)
+    for value in range(5):
+        buffer.append(value)
+
+    assert buffer.values() == [2.0, 3.0, 4.0]
+    assert len(buffer) == 3
+
+
+def test_ring_buffer_clear():
+    buffer = RingBuffer(3)
+    buffer.append(1)
+    buffer.clear()
+
+    assert buffer.values() == []
+    buffer.append(7)
+    assert buffer.values() == [7.0]
+
+
+def test_aggregate():
+    values = [float(v) for v in range(1, 101)]
+    values.append(50.0)
+
+    assert aggregate(values) == {
+        "min": 1.0,
+        "max": 100.0,
+        "mean": 50.5,
+        "p95": 95.0,
+        "last": 50.0,
+    }
+
+
+def test_aggregates_capture_spike_between_reports():
+    probe = MagicMock(side_effect=[{"cpu_percent": v} for v in (5.0, 97.0, 6.0, 4.0)])
+    sampler = MetricSampler(1.0, capacity=10, probe=probe)
+
+    for _ in range(4):
+        sampler.sample_once()
+    metrics = sampler.aggregates()
+
+    assert metrics["cpu_percent"]["max"] == 97.0
+    assert metrics["cpu_percent"]["last"] == 4.0
+    assert metrics["sampler_overhead_percent"] >= 0
+
+
+def test_aggregates_reset_after_report():
+    sampler = MetricSampler(1.0, capacity=10, probe=lambda: {"memory_percent": 40.0})
+    sampler.sample_once()
+    sampler.aggregates()
+
+    assert sampler.aggregates() == {}
+
+
+def test_failing_probe_is_skipped():
+    sampler = MetricSampler(1.0, capacity=10, probe=MagicMock(side_effect=OSError))
+
+    sampler.sample_once()
+
+    assert sampler.aggregates() == {}
+
+
+def test_background_thread_samples_until_stopped():
+    probe = MagicMock(return_value={"cpu_percent": 1.0})
+    sampler = MetricSampler(0.01, capacity=1000, probe=probe)
+
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    calls = probe.call_count
+    time.sleep(0.05)
+
+    assert calls >= 3
+    assert probe.call_count == calls
+
+
+def test_reporter_adds_metric_aggregates():
+    from unittest.mock import patch
+
+    from src.lib.system_info_reporter import SystemInfoReporter
+
+    sampler = MetricSampler(1.0, capacity=10, probe=lambda: {"cpu_percent": 10.0})
+    sampler.sample_once()
+    system_info = {"hostname": "test-host"}
+
+    with patch("lib.system_info_reporter.get_system_info", return_value=system_info):
+        report = SystemInfoReporter(sampler).report_system_info()
+
+    assert report["metrics"]["cpu_percent"]["last"] == 10.0
+    assert "metrics" not in system_info
+
+
+def test_resize_keeps_newest_samples():
+    values = iter(range(10))
+    sampler = MetricSampler(1, capacity=8, probe=lambda: {"cpu": next(values)})
+    for _ in range(6):
+        sampler.sample_once()
+
+    sampler.resize(3)
+    sampler.sample_once()
+
+    assert sampler.capacity == 3
+    cpu = sampler.aggregates()["cpu"]
+    assert (cpu["min"], cpu["last"]) == (4, 6)
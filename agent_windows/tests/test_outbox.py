@@ -0,0 +1,133 @@
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from src.lib.outbox import DISCARDED, Outbox
+
+
+@pytest.fixture
+def outbox_instance(tmp_path):
+    return Outbox(tmp_path / "outbox", segment_bytes=64, fsync_every=2)
+
+
+def test_drain_delivers_in_order(outbox_instance):
+    for i in range(5):
+        outbox_instance.append(f"record-{i}".encode())
+
+    delivered = []
+    count = outbox_instance.drain(lambda record: delivered.append(record) or True)
+
+    assert count == (5, 0)
+    assert delivered == [f"record-{i}".encode() for i in range(5)]
+    assert not outbox_instance.has_pending()
+    assert list(outbox_instance.directory.glob("*.seg")) == []
+
+
+def test_drain_resumes_after_failure(outbox_instance):
+    for i in range(4):
+        outbox_instance.append(f"record-{i}".encode())
+
+    delivered = []
+
+    def deliver_two(record):
+        if len(delivered) == 2:
+            return False
+        delivered.append(record)
+        return True
+
+    assert outbox_instance.drain(deliver_two).delivered == 2
+    assert outbox_instance.has_pending()
+
+    # Nová instance (restart procesu) pokračuje od uložené pozice
+    reopened = Outbox(outbox_instance.directory)
+    rest = []
+    reopened.drain(lambda record: rest.append(record) or True)
+
+    assert rest == [b"record-2", b"record-3"]
+
+
+def test_appends_roll_into_segments(outbox_instance):
+    # Záznam má 48 B (8 B hlavička), do 64B segmentu se vejdou dva
+    for i in range(10):
+        outbox_instance.append(b"x" * 40)
+
+    assert len(list(outbox_instance.directory.glob("*.seg"))) == 5
+
+
+def test_size_cap_evicts_oldest_segments(tmp_path):
+    outbox = Outbox(tmp_path / "outbox", max_bytes=200, segment_bytes=64)
+    for i in range(10):
+        outbox.append(f"record-{i}".encode() + b"x" * 40)
+
+    delivered = []
+    outbox.drain(lambda record: delivered.append(record) or True)
+
+    assert 0 < len(delivered) < 10
+    assert delivered[-1].startswith(b"record-9")
+
+
+def test_truncated_tail_is_skipped(outbox_instance):
+    outbox_instance.append(b"complete")
+    outbox_instance.close()
+    segment = next(outbox_instance.directory.glob("*.seg"))
+    with open(segment, "ab") as f:
+        f.write(b"\x00\x00\x00\x10half")
+
+    delivered = []
+    Outbox(outbox_instance.directory).drain(
+        lambda record: delivered.append(record) or True
+    )
+
+    assert delivered == [b"complete"]
+
+
+def test_appended_records_survive_process_kill(outbox_instance):
+    directory = outbox_instance.directory / "killed"
+    # Proces skončí bez close()/sync(), jako při ukončení Plánovačem úloh
+    script = textwrap.dedent(f"""
+        import os
+        from src.lib.outbox import Outbox
+
+        outbox = Outbox({str(directory)!r}, fsync_every=16)
+        for i in range(5):
+            outbox.append(b"record-%d" % i)
+        os._exit(1)
+        """)
+    subprocess.run([sys.executable, "-c", script], check=False)
+
+    delivered = []
+    Outbox(directory).drain(lambda record: delivered.append(record) or True)
+
+    assert delivered == [b"record-%d" % i for i in range(5)]
+
+
+def test_discarded_records_are_counted_separately(outbox_instance):
+    for i in range(3):
+        outbox_instance.append(f"record-{i}".encode())
+
+    result = outbox_instance.drain(
+        lambda record: DISCARDED if record == b"record-1" else True
+    )
+
+    assert result == (2, 1)
+    assert not outbox_instance.has_pending()
+
+
+def test_failed_drains_keep_appending_to_one_segment(tmp_path):
+    outbox = Outbox(tmp_path / "outbox")
+
+    # Jako při výpadku: každé odeslání zkusí drain, selže a zprávu uloží
+    for i in range(5):
+        outbox.drain(lambda record: False)
+        outbox.append(f"record-{i}".encode())
+
+    assert len(list(outbox.directory.glob("*.seg"))) == 1
+    delivered = []
+    assert outbox.drain(lambda record: delivered.append(record) or True) == (5, 0)
+    assert delivered == [f"record-{i}".encode() for i in range(5)]
+    assert list(outbox.directory.glob("*.seg")) == []
+
+    # Po vyprázdnění se zapisuje do nového segmentu
+    outbox.append(b"next")
+    assert outbox.drain(lambda record: True).delivered == 1
@@ -0,0 +1,158 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from src.lib.message_encryptor import MessageEncryptor
+from src.lib.message_sender import MessageSender
+from src.lib.phase_metrics import PhaseMetrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def metrics(clock):
+    return PhaseMetrics(clock=clock)
+
+
+@pytest.fixture(scope="module")
+def public_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048).public_key()
+
+
+def test_phase_records_count_total_max_and_last(metrics, clock):
+    for duration in (0.5, 2.0, 1.0):
+        with metrics.phase("http"):
+            clock.now += duration
+
+    stats = metrics.snapshot()["phases"]["http"]
+    assert stats == {
+        "count": 3,
+        "total_seconds": 3.5,
+        "max_seconds": 2.0,
+        "last_seconds": 1.0,
+    }
+
+
+def test_phase_is_recorded_when_it_raises(metrics, clock):
+    with pytest.raises(RuntimeError):
+        with metrics.phase("collect"):
+            clock.now += 0.25
+            raise RuntimeError("boom")
+
+    assert metrics.snapshot()["phases"]["collect"]["total_seconds"] == 0.25
+
+
+def test_cycle_summary_covers_time_since_last_call(metrics):
+    metrics.record("collect", 0.010)
+    metrics.record("collect", 0.005)
+    metrics.record("http", 0.100)
+
+    assert metrics.cycle_summary() == {"collect_ms": 15.0, "http_ms": 100.0}
+    assert metrics.cycle_summary() == {}
+    # Souhrnné hodnoty pro export zůstávají
+    assert metrics.snapshot()["phases"]["collect"]["count"] == 2
+
+
+def test_prometheus_text(metrics):
+    metrics.record("rsa_wrap", 0.002)
+    metrics.add_bytes("plaintext", 1200)
+    metrics.count("messages_delivered")
+
+    text = metrics.to_prometheus()
+
+    assert "# TYPE mastiff_phase_seconds summary" in text
+    assert 'mastiff_phase_seconds_sum{phase="rsa_wrap"} 0.002000' in text
+    assert 'mastiff_phase_seconds_count{phase="rsa_wrap"} 1' in text
+    assert 'mastiff_payload_bytes_total{kind="plaintext"} 1200' in text
+    assert "mastiff_messages_delivered_total 1" in text
+
+
+def test_write_replaces_file_atomically(metrics, tmp_path):
+    path = tmp_path / "agent_metrics.json"
+    path.write_text("old")
+    metrics.count("messages_failed", 2)
+
+    metrics.write(path, "json")
+
+    assert json.loads(path.read_text())["counters"] == {"messages_failed": 2}
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_concurrent_writes_do_not_collide(metrics, tmp_path):
+    import threading
+
+    path = tmp_path / "agent_metrics.prom"
+    errors = []
+
+    def export():
+        for _ in range(50):
+            try:
+                metrics.write(path)
+            except OSError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=export) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_encryptor_times_phases_and_counts_bytes(public_key):
+    metrics = PhaseMetrics()
+    encryptor = MessageEncryptor(
+        compression="zlib", compression_threshold=1, metrics=metrics
+    )
+
+    encryptor.seal_message({"data": "x" * 1000}, "token", public_key)
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot["phases"]) == {"serialize", "compress", "encrypt", "rsa_wrap"}
+    assert snapshot["bytes"]["plaintext"] > snapshot["bytes"]["ciphertext"]
+
+
+def test_session_key_is_wrapped_once(public_key):
+    metrics = PhaseMetrics()
+    encryptor = MessageEncryptor(session_max_messages=10, metrics=metrics)
+
+    for _ in range(3):
+        encryptor.seal_message({}, "token", public_key)
+
+    phases = metrics.snapshot()["phases"]
+    assert phases["rsa_wrap"]["count"] == 1
+    assert phases["encrypt"]["count"] == 3
+
+
+def test_sender_times_each_http_attempt():
+    metrics = PhaseMetrics()
+    sender = MessageSender("http://test-server.com", "agent", metrics=metrics)
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
+        sender.send_message("k", "n", "c", "127.0.0.1", 1, "os", "ok", 0)
+
+    assert metrics.snapshot()["phases"]["http"]["count"] == 1
+
+
+def test_encoded_content_is_not_timed_as_serialize_again(public_key):
+    metrics = PhaseMetrics()
+    encryptor = MessageEncryptor(metrics=metrics)
+
+    encryptor.seal_message(b'{"hostname":"pc-01"}', "token", public_key)
+
+    assert "serialize" not in metrics.snapshot()["phases"]
@@ -0,0 +1,79 @@
+import argparse
+import logging
+import pstats
+import threading
+import time
+
+import pytest
+from src import cli, config
+from src.lib.profiling import PROFILE_FILE, SUMMARY_FILE, ThreadProfiler, profile_run
+
+
+def busy_work():
+    return sum(i * i for i in range(200_000))
+
+
+def test_thread_profiler_covers_new_threads():
+    profiler = ThreadProfiler()
+    profiler.start()
+    thread = threading.Thread(target=busy_work)
+    thread.start()
+    thread.join()
+    stats = profiler.stop()
+
+    functions = {func[2] for func in stats.stats}
+    assert "busy_work" in functions
+
+
+def test_waiting_thread_is_not_counted_as_busy():
+    profiler = ThreadProfiler()
+    event = threading.Event()
+    profiler.start()
+    thread = threading.Thread(target=event.wait)
+    thread.start()
+    time.sleep(0.3)
+    stats = profiler.stop()
+    event.set()
+    thread.join()
+
+    # CPU čas, ne čas na hodinách - čekání se do profilu nepromítne
+    assert stats.total_tt < 0.1
+
+
+def test_profile_run_writes_profile_and_summary(tmp_path):
+    summary = profile_run(busy_work, tmp_path, top=5)
+
+    assert (tmp_path / PROFILE_FILE).exists()
+    assert (tmp_path / SUMMARY_FILE).read_text(encoding="utf-8") == summary
+    assert "busy_work" in summary
+    assert "míst alokací" in summary
+
+
+@pytest.fixture
+def configured_agent(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR", tmp_path / "Mastiff")
+    monkeypatch.setattr(config, "CONFIG_FILE", tmp_path / "Mastiff" / "config.json")
+    config.save(
+        {
+            "server_url": "http://not-used.invalid",
+            "auth_token": "token",
+            "metrics_sample_seconds": 0,
+        }
+    )
+    return tmp_path
+
+
+def test_cli_profile_dry_run(configured_agent, caplog):
+    output = configured_agent / "profile"
+    args = argparse.Namespace(cycles=2, dry_run=True, top=5, output=output)
+    caplog.set_level(logging.INFO)
+
+    cli.profile(args)
+
+    functions = {func[2] for func in pstats.Stats(str(output / PROFILE_FILE)).stats}
+    assert {"seal_message", "report_system_info"} <= functions
+    assert "Top 5" in caplog.text
+    # Stav běžící služby (outbox, cache klíče, metriky) zůstal netknutý
+    assert sorted(p.name for p in (configured_agent / "Mastiff").iterdir()) == [
+        "config.json"
+    ]
@@ -29,7 +29,7 @@ def public_key_fetcher_instance():
 
 
 def test_fetch_public_key_success(public_key_fetcher_instance, mock_public_key_pem):
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {"public_key_pem": mock_public_key_pem}
@@ -38,7 +38,9 @@ def test_fetch_public_key_success(public_key_fetcher_instance, mock_public_key_p
         public_key = public_key_fetcher_instance.fetch_public_key()
 
         assert isinstance(public_key, RSAPublicKey)
-        mock_get.assert_called_once_with("http://test-server.com/api/public_key")
+        mock_get.assert_called_once_with(
+            "http://test-server.com/api/public_key", timeout=(5.0, 30.0)
+        )
         # Ensure the fetched key is correctly loaded
         assert (
             public_key.public_bytes(
@@ -50,7 +52,7 @@ def test_fetch_public_key_success(public_key_fetcher_instance, mock_public_key_p
 
 
 def test_fetch_public_key_caching(public_key_fetcher_instance, mock_public_key_pem):
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {"public_key_pem": mock_public_key_pem}
@@ -69,7 +71,7 @@ def test_fetch_public_key_connection_error(public_key_fetcher_instance):
     from requests.exceptions import ConnectionError
 
     with patch(
-        "requests.get", side_effect=ConnectionError("Mocked Connection Error")
+        "requests.Session.get", side_effect=ConnectionError("Mocked Connection Error")
     ) as mock_get:
         with pytest.raises(ConnectionError):
             public_key_fetcher_instance.fetch_public_key()
@@ -79,7 +81,7 @@ def test_fetch_public_key_connection_error(public_key_fetcher_instance):
 def test_fetch_public_key_http_error(public_key_fetcher_instance):
     from requests.exceptions import HTTPError
 
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_response = MagicMock()
         mock_response.status_code = 404
         mock_response.raise_for_status.side_effect = HTTPError("Mocked HTTP Error")
@@ -89,3 +91,148 @@ def test_fetch_public_key_http_error(public_key_fetcher_instance):
             public_key_fetcher_instance.fetch_public_key()
         mock_get.assert_called_once()
         mock_response.raise_for_status.assert_called_once()
+
+
+def _key_response(pem, etag='"v1"'):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"public_key_pem": pem}
+    mock_response.headers = {"ETag": etag}
+    return mock_response
+
+
+def test_public_key_is_persisted_for_next_process(tmp_path, mock_public_key_pem):
+    cache_file = tmp_path / "public_key_cache.json"
+
+    with patch("requests.Session.get", return_value=_key_response(mock_public_key_pem)):
+        PublicKeyFetcher(
+            "http://test-server.com", cache_file=cache_file
+        ).fetch_public_key()
+
+    with patch("requests.Session.get") as mock_get:
+        fetcher = PublicKeyFetcher("http://test-server.com", cache_file=cache_file)
+        public_key = fetcher.fetch_public_key()
+
+        mock_get.assert_not_called()
+    assert fetcher._pem_of(public_key) == mock_public_key_pem
+
+
+def test_cache_is_keyed_by_server_url(tmp_path, mock_public_key_pem):
+    cache_file = tmp_path / "public_key_cache.json"
+
+    with patch("requests.Session.get", return_value=_key_response(mock_public_key_pem)):
+        PublicKeyFetcher(
+            "http://test-server.com", cache_file=cache_file
+        ).fetch_public_key()
+
+    with patch(
+        "requests.Session.get", return_value=_key_response(mock_public_key_pem)
+    ) as mock_get:
+        PublicKeyFetcher(
+            "http://other-server.com", cache_file=cache_file
+        ).fetch_public_key()
+
+        mock_get.assert_called_once()
+
+
+def test_stale_key_is_served_while_revalidating(tmp_path, mock_public_key_pem):
+    cache_file = tmp_path / "public_key_cache.json"
+    with patch("requests.Session.get", return_value=_key_response(mock_public_key_pem)):
+        PublicKeyFetcher(
+            "http://test-server.com", cache_file=cache_file
+        ).fetch_public_key()
+
+    fetcher = PublicKeyFetcher("http://test-server.com", cache_file=cache_file, ttl=0)
+    with patch.object(fetcher, "_start_revalidation") as mock_revalidation, patch(
+        "requests.Session.get"
+    ) as mock_get:
+        assert fetcher.fetch_public_key() is not None
+
+        mock_revalidation.assert_called_once()
+        mock_get.assert_not_called()
+
+
+def test_revalidation_uses_etag(tmp_path, mock_public_key_pem):
+    cache_file = tmp_path / "public_key_cache.json"
+    with patch("requests.Session.get", return_value=_key_response(mock_public_key_pem)):
+        PublicKeyFetcher(
+            "http://test-server.com", cache_file=cache_file
+        ).fetch_public_key()
+
+    fetcher = PublicKeyFetcher("http://test-server.com", cache_file=cache_file, ttl=0)
+    cached_key = fetcher._public_key
+    not_modified = MagicMock(status_code=304)
+
+    with patch("requests.Session.get", return_value=not_modified) as mock_get:
+        fetcher.revalidate()
+
+        assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+    assert fetcher._public_key is cached_key
+    assert fetcher._fetched_at > 0
+
+
+def test_invalidate_during_revalidation_keeps_key_out_of_cache(
+    tmp_path, mock_public_key_pem
+):
+    import json
+
+    cache_file = tmp_path / "public_key_cache.json"
+    with patch("requests.Session.get", return_value=_key_response(mock_public_key_pem)):
+        PublicKeyFetcher(
+            "http://test-server.com", cache_file=cache_file
+        ).fetch_public_key()
+
+    fetcher = PublicKeyFetcher("http://test-server.com", cache_file=cache_file, ttl=0)
+
+    def invalidated_meanwhile(*args, **kwargs):
+        # Rotace klíče ohlášená během podmíněného GETu na pozadí
+        fetcher.invalidate()
+        return MagicMock(status_code=304)
+
+    with patch("requests.Session.get", side_effect=invalidated_meanwhile):
+        fetcher.revalidate()
+
+    assert fetcher._public_key is None
+    assert json.loads(cache_file.read_text()) == {}
+
+
+def test_invalidate_forces_download(tmp_path, mock_public_key_pem):
+    cache_file = tmp_path / "public_key_cache.json"
+    fetcher = PublicKeyFetcher("http://test-server.com", cache_file=cache_file)
+
+    with patch(
+        "requests.Session.get", return_value=_key_response(mock_public_key_pem)
+    ) as mock_get:
+        fetcher.fetch_public_key()
+        fetcher.invalidate()
+        fetcher.fetch_public_key()
+
+        assert mock_get.call_count == 2
+        # Po invalidaci se nesmí posílat If-None-Match ke starému klíči
+        assert "headers" not in mock_get.call_args.kwargs
+
+
+def test_corrupted_cache_entry_is_ignored(tmp_path, mock_public_key_pem):
+    import json
+
+    cache_file = tmp_path / "public_key_cache.json"
+    cache_file.write_text(
+        json.dumps(
+            {
+                "http://test-server.com": {
+                    "pem": mock_public_key_pem,
+                    "fingerprint": "0" * 64,
+                    "fetched_at": 0,
+                }
+            }
+        )
+    )
+
+    with patch(
+        "requests.Session.get", return_value=_key_response(mock_public_key_pem)
+    ) as mock_get:
+        PublicKeyFetcher(
+            "http://test-server.com", cache_file=cache_file
+        ).fetch_public_key()
+
+        mock_get.assert_called_once()
@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+import pytest
+from src.lib.retry_policy import CircuitBreaker, RetryPolicy, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize(
+    "status, retryable",
+    [(None, True), (429, True), (500, True), (503, True), (400, False), (401, False)],
+)
+def test_is_retryable(status, retryable):
+    assert RetryPolicy.is_retryable(status) is retryable
+
+
+def test_delay_uses_full_jitter_within_cap():
+    policy = RetryPolicy(base_delay=1.0, max_delay=8.0)
+
+    with patch("random.uniform", side_effect=lambda low, high: high) as mock_uniform:
+        assert policy.delay(0) == 1.0
+        assert policy.delay(2) == 4.0
+        assert policy.delay(10) == 8.0
+
+    assert all(c.args[0] == 0 for c in mock_uniform.call_args_list)
+
+
+def test_delay_prefers_retry_after():
+    assert RetryPolicy().delay(0, retry_after=7.0) == 7.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_circuit_opens_after_threshold_and_half_opens_later():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    clock.now += 16  # reset_timeout * max. jitter 1.5
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Během zkušebního požadavku další neprojdou
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now += 16
+
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open()
@@ -0,0 +1,107 @@
+from unittest.mock import patch
+
+import pytest
+from src.lib.send_scheduler import SendScheduler
+
+
+def _is_multiple_of(value, interval):
+    return value == pytest.approx(round(value / interval) * interval, abs=1e-6)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_slot_offset_is_stable_and_within_interval():
+    offset = SendScheduler.slot_offset("agent-42", 60)
+
+    assert offset == SendScheduler.slot_offset("agent-42", 60)
+    assert 0 <= offset < 60
+
+
+def test_slot_offsets_spread_across_fleet():
+    offsets = [SendScheduler.slot_offset(f"agent-{i}", 60) for i in range(1000)]
+    # Každá desetisekundová část intervalu dostane zhruba šestinu agentů
+    buckets = [sum(1 for o in offsets if b * 10 <= o < (b + 1) * 10) for b in range(6)]
+
+    assert min(buckets) > 100
+
+
+def test_first_slot_aligns_to_agent_phase():
+    mono = FakeClock(500.0)
+    wall = FakeClock(1_700_000_000.0)
+    scheduler = SendScheduler("agent-42", 60, clock=mono, wall_clock=wall)
+
+    send_at = scheduler.next_send_time()
+
+    wall_send_at = wall.now + (send_at - mono.now)
+    assert _is_multiple_of(wall_send_at - scheduler.offset, 60)
+    assert 0 < send_at - mono.now <= 60
+
+
+def test_slots_do_not_drift():
+    mono = FakeClock(0.0)
+    scheduler = SendScheduler(
+        "agent-42", 60, clock=mono, wall_clock=FakeClock(1_700_000_000.0)
+    )
+    first = scheduler.next_send_time()
+
+    slots = []
+    for _ in range(100):
+        mono.now += 61.3  # každý cyklus trvá o kus déle, než je interval
+        slots.append(scheduler.next_send_time())
+        # Zmeškaný slot se přeskočí, plán nikdy nezůstane v minulosti
+        assert slots[-1] >= mono.now
+
+    assert all(_is_multiple_of(slot - first, 60) for slot in slots)
+
+
+def test_jitter_is_bounded_and_not_accumulated():
+    mono = FakeClock(0.0)
+    scheduler = SendScheduler(
+        "agent-42",
+        60,
+        jitter_seconds=5,
+        clock=mono,
+        wall_clock=FakeClock(1_700_000_000.0),
+    )
+
+    with patch("random.uniform", return_value=5):
+        first = scheduler.next_send_time()
+        second = scheduler.next_send_time()
+
+    assert second - first == pytest.approx(60)
+
+
+def test_wait_for_slot_async_returns_false_when_stopped():
+    import asyncio
+    import time
+
+    scheduler = SendScheduler("agent-1", 60)
+
+    async def run():
+        stop_event = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.05, stop_event.set)
+        return await scheduler.wait_for_slot_async(stop_event)
+
+    t0 = time.monotonic()
+    assert asyncio.run(run()) is False
+    assert time.monotonic() - t0 < 5
+
+
+def test_reconfigure_reschedules_with_new_interval():
+    clock = [1000.0]
+    scheduler = SendScheduler(
+        "agent-1", 3600, clock=lambda: clock[0], wall_clock=lambda: 0.0
+    )
+    scheduler.next_send_time()
+
+    scheduler.reconfigure(60)
+    next_time = scheduler.next_send_time()
+
+    assert scheduler.offset < 60
+    assert 1000.0 <= next_time <= 1060.0
@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("requests", "urllib3", "cryptography")
+HEAVY_IMPORTS = "import requests; import cryptography.hazmat.primitives.ciphers.aead"
+PRINT_HEAVY = "print(*sorted(m for m in sys.modules if m.split('.')[0] in %r))" % (
+    HEAVY_MODULES,
+)
+
+
+def _run_python(code, tmp_path):
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([str(ROOT / "src"), str(ROOT)]),
+        PROGRAMDATA=str(tmp_path),
+    )
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _cumulative_import_ms(stderr, module):
+    cumulative_us = None
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and line.split("|")[-1].strip() == module:
+            # Poslední výskyt je modul sám (ne jeho podřízené importy)
+            cumulative_us = int(line.split("|")[1])
+    assert cumulative_us is not None, f"{module} nebyl importován"
+    return cumulative_us / 1000
+
+
+def _loaded_heavy_modules(stdout):
+    return [name for name in stdout.split() if name in HEAVY_MODULES]
+
+
+@pytest.mark.parametrize(
+    "argv", [["agent-cli", "status"], ["agent-cli", "set", "interval_seconds", "30"]]
+)
+def test_cli_does_not_load_http_or_crypto(tmp_path, argv):
+    result = _run_python(
+        f"import sys; sys.argv = {argv!r}; import cli; cli.main(); {PRINT_HEAVY}",
+        tmp_path,
+    )
+
+    assert _loaded_heavy_modules(result.stdout) == []
+
+
+def test_cli_help_does_not_create_config(tmp_path):
+    result = _run_python(
+        "import sys; sys.argv = ['agent-cli', '--help']\n"
+        "import cli\n"
+        "try:\n"
+        "    cli.main()\n"
+        "except SystemExit:\n"
+        "    pass",
+        tmp_path,
+    )
+
+    assert "agent-cli" in result.stdout
+    assert not (tmp_path / "Mastiff" / "config.json").exists()
+
+
+def test_cli_import_is_cheaper_than_http_and_crypto(tmp_path):
+    # Žádný absolutní rozpočet (na pomalém CI by kolísal) - import CLI se
+    # porovná s importem requests a cryptography ve stejném procesu
+    result = _run_python(f"import cli; {HEAVY_IMPORTS}", tmp_path)
+
+    heavy_ms = sum(
+        _cumulative_import_ms(result.stderr, module)
+        for module in ("requests", "cryptography.hazmat.primitives.ciphers.aead")
+    )
+    assert _cumulative_import_ms(result.stderr, "cli") < heavy_ms / 2
+
+
+def test_main_import_defers_heavy_modules(tmp_path):
+    result = _run_python(
+        f"import sys, main; {PRINT_HEAVY}",
+        tmp_path,
+    )
+
+    assert _loaded_heavy_modules(result.stdout) == []
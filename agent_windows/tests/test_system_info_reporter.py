@@ -3,9 +3,7 @@ import logging
 from unittest.mock import MagicMock, patch
 
 import pytest
-from src.lib.system_info import get_system_info  # Import to patch it
-
-from ..src.lib.system_info_reporter import SystemInfoReporter
+from src.lib.system_info_reporter import SystemInfoReporter
 
 
 @pytest.fixture
@@ -29,19 +27,20 @@ def test_report_system_info_calls_get_system_info(
     system_info_reporter_instance, mock_system_info
 ):
     with patch(
-        "lib.system_info_reporter.get_system_info", return_value=mock_system_info
+        "src.lib.system_info_reporter.get_system_info", return_value=mock_system_info
     ) as mock_get_info:
         system_info = system_info_reporter_instance.report_system_info()
         mock_get_info.assert_called_once()
         assert system_info == mock_system_info
 
 
-def test_report_system_info_logs_correctly(
+def test_report_system_info_logs_fields_at_debug(
     system_info_reporter_instance, mock_system_info, caplog
 ):
-    with caplog.at_level(logging.INFO):
+    with caplog.at_level(logging.DEBUG):
         with patch(
-            "lib.system_info_reporter.get_system_info", return_value=mock_system_info
+            "src.lib.system_info_reporter.get_system_info",
+            return_value=mock_system_info,
         ):
             system_info_reporter_instance.report_system_info()
 
@@ -53,15 +52,28 @@ def test_report_system_info_logs_correctly(
             assert "architecture: x86_64" in caplog.text
             assert "processor: Intel(R) Core(TM) i9-9900K CPU @ 3.60GHz" in caplog.text
             assert "---------------------------" in caplog.text
+            assert json.dumps(mock_system_info) in caplog.text
+
+
+def test_report_system_info_skips_field_dump_above_debug(
+    system_info_reporter_instance, mock_system_info, caplog
+):
+    with caplog.at_level(logging.INFO):
+        with patch(
+            "src.lib.system_info_reporter.get_system_info",
+            return_value=mock_system_info,
+        ), patch("src.lib.system_info_reporter.json.dumps") as mock_dumps:
+            system_info_reporter_instance.report_system_info()
 
-            # Check for debug log as well
+    assert caplog.text == ""
+    mock_dumps.assert_not_called()
 
 
 def test_report_system_info_returns_info(
     system_info_reporter_instance, mock_system_info
 ):
     with patch(
-        "lib.system_info_reporter.get_system_info", return_value=mock_system_info
+        "src.lib.system_info_reporter.get_system_info", return_value=mock_system_info
     ):
         returned_info = system_info_reporter_instance.report_system_info()
         assert returned_info == mock_system_info
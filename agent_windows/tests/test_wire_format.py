@@ -0,0 +1,64 @@
+import pytest
+from src.lib.wire_format import (
+    WireFormatError,
+    decode_frame,
+    encode_frame,
+    encode_stream,
+    iter_frame_fields,
+)
+
+
+def test_frame_roundtrip():
+    header = {"agent_id": "test-agent-id", "client_os": "Windows"}
+    key, nonce, ciphertext = b"\x01" * 256, b"\x02" * 12, b"\x00\xff" * 100
+
+    frame = encode_frame(header, key, nonce, ciphertext)
+
+    assert decode_frame(frame) == (header, [key, nonce, ciphertext])
+
+
+def test_frame_is_smaller_than_base64_json():
+    import base64
+    import json
+
+    ciphertext = b"\xab" * 3000
+    frame = encode_frame({"agent_id": "a"}, ciphertext)
+    as_json = json.dumps(
+        {"agent_id": "a", "ciphertext": base64.b64encode(ciphertext).decode()}
+    )
+
+    assert len(frame) < len(as_json)
+
+
+def test_decode_rejects_unknown_magic():
+    with pytest.raises(WireFormatError):
+        decode_frame(b"XXXX\x00\x00\x00\x02{}")
+
+
+def test_decode_rejects_truncated_frame():
+    frame = encode_frame({"agent_id": "a"}, b"payload")
+
+    with pytest.raises(WireFormatError):
+        decode_frame(frame[:-3])
+
+
+def test_stream_roundtrip_matches_frame_layout():
+    import io
+
+    header = {"agent_id": "a", "stream": True}
+    chunks = [b"first", b"", b"last"]
+
+    body = b"".join(encode_stream(header, b"key", b"prefix", chunks=iter(chunks)))
+
+    assert decode_frame(body) == (header, [b"key", b"prefix", *chunks])
+    fields = list(iter_frame_fields(io.BytesIO(body)))
+    assert fields[1:] == [b"key", b"prefix", *chunks]
+
+
+def test_iter_frame_fields_rejects_truncated_stream():
+    import io
+
+    body = b"".join(encode_stream({"agent_id": "a"}, chunks=[b"payload"]))
+
+    with pytest.raises(WireFormatError):
+        list(iter_frame_fields(io.BytesIO(body[:-2])))